@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 生成Geolife格式的模拟数据：Labeled_Data/user/Trajectory/*.plt（含前6行说明信息）及 user/labels.txt。
+#              可设置user数、每个user的轨迹文件数、每个文件的点数、时间戳重复点比例及范围外点比例；
+#              给定随机种子时结果确定，各user使用独立的随机数序列，增加user数不改变已有user的数据。
+import datetime
+import os
+import numpy as np
+import pandas as pd
+import FileOperation.traj_read_and_write as trw
+
+PLT_HEADER = "Geolife trajectory\nWGS 84\nAltitude is in Feet\nReserved 3\n0,2,255,My Track,0,0,2,8421376\n0\n"
+LABEL_HEADER = "Start Time\tEnd Time\tTransportation Mode\n"
+MODE_SPEEDS = {'walk': 1.4, 'bike': 4.0, 'bus': 8.0, 'car': 12.0, 'taxi': 12.0, 'subway': 15.0,
+               'train': 30.0, 'run': 3.0}  # 各出行方式的模拟速度（m/s），含需剔除的train、run
+CENTER = (39.9, 116.4)  # 轨迹起点附近的中心位置 (lat, lon)
+OUTSIDE_LAT = 45.0  # 范围外点的纬度，位于SCOPE_POLYGON之外
+START_TIME = datetime.datetime(2008, 4, 1)
+METERS_PER_DEGREE = 111319.49  # 每度纬度约对应的距离（m）
+
+
+def generate_traj(rng, start, point_num, duplicate_rate, outside_rate, labels_per_file):
+    """
+    生成一条轨迹及其出行方式标签。
+    轨迹被划分为labels_per_file个连续区间，各区间取一种出行方式并按其速度随机游走，区间之间留有无标签的间隔。
+
+    :return: (轨迹点表：lat、lon、alt、timestamp（datetime64）, 标签列表 [(开始时间, 结束时间, 出行方式)])
+    """
+    modes = list(MODE_SPEEDS)
+    # 相邻点时间间隔1~5s，按duplicate_rate取0（时间戳重复）
+    delta = rng.integers(1, 6, point_num)
+    delta[0] = 0
+    delta[rng.random(point_num) < duplicate_rate] = 0
+    seconds = np.cumsum(delta)
+    # 按点序号等分为若干区间，每个区间一种出行方式
+    bounds = np.linspace(0, point_num, labels_per_file + 1).astype(np.int64)
+    label_modes = [modes[i] for i in rng.integers(0, len(modes), labels_per_file)]
+    speed = np.repeat([MODE_SPEEDS[mode] for mode in label_modes], np.diff(bounds))
+    heading = np.cumsum(rng.normal(0, 0.3, point_num)) + rng.uniform(0, 2 * np.pi)
+    step = speed * delta / METERS_PER_DEGREE
+    lat = CENTER[0] + rng.normal(0, 0.05) + np.cumsum(step * np.cos(heading))
+    lon = CENTER[1] + rng.normal(0, 0.05) + np.cumsum(step * np.sin(heading) / np.cos(np.radians(CENTER[0])))
+    lat[rng.random(point_num) < outside_rate] = OUTSIDE_LAT
+    alt = np.round(150 + np.cumsum(rng.normal(0, 1, point_num))).astype(np.int64)
+    timestamps = np.datetime64(start, 's') + seconds.astype('timedelta64[s]')
+    trajDF = pd.DataFrame({'lat': lat, 'lon': lon, 'alt': alt, 'timestamp': timestamps.astype('datetime64[ns]')})
+    labels = []
+    for k, mode in enumerate(label_modes):
+        first, last = bounds[k], bounds[k + 1] - 1
+        if last - first < 2:
+            continue
+        # 标签首尾各缩进一点，使相邻标签之间存在无标签的点
+        labels.append((timestamps[first + 1], timestamps[last - 1], mode))
+    return trajDF, labels
+
+
+def write_plt(trajDF, plt_path):
+    """
+    按Geolife格式写出plt文件：前6行说明信息，每行为 纬度,经度,0,高程,天数,日期,时间。
+    """
+    timestamps = trajDF['timestamp'].values.astype('datetime64[s]')
+    days = (timestamps.astype(np.int64) / 86400.0) + trw.PLT_DAY_ORIGIN
+    text = np.datetime_as_string(timestamps, unit='s')
+    pltDF = pd.DataFrame({'lat': np.char.mod('%.6f', trajDF['lat'].values),
+                          'lon': np.char.mod('%.6f', trajDF['lon'].values),
+                          'zero': '0',
+                          'alt': trajDF['alt'].values,
+                          'days': np.char.mod('%.10f', days),
+                          'date': text.astype('<U10'),
+                          'time': np.char.partition(text, 'T')[:, 2]})
+    with open(plt_path, 'w', newline='') as fp:
+        fp.write(PLT_HEADER)
+        pltDF.to_csv(fp, sep=',', index=False, header=False, lineterminator='\n')
+
+
+def write_labels(labels, labels_path):
+    """
+    写出labels.txt，时间格式为 %Y/%m/%d %H:%M:%S，以制表符分隔。
+    """
+    with open(labels_path, 'w') as fp:
+        fp.write(LABEL_HEADER)
+        for start, end, mode in labels:
+            fp.write("{0}\t{1}\t{2}\n".format(pd.Timestamp(start).strftime(trw.TIMESTAMP_FORMAT),
+                                              pd.Timestamp(end).strftime(trw.TIMESTAMP_FORMAT), mode))
+
+
+def generate_geolife(data_root_path, users=10, files_per_user=5, points_per_file=1000, duplicate_rate=0.01,
+                     outside_rate=0.001, labels_per_file=4, seed=0):
+    """
+    生成模拟数据集，目录结构与plt2txt_all_folders的输入相同：data_root_path/Labeled_Data/user/...
+
+    :param data_root_path: 数据文件夹的路径
+    :param users: user数
+    :param files_per_user: 每个user的轨迹文件数
+    :param points_per_file: 每个轨迹文件的点数
+    :param duplicate_rate: 时间戳与前一点重复的点的比例
+    :param outside_rate: 范围外点的比例
+    :param labels_per_file: 每个轨迹文件的出行方式标签数
+    :param seed: 随机种子
+    :return: 数据集统计：user数、文件数、点数、plt文件总字节数
+    """
+    labeled_path = os.path.join(data_root_path, "Labeled_Data")
+    point_num = 0
+    byte_num = 0
+    for user in range(users):
+        rng = np.random.default_rng([seed, user])
+        user_path = os.path.join(labeled_path, "{:03d}".format(user))
+        traj_path = os.path.join(user_path, "Trajectory")
+        os.makedirs(traj_path, exist_ok=True)
+        labels = []
+        for file_index in range(files_per_user):
+            # 各轨迹文件间隔一天，互不重叠
+            start = START_TIME + datetime.timedelta(days=user * files_per_user + file_index,
+                                                    seconds=int(rng.integers(0, 43200)))
+            trajDF, traj_labels = generate_traj(rng, start, points_per_file, duplicate_rate, outside_rate,
+                                                labels_per_file)
+            plt_path = os.path.join(traj_path, "{}.plt".format(start.strftime('%Y%m%d%H%M%S')))
+            write_plt(trajDF, plt_path)
+            labels.extend(traj_labels)
+            point_num += len(trajDF)
+            byte_num += os.path.getsize(plt_path)
+        write_labels(labels, os.path.join(user_path, "labels.txt"))
+    return {'users': users, 'files': users * files_per_user, 'points': point_num, 'plt_bytes': byte_num}
+
+
+if __name__ == '__main__':
+    print(generate_geolife(r"E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Benchmark"))
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 基准测试：在模拟数据上依次运行 plt2txt → 原始txt转轨迹txt → traj_filter → training_traj_segmentation →
+#              add_features_to_txt → extract_features，记录各阶段耗时并保存为json，便于比较不同提交之间的性能变化。
+#              用法：python -m Benchmark.run_benchmark 工作目录 --users 10 --points 1000 --output result.json
+#                    python -m Benchmark.run_benchmark --compare 旧结果.json 新结果.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+import Benchmark.geolife_generator as gg
+import DataCleaning.data_filter as dfl
+import DataCleaning.extract_labeled_segmentation as els
+import FeatureExtracting.extract_features as ef
+import FileOperation.plt2txt as p2t
+import FileOperation.traj_read_and_write as trw
+import Pipeline.instrumentation as ins
+
+STAGES = ['plt2txt', 'raw_txt_to_traj', 'traj_filter', 'training_traj_segmentation',
+          'add_features_to_txt', 'extract_features']  # 各阶段，按运行顺序
+
+
+def raw_txt_to_traj(process_path, output_path):
+    """
+    将plt2txt输出的原始txt（7列）转为traj_filter读取的 lat,lon,alt,timestamp 4列格式，并复制labels.txt。
+
+    :param process_path: plt2txt输出文件夹（Process_01）
+    :param output_path: 输出文件夹
+    """
+    for user in sorted(os.listdir(process_path)):
+        user_path = os.path.join(process_path, user)
+        if not os.path.isdir(user_path):
+            continue
+        out_traj_path = os.path.join(output_path, user, "Trajectory")
+        os.makedirs(out_traj_path, exist_ok=True)
+        shutil.copyfile(os.path.join(user_path, "labels.txt"), os.path.join(output_path, user, "labels.txt"))
+        traj_folder_path = os.path.join(user_path, "Trajectory")
+        for traj_file in sorted(os.listdir(traj_folder_path)):
+            trajDF = trw.read_raw_traj_txt(os.path.join(traj_folder_path, traj_file))
+            trajDF.to_csv(os.path.join(out_traj_path, traj_file), sep=',', index=False, header=False)
+
+
+def stage_paths(work_path):
+    """
+    各阶段的输出文件夹。
+    """
+    return {'plt2txt': os.path.join(work_path, "Process_01"),
+            'raw_txt_to_traj': os.path.join(work_path, "Process_02"),
+            'traj_filter': os.path.join(work_path, "Filtered_Data"),
+            'training_traj_segmentation': os.path.join(work_path, "Training_traj_segments"),
+            'add_features_to_txt': os.path.join(work_path, "Sub_traj_with_feature"),
+            'extract_features': os.path.join(work_path, "Traj_extracted_features")}
+
+
+def run_stages(work_path, chunksize=None):
+    """
+    运行一次全部阶段，各阶段的输出文件夹先清空。
+    add_features_to_txt原地修改文件，运行前将轨迹片段复制至单独的文件夹（复制不计入耗时）。
+
+    :param work_path: 工作目录，其中 Labeled_Data 为模拟数据
+    :param chunksize: 给定时traj_filter、training_traj_segmentation、add_features_to_txt、extract_features分块处理
+    :return: 以阶段名为键的耗时（s）
+    """
+    paths = stage_paths(work_path)
+    for path in paths.values():
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+    stage_functions = {
+        'plt2txt': lambda: p2t.plt2txt_all_folders(work_path),
+        'raw_txt_to_traj': lambda: raw_txt_to_traj(paths['plt2txt'], paths['raw_txt_to_traj']),
+        'traj_filter': lambda: dfl.traj_filter(paths['raw_txt_to_traj'], paths['traj_filter'], chunksize),
+        'training_traj_segmentation': lambda: els.training_traj_segmentation(
+            paths['traj_filter'], paths['training_traj_segmentation'], chunksize),
+        'add_features_to_txt': lambda: ef.add_features_to_txt(paths['add_features_to_txt'], chunksize),
+        'extract_features': lambda: ef.extract_features(paths['add_features_to_txt'], paths['extract_features'],
+                                                        chunksize)}
+    seconds = {}
+    for stage in STAGES:
+        if stage == 'add_features_to_txt':
+            shutil.rmtree(paths[stage])
+            shutil.copytree(paths['training_traj_segmentation'], paths[stage])
+        start = time.perf_counter()
+        stage_functions[stage]()
+        seconds[stage] = time.perf_counter() - start
+    return seconds
+
+
+def git_commit():
+    """
+    当前代码的git提交号，不在git仓库中时返回None。
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(work_path, result_path=None, users=10, files_per_user=5, points_per_file=1000,
+                  duplicate_rate=0.01, outside_rate=0.001, seed=0, repeat=3, chunksize=None, instrument=False):
+    """
+    生成模拟数据并重复运行全部阶段，记录各阶段耗时。
+
+    :param work_path: 工作目录，已有同参数的模拟数据时不重新生成
+    :param result_path: 结果json路径
+    :param repeat: 重复运行次数，结果取各次耗时
+    :param chunksize: 分块处理的点数，见run_stages
+    :param instrument: 是否开启运行统计，开启时最后一次运行的计数一并保存（计时会略有增加）
+    :return: 结果字典
+    """
+    config = {'users': users, 'files_per_user': files_per_user, 'points_per_file': points_per_file,
+              'duplicate_rate': duplicate_rate, 'outside_rate': outside_rate, 'seed': seed,
+              'repeat': repeat, 'chunksize': chunksize}
+    data_config = {key: config[key] for key in ('users', 'files_per_user', 'points_per_file',
+                                                'duplicate_rate', 'outside_rate', 'seed')}
+    config_path = os.path.join(work_path, "dataset.json")
+    dataset = None
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as fp:
+            saved = json.load(fp)
+        if saved['config'] == data_config:
+            dataset = saved['dataset']
+    if dataset is None:
+        shutil.rmtree(os.path.join(work_path, "Labeled_Data"), ignore_errors=True)
+        start = time.perf_counter()
+        dataset = gg.generate_geolife(work_path, users, files_per_user, points_per_file, duplicate_rate,
+                                      outside_rate, seed=seed)
+        dataset['generate_seconds'] = time.perf_counter() - start
+        with open(config_path, 'w') as fp:
+            json.dump({'config': data_config, 'dataset': dataset}, fp, indent=2)
+
+    runs = []
+    for run_index in range(repeat):
+        if instrument and run_index == repeat - 1:
+            ins.enable()
+        runs.append(run_stages(work_path, chunksize))
+    stages = {}
+    for stage in STAGES:
+        seconds = [run[stage] for run in runs]
+        stages[stage] = {'seconds': seconds, 'min': min(seconds), 'mean': float(np.mean(seconds)),
+                         'points_per_second': dataset['points'] / min(seconds) if min(seconds) > 0 else None}
+    result = {'commit': git_commit(),
+              'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'platform': platform.platform(),
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'pandas': pd.__version__,
+              'config': config,
+              'dataset': dataset,
+              'stages': stages,
+              'total_seconds': sum(stage['min'] for stage in stages.values())}
+    if instrument:
+        result['instrumentation'] = ins.report()
+        ins.disable()
+    if result_path is not None:
+        with open(result_path, 'w') as fp:
+            json.dump(result, fp, ensure_ascii=False, indent=2)
+    return result
+
+
+def compare_results(old_result_path, new_result_path, threshold=0.1):
+    """
+    比较两次基准测试结果（各阶段取最短耗时），输出耗时变化，超过threshold的变慢记为性能退化。
+
+    :param threshold: 判定退化的相对变慢比例
+    :return: 性能退化的阶段列表
+    """
+    with open(old_result_path, 'r') as fp:
+        old = json.load(fp)
+    with open(new_result_path, 'r') as fp:
+        new = json.load(fp)
+    if old['config'] != new['config']:
+        print("注意：两次测试的参数不同")
+    regressions = []
+    for stage in STAGES:
+        if stage not in old['stages'] or stage not in new['stages']:
+            continue
+        old_seconds = old['stages'][stage]['min']
+        new_seconds = new['stages'][stage]['min']
+        change = (new_seconds - old_seconds) / old_seconds if old_seconds > 0 else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(stage)
+            flag = "  <-- 退化"
+        print("{0:<28}{1:>10.3f}s{2:>10.3f}s{3:>+9.1%}{4}".format(stage, old_seconds, new_seconds, change, flag))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="轨迹处理流程基准测试")
+    parser.add_argument('work_path', nargs='?', help="工作目录")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--files', type=int, default=5, help="每个user的轨迹文件数")
+    parser.add_argument('--points', type=int, default=1000, help="每个轨迹文件的点数")
+    parser.add_argument('--duplicate-rate', type=float, default=0.01)
+    parser.add_argument('--outside-rate', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--instrument', action='store_true', help="同时保存运行统计")
+    parser.add_argument('--output', default=None, help="结果json路径，默认为 工作目录/benchmark_提交号.json")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="比较两次结果")
+    args = parser.parse_args()
+    if args.compare:
+        compare_results(*args.compare)
+    else:
+        output = args.output or os.path.join(args.work_path, "benchmark_{}.json".format((git_commit() or 'local')[:8]))
+        benchmark = run_benchmark(args.work_path, output, args.users, args.files, args.points, args.duplicate_rate,
+                                  args.outside_rate, args.seed, args.repeat, args.chunksize, args.instrument)
+        for name, stage_result in benchmark['stages'].items():
+            print("{0:<28}{1:>10.3f}s".format(name, stage_result['min']))
+        print("结果：", output)
@@ -9,12 +9,20 @@
 #              处理策略：不复制标签为除以上几种之外的轨迹
 
 import os
+import numpy as np
 import pandas as pd
 import shutil  # 复制文件需要使用
+import shapely
 from shapely.geometry import Polygon, Point
+import FileOperation.segment_catalog as sc
 import FileOperation.traj_read_and_write as trw
+import Pipeline.instrumentation as ins
 
+SCOPE_POLYGON = [(39.3, 115.3), (39.3, 117.6), (41.1, 117.6), (41.1, 39.3)]  # 范围多边形顶点 (lat, lon)
+EXCLUDED_MODES = ('airplane', 'train', 'boat', 'run')  # 不用于提取特征的出行方式
 
+
+@ins.timed()
 def repetition_filter(trajectory):
     """
     过滤时间戳重复的轨迹点。
@@ -32,6 +40,69 @@ def repetition_filter(trajectory):
     return traj
 
 
+def group_mean(values, inverse, counts):
+    """
+    按组求均值，与pandas groupby().mean()相同，组内按出现顺序做补偿（Kahan）求和，结果逐位一致。
+
+    :param values: 数值数组
+    :param inverse: 各元素所属组的序号
+    :param counts: 各组元素数
+    :return: 各组均值
+    """
+    order = np.argsort(inverse, kind='stable')  # 按组排列，组内保持原有顺序
+    group_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    total = np.zeros(len(counts))
+    compensation = np.zeros(len(counts))
+    for k in range(int(counts.max()) if len(counts) else 0):
+        groups = np.flatnonzero(counts > k)
+        y = values[order[group_starts[groups] + k]] - compensation[groups]
+        t = total[groups] + y
+        compensation[groups] = t - total[groups] - y
+        total[groups] = t
+    return total / counts
+
+
+def repetition_filter_arrays(arrays):
+    """
+    过滤时间戳重复的轨迹点（数组版本），结果与repetition_filter一致：
+    保留各时间戳首次出现的点，其经纬度替换为同时刻点的均值。
+
+    :param arrays: 轨迹数组字典，timestamp为int64纪元纳秒
+    :return: (去重后的轨迹数组字典, 删除的重复点数)
+    """
+    timestamps = arrays['timestamp']
+    _, first_index, inverse, counts = np.unique(timestamps, return_index=True, return_inverse=True,
+                                                return_counts=True)
+    if len(counts) == len(timestamps):
+        return arrays, 0
+    keep = np.sort(first_index)
+    result = {column: values[keep] for column, values in arrays.items()}
+    # 与repetition_filter一致：按时间戳排序的各组均值依次赋予保留的点
+    result['lat'] = group_mean(arrays['lat'], inverse, counts)
+    result['lon'] = group_mean(arrays['lon'], inverse, counts)
+    return result, len(timestamps) - len(keep)
+
+
+@ins.timed()
+def repetition_filter_sorted(trajectory):
+    """
+    过滤时间戳重复的轨迹点（按时间升序排列的轨迹），结果与repetition_filter一致。
+
+    :param trajectory: 轨迹数据
+    :return: (时间戳去重后的轨迹数据, 删除的重复点数)
+    """
+    timestamps = trajectory['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+    _, first_index, inverse, counts = np.unique(timestamps, return_index=True, return_inverse=True,
+                                                return_counts=True)
+    if len(counts) == len(timestamps):
+        return trajectory, 0
+    traj = trajectory.iloc[first_index].copy()
+    traj.loc[:, 'lat'] = group_mean(trajectory['lat'].values, inverse, counts)
+    traj.loc[:, 'lon'] = group_mean(trajectory['lon'].values, inverse, counts)
+    return traj, len(timestamps) - len(first_index)
+
+
+@ins.timed()
 def scope_filter(trajectory, output_path):
     """
     筛选北京范围内的轨迹数据，并存储。
@@ -42,7 +113,7 @@ def scope_filter(trajectory, output_path):
     # sub_traj_index 初始轨迹文件索引为0
     sub_traj_index = 0
     # 构造范围矩形
-    polygon = Polygon([(39.3, 115.3), (39.3, 117.6), (41.1, 117.6), (41.1, 39.3)])
+    polygon = Polygon(SCOPE_POLYGON)
     # 输出轨迹点起始索引
     sub_traj_start = 0
     # 轨迹是否被切断的标记
@@ -72,7 +143,210 @@ def scope_filter(trajectory, output_path):
         # 轨迹输出路径+具体文件名
         sub_traj_path = "{}.txt".format(output_path)
         trajectory.to_csv(sub_traj_path, sep=',', index=False, header=False)
-    print("范围外：", num)
+        ins.count('points_written', org_traj_num)
+    else:
+        ins.count('trajectories_split')
+    ins.count('points_outside', num)
+
+
+def scope_mask(lat, lon, polygon=None):
+    """
+    批量判断轨迹点是否在范围多边形内（不含边界），与逐点 polygon.contains(Point(lat, lon)) 结果一致。
+
+    :param lat: 纬度数组
+    :param lon: 经度数组
+    :param polygon: 范围多边形，坐标顺序为 (lat, lon)；默认为SCOPE_POLYGON
+    :return: 布尔数组，True表示在范围内
+    """
+    if polygon is None:
+        polygon = Polygon(SCOPE_POLYGON)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if hasattr(shapely, 'contains_xy'):
+        return shapely.contains_xy(polygon, lat, lon)
+    from shapely import vectorized  # shapely 1.x
+    return vectorized.contains(polygon, lat, lon)
+
+
+def split_inside_runs(inside, min_points=3):
+    """
+    按范围外的点切断轨迹，找出范围内的连续子轨迹段，切分结果与scope_filter一致。
+
+    :param inside: 各轨迹点是否在范围内
+    :param min_points: 子轨迹最少点数，少于该点数的子轨迹被剔除
+    :return: (各子轨迹起始索引, 各子轨迹结束索引（不含）, 轨迹是否被切断)
+    """
+    point_num = len(inside)
+    outside = np.flatnonzero(~np.asarray(inside, dtype=bool))
+    if len(outside) == 0:
+        return np.array([0]), np.array([point_num]), False
+    starts = np.concatenate(([0], outside + 1))
+    # 与scope_filter一致：轨迹被切断时，最后一段子轨迹截止于最后一点之前
+    ends = np.concatenate((outside, [point_num - 1]))
+    keep = ends - starts >= min_points
+    return starts[keep], ends[keep], True
+
+
+@ins.timed()
+def scope_filter_vectorized(trajectory, output_path, polygon=None, geofence=None):
+    """
+    筛选北京范围内的轨迹数据，并存储（向量化版本）。
+    一次性计算全部轨迹点的范围掩码，按连续段切分后依次输出，输出文件与scope_filter相同。
+
+    :param trajectory: 待筛选范围轨迹数据
+    :param output_path: 轨迹输出路径
+    :param polygon: 范围多边形，坐标顺序为 (lat, lon)；默认为SCOPE_POLYGON
+    :param geofence: 地理围栏（DataCleaning.geofence.Geofence），给定时以其全部区域代替polygon作为范围
+    :return: 范围外的点数
+    """
+    if geofence is not None:
+        inside = geofence.contains(trajectory.iloc[:, 0].values, trajectory.iloc[:, 1].values)
+    else:
+        inside = scope_mask(trajectory.iloc[:, 0].values, trajectory.iloc[:, 1].values, polygon)
+    starts, ends, traj_is_cut = split_inside_runs(inside)
+    # 轨迹未被裁剪，则直接存储整条轨迹
+    if not traj_is_cut:
+        trajectory.to_csv("{}.txt".format(output_path), sep=',', index=False, header=False)
+        ins.count('points_written', len(trajectory))
+        ins.count_file('bytes_written', "{}.txt".format(output_path))
+    else:
+        for sub_traj_index, (start, end) in enumerate(zip(starts, ends)):
+            sub_traj_path = "{0}_{1}.txt".format(output_path, sub_traj_index)
+            trajectory.iloc[start:end].to_csv(sub_traj_path, sep=',', index=False, header=False)
+            ins.count_file('bytes_written', sub_traj_path)
+        ins.count('trajectories_split')
+        ins.count('sub_trajectories', len(starts))
+        ins.count('points_written', int((ends - starts).sum()))
+    num = int(len(inside) - inside.sum())
+    ins.count('points_outside', num)
+    return num
+
+
+class ChunkedScopeFilter(object):
+
+    def __init__(self, output_path, polygon=None, geofence=None):
+        """
+        分块范围筛选：轨迹按块依次加入，切分及输出文件与scope_filter_vectorized相同。
+        块间携带的状态为当前未结束的子轨迹（边写边存于临时文件）、其点数、子轨迹编号及轨迹是否已被切断。
+
+        :param output_path: 轨迹输出路径（不含扩展名）
+        :param polygon: 范围多边形，坐标顺序为 (lat, lon)；默认为SCOPE_POLYGON
+        :param geofence: 地理围栏，给定时代替polygon
+        """
+        self.output_path = output_path
+        self.polygon = polygon if polygon is not None else Polygon(SCOPE_POLYGON)
+        self.geofence = geofence
+        self.run_path = output_path + '.run.tmp'  # 当前子轨迹的临时文件
+        self.run_file = None
+        self.run_length = 0
+        self.sub_traj_index = 0
+        self.traj_is_cut = False
+        self.outside_num = 0
+
+    def append_run(self, sub_traj):
+        if len(sub_traj) == 0:
+            return
+        if self.run_file is None:
+            self.run_file = open(self.run_path, 'w', newline='')
+        sub_traj.to_csv(self.run_file, sep=',', index=False, header=False,
+                        date_format=trw.CSV_DATE_FORMAT)
+        self.run_length += len(sub_traj)
+
+    def close_run(self):
+        """
+        结束当前子轨迹：少于3个点的子轨迹被剔除，否则存为 output_path_编号.txt。
+        """
+        if self.run_file is not None:
+            self.run_file.close()
+            self.run_file = None
+            if self.run_length >= 3:
+                sub_traj_path = "{0}_{1}.txt".format(self.output_path, self.sub_traj_index)
+                os.replace(self.run_path, sub_traj_path)
+                ins.count('sub_trajectories')
+                ins.count('points_written', self.run_length)
+                ins.count_file('bytes_written', sub_traj_path)
+                self.sub_traj_index += 1
+            else:
+                os.remove(self.run_path)
+        self.run_length = 0
+
+    def add(self, trajectory, is_last=False):
+        """
+        加入一块轨迹数据。
+
+        :param trajectory: 轨迹数据块
+        :param is_last: 是否为最后一块
+        """
+        if self.geofence is not None:
+            inside = self.geofence.contains(trajectory.iloc[:, 0].values, trajectory.iloc[:, 1].values)
+        else:
+            inside = scope_mask(trajectory.iloc[:, 0].values, trajectory.iloc[:, 1].values, self.polygon)
+        outside = np.flatnonzero(~inside)
+        self.outside_num += len(outside)
+        # 与split_inside_runs一致：轨迹被切断时，最后一段子轨迹截止于最后一点之前
+        if is_last and (self.traj_is_cut or len(outside)) and len(inside) and inside[-1]:
+            trajectory = trajectory.iloc[:-1]
+        start = 0
+        for position in outside:
+            self.append_run(trajectory.iloc[start:position])
+            self.close_run()
+            self.traj_is_cut = True
+            start = position + 1
+        self.append_run(trajectory.iloc[start:])
+        if is_last:
+            self.finish()
+
+    def finish(self):
+        """
+        结束整条轨迹：未被切断时整条轨迹存为 output_path.txt。
+        """
+        if self.traj_is_cut:
+            self.close_run()
+            ins.count('trajectories_split')
+            return
+        if self.run_file is None:
+            open(self.run_path, 'w').close()  # 空轨迹同样输出空文件
+        else:
+            self.run_file.close()
+            self.run_file = None
+        os.replace(self.run_path, "{}.txt".format(self.output_path))
+        ins.count('points_written', self.run_length)
+        ins.count_file('bytes_written', "{}.txt".format(self.output_path))
+
+
+@ins.timed()
+def traj_filter_one_file_chunked(traj_path, output_path, chunksize=1000000, polygon=None, geofence=None):
+    """
+    分块过滤单个轨迹文件中时间戳重复的轨迹点及范围外的轨迹点，输出与整文件处理相同，内存占用与块大小相关。
+    每块末尾与最后时间戳相同的点留至下一块，保证同一时间戳的重复点在同一块内合并。要求轨迹点按时间升序排列。
+
+    :param traj_path: 轨迹文件路径
+    :param output_path: 轨迹输出路径（不含扩展名）
+    :param chunksize: 每块读取的轨迹点数
+    :return: (重复点数, 范围外点数)
+    """
+    scope = ChunkedScopeFilter(output_path, polygon, geofence)
+    carry = None  # 末尾时间戳未结束的点
+    duplicate_num = 0
+    for chunk in trw.read_traj_txt_chunks(traj_path, chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        timestamps = chunk['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            raise ValueError("分块处理要求轨迹点按时间升序排列：{}".format(traj_path))
+        is_open = timestamps == timestamps[-1]
+        carry = chunk[is_open]
+        traj, num = repetition_filter_sorted(chunk[~is_open])
+        duplicate_num += num
+        scope.add(traj)
+    if carry is None:
+        carry = pd.DataFrame({'lat': [], 'lon': [], 'alt': [], 'timestamp': pd.to_datetime([])})
+    traj, num = repetition_filter_sorted(carry)
+    duplicate_num += num
+    scope.add(traj, is_last=True)
+    ins.count('points_duplicate', duplicate_num)
+    ins.count('points_outside', scope.outside_num)
+    return duplicate_num, scope.outside_num
 
 
 def sub_traj2txt(sub_traj, output_path, sub_traj_index):
@@ -89,15 +363,19 @@ def sub_traj2txt(sub_traj, output_path, sub_traj_index):
         return False
     sub_traj_path = "{0}_{1}.txt".format(output_path, sub_traj_index)
     sub_traj.to_csv(sub_traj_path, sep=',', index=False, header=False)  # 不要表头
+    ins.count('sub_trajectories')
+    ins.count('points_written', len(sub_traj))
     return True
 
 
-def traj_filter_one_folder(folder_path, output_path):
+@ins.timed()
+def traj_filter_one_folder(folder_path, output_path, chunksize=None):
     """
     过滤时间戳重复的轨迹点及北京范围外的轨迹点。(单个文件夹)
 
     :param folder_path: 欲处理的轨迹文件所属志愿者编号文件夹路径。
     :param output_path: 轨迹输出文件夹路径。
+    :param chunksize: 给定时按该点数分块处理每个轨迹文件，用于无法一次载入内存的大文件
     :return: traj处理后的轨迹
     """
     # 轨迹文件所在文件夹路径
@@ -109,31 +387,34 @@ def traj_filter_one_folder(folder_path, output_path):
 
         traj_file_name = traj_file_list[traj_file_index]  # 获取轨迹文件名，后续输出轨迹片段也要使用
         traj_path = os.path.join(traj_folder_path, traj_file_name)  # 轨迹文件所在路径
-        # 读取轨迹数据
-        trajectoryDF = trw.read_traj_txt(traj_path)
-
         # 轨迹输出路径
         sub_traj_path = os.path.join(output_path, traj_file_name.split('.')[0])
+        if chunksize is not None:
+            traj_filter_one_file_chunked(traj_path, sub_traj_path, chunksize)
+            continue
+        # 读取轨迹数据
+        trajectoryDF = trw.read_traj_txt(traj_path)
 
         # 判断轨迹是否存在时间戳[timestamp]重复的问题；若不存在，则进行范围筛选处理
         if not trajectoryDF.timestamp.duplicated().any():
-            print("重复点：", 0)
             # 筛选北京范围内的数据
-            scope_filter(trajectoryDF, sub_traj_path)
+            scope_filter_vectorized(trajectoryDF, sub_traj_path)
             continue
         # 存在重复
         traj = repetition_filter(trajectoryDF)
-        print("重复点：", len(trajectoryDF) - len(traj))
+        ins.count('points_duplicate', len(trajectoryDF) - len(traj))
         # 筛选北京范围内的数据
-        scope_filter(traj, sub_traj_path)
+        scope_filter_vectorized(traj, sub_traj_path)
 
 
-def traj_filter(data_path, output_path):
+@ins.timed('traj_filter', is_stage=True)
+def traj_filter(data_path, output_path, chunksize=None):
     """
     批量处理：过滤时间戳重复及北京范围外的轨迹点。
 
     :param data_path: 要处理的轨迹数据文件夹路径。
     :param output_path: 轨迹文件存储路径。
+    :param chunksize: 给定时分块处理每个轨迹文件，见traj_filter_one_folder
     """
     # 获取轨迹文件夹列表
     traj_folder_list = os.listdir(data_path)
@@ -149,23 +430,28 @@ def traj_filter(data_path, output_path):
         # 处理后的轨迹数据输出路径
         out_path = os.path.join(output_path, folder_name)
         out_traj_path = os.path.join(out_path, "Trajectory")
-        # 判断输出文件夹是否存在，若不在，则创建。
-        if not os.path.exists(out_path):
-            os.mkdir(out_path)
-            os.mkdir(out_traj_path)
-            # 原始labels文件路径
-            raw_file_path = os.path.join(traj_folder_path, "labels.txt")
-            # 复制至
-            txt_path = os.path.join(out_path, "labels.txt")
-            shutil.copyfile(raw_file_path, txt_path)  # 复制labels.txt
+        # 创建输出文件夹并复制labels.txt；不以输出文件夹是否存在为条件，中断后重新运行时补全缺失的部分
+        os.makedirs(out_traj_path, exist_ok=True)
+        # 原始labels文件路径
+        raw_file_path = os.path.join(traj_folder_path, "labels.txt")
+        # 复制至
+        txt_path = os.path.join(out_path, "labels.txt")
+        shutil.copyfile(raw_file_path, txt_path)  # 复制labels.txt
         # 去重选范围
-        traj_filter_one_folder(traj_folder_path, out_traj_path)
+        traj_filter_one_folder(traj_folder_path, out_traj_path, chunksize)
 
 
-def get_traffic_mode():
+def get_traffic_mode(catalog_path=None):
     """
     获取子轨迹段所有的交通方式类别。
+
+    :param catalog_path: 轨迹片段目录（SQLite）路径，给定时直接查询目录，不扫描文件夹
     """
+    if catalog_path is not None:
+        with sc.SegmentCatalog(catalog_path) as catalog:
+            uni_mode = catalog.modes()
+        print(uni_mode)
+        return uni_mode
     # 子轨迹存储位置
     file_path = r"E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Training_traj_segments_02"
     traj_flies = os.listdir(file_path)  # 轨迹文件名
@@ -177,10 +463,17 @@ def get_traffic_mode():
     print(uni_mode)  # ['subway', 'bus', 'train', 'car', 'boat', 'run', 'airplane', 'walk', 'bike', 'taxi']
 
 
-def select_experimental_traj():
+def select_experimental_traj(catalog_path=None, min_points=None):
     """
     选取要用于提取特征的轨迹段。
+
+    :param catalog_path: 轨迹片段目录（SQLite）路径，给定时以带索引的查询选取，不复制文件
+    :param min_points: 轨迹段最少点数（仅在查询目录时使用）
+    :return: 给定catalog_path时，返回选取的轨迹段存储位置列表
     """
+    if catalog_path is not None:
+        with sc.SegmentCatalog(catalog_path) as catalog:
+            return catalog.locations(exclude_modes=EXCLUDED_MODES, min_points=min_points)
     # 子轨迹存储位置
     file_path = r"E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Training_traj_segments_02"
     traj_flies = os.listdir(file_path)  # 轨迹文件名
@@ -188,7 +481,7 @@ def select_experimental_traj():
     target_path = r"E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Used_sub_traj"
     for file in traj_flies:
         traffic_mode = file.split('.')[0].split('_')[-1]
-        if traffic_mode == 'airplane' or traffic_mode == 'train' or traffic_mode == 'boat' or traffic_mode == 'run':
+        if traffic_mode in EXCLUDED_MODES:
             continue
         raw_file_path = os.path.join(file_path, file)
         # 复制至
@@ -5,7 +5,9 @@
 
 import os
 import numpy as np
+import FileOperation.segment_catalog as sc
 import FileOperation.traj_read_and_write as trw
+import Pipeline.instrumentation as ins
 
 
 def traj_segmentation_one_folder(folder_path, output_path):
@@ -124,8 +126,9 @@ def traj_segmentation_one_folder(folder_path, output_path):
                     # 子轨迹起始和结束索引不一致时，才保存子轨迹文件
                     if sub_traj_output_start < sub_traj_output_end:
                         # 子轨迹输出路径
+                        user = os.path.basename(os.path.normpath(folder_path))
                         sub_traj_path = os.path.join(output_path,
-                                                     "{0}_{1}_{2}_{3}.txt".format(folder_path.split('\\')[-1],
+                                                     "{0}_{1}_{2}_{3}.txt".format(user,
                                                                                   traj_file_name.split('.')[0],
                                                                                   sub_traj_id,
                                                                                   seg_mode))
@@ -138,13 +141,216 @@ def traj_segmentation_one_folder(folder_path, output_path):
                     traj_file_index = traj_file_index + 1  # 获取下一个文件名索引
 
 
-def training_traj_segmentation(data_path, output_path):
+def interval_join(timestamps, seg_start_times, seg_end_times):
+    """
+    将一条轨迹的轨迹点按时间分配至各标签时间区间 [开始时间, 结束时间]。
+    标签按给定顺序依次处理，已分配（或早于已分配区间）的点不再分配给后续标签，与逐行遍历的处理结果一致。
+
+    :param timestamps: 轨迹点时间戳（int64纳秒），升序
+    :param seg_start_times: 各标签开始时间（int64纳秒）
+    :param seg_end_times: 各标签结束时间（int64纳秒）
+    :return: (标签序号, 子轨迹起始索引, 子轨迹结束索引（不含）)，仅包含不少于2个点的子轨迹
+    """
+    lo = np.searchsorted(timestamps, seg_start_times, side='left')
+    hi = np.searchsorted(timestamps, seg_end_times, side='right')
+    # 每个标签只能使用此前标签已处理范围之后的点
+    consumed = np.concatenate(([0], np.maximum.accumulate(hi)[:-1])) if len(hi) else hi
+    lo = np.maximum(lo, consumed)
+    keep = hi - lo >= 2  # 子轨迹起始和结束索引不一致时，才保存子轨迹文件
+    return np.flatnonzero(keep), lo[keep], hi[keep]
+
+
+def point_label_index(timestamps, seg_start_times, seg_end_times):
+    """
+    逐点确定轨迹点所属的标签，对升序轨迹与interval_join的分配结果相同，且只依赖点自身的时间，可分块计算。
+    点t属于第k个标签，当且仅当 start_k <= t <= end_k 且 t晚于此前全部标签的结束时间。
+
+    :param timestamps: 轨迹点时间戳（int64纳秒），升序
+    :param seg_start_times: 各标签开始时间（int64纳秒），按开始时间排序
+    :param seg_end_times: 各标签结束时间（int64纳秒）
+    :return: 各点所属标签的序号，不属于任何标签为-1
+    """
+    if len(seg_end_times) == 0:
+        return np.full(len(timestamps), -1, dtype=np.int64)
+    # 结束时间的前缀最大值：点落在 (max_end[k-1], max_end[k]] 内时只可能属于第k个标签
+    max_end = np.maximum.accumulate(seg_end_times)
+    label_index = np.searchsorted(max_end, timestamps, side='left')
+    matched = label_index < len(max_end)
+    matched[matched] = timestamps[matched] >= seg_start_times[label_index[matched]]
+    return np.where(matched, label_index, -1)
+
+
+class ChunkedSegmentWriter(object):
+
+    def __init__(self, output_path, user, traj_name, seg_modes, catalog=None):
+        """
+        分块输出一个轨迹文件的各轨迹片段，块间携带当前未结束的片段（边写边存于临时文件）及其点数。
+
+        :param output_path: 子轨迹输出文件夹路径
+        :param user: user编号
+        :param traj_name: 轨迹文件名（不含扩展名）
+        :param seg_modes: 各标签的出行方式
+        :param catalog: 轨迹片段目录（SegmentCatalog），给定时登记输出的片段
+        """
+        self.output_path = output_path
+        self.user = user
+        self.traj_name = traj_name
+        self.seg_modes = seg_modes
+        self.run_path = os.path.join(output_path, "{0}_{1}.run.tmp".format(user, traj_name))
+        self.run_file = None
+        self.run_label = -1
+        self.run_length = 0
+        self.run_summary = None  # 当前片段的点数、时间及经纬度范围
+        self.sub_traj_id = 1  # 子轨迹id，以轨迹文件为单次递增空间
+        self.sub_traj_paths = []
+        self.catalog = catalog
+
+    def close_run(self):
+        """
+        结束当前片段：不少于2个点时存为 用户_轨迹文件名_子轨迹id_交通方式.txt，否则删除。
+        """
+        if self.run_file is not None:
+            self.run_file.close()
+            self.run_file = None
+            if self.run_length >= 2:
+                sub_traj_path = os.path.join(self.output_path, "{0}_{1}_{2}_{3}.txt".format(
+                    self.user, self.traj_name, self.sub_traj_id, self.seg_modes[self.run_label]))
+                os.replace(self.run_path, sub_traj_path)
+                ins.count('segments_written')
+                ins.count('points_written', self.run_length)
+                ins.count_file('bytes_written', sub_traj_path)
+                if self.catalog is not None:
+                    self.catalog.add(self.user, self.traj_name, self.sub_traj_id, self.seg_modes[self.run_label],
+                                     self.run_summary, os.path.abspath(sub_traj_path))
+                self.sub_traj_paths.append(sub_traj_path)
+                self.sub_traj_id += 1
+            else:
+                os.remove(self.run_path)
+        self.run_label = -1
+        self.run_length = 0
+        self.run_summary = None
+
+    def add(self, trajectory, label_index):
+        """
+        加入一块轨迹数据及其各点所属标签。
+        """
+        if len(label_index) == 0:
+            return
+        boundaries = np.flatnonzero(np.diff(label_index)) + 1
+        for start, end in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(label_index)]))):
+            label = label_index[start]
+            if label != self.run_label:
+                self.close_run()
+            if label < 0:
+                continue
+            if self.run_file is None:
+                self.run_file = open(self.run_path, 'w', newline='')
+                self.run_label = label
+            sub_traj = trajectory.iloc[start:end].copy()
+            sub_traj.loc[:, 'mode'] = self.seg_modes[label]
+            sub_traj.to_csv(self.run_file, sep=',', index=False, header=False,
+                            date_format=trw.CSV_DATE_FORMAT)
+            self.run_length += end - start
+            if self.catalog is not None:
+                self.run_summary = sc.merge_summaries(self.run_summary, sc.summarize(
+                    sub_traj['lat'].values, sub_traj['lon'].values, sub_traj['timestamp'].values))
+
+
+@ins.timed()
+def traj_segmentation_one_file_chunked(traj_path, output_path, user, labelsDF, chunksize=1000000, catalog=None):
+    """
+    分块分割单个轨迹文件，输出与traj_segmentation_one_folder_join相同，内存占用与块大小相关。
+    要求轨迹点按时间升序排列。
+
+    :param traj_path: 轨迹文件路径
+    :param output_path: 子轨迹输出文件夹路径
+    :param user: user编号
+    :param labelsDF: 已按开始时间稳定排序的出行方式标签
+    :param chunksize: 每块读取的轨迹点数
+    :param catalog: 轨迹片段目录（SegmentCatalog），给定时登记输出的片段
+    :return: 输出的子轨迹文件路径列表
+    """
+    seg_start_times = labelsDF['start_time'].values.astype('datetime64[ns]').astype(np.int64)
+    seg_end_times = labelsDF['end_time'].values.astype('datetime64[ns]').astype(np.int64)
+    writer = ChunkedSegmentWriter(output_path, user, os.path.basename(traj_path).split('.')[0],
+                                  labelsDF['mode'].values, catalog)
+    last_timestamp = None
+    for trajectoryDF in trw.read_traj_txt_chunks(traj_path, chunksize):
+        timestamps = trajectoryDF['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+        if np.any(timestamps[1:] < timestamps[:-1]) or \
+                (last_timestamp is not None and len(timestamps) and timestamps[0] < last_timestamp):
+            raise ValueError("分块处理要求轨迹点按时间升序排列：{}".format(traj_path))
+        if len(timestamps):
+            last_timestamp = timestamps[-1]
+        writer.add(trajectoryDF, point_label_index(timestamps, seg_start_times, seg_end_times))
+    writer.close_run()
+    return writer.sub_traj_paths
+
+
+@ins.timed()
+def traj_segmentation_one_folder_join(folder_path, output_path, chunksize=None, catalog=None):
+    """
+    根据交通方式标签文件分割轨迹片段（区间连接版本）。
+    每个轨迹文件排序一次时间戳，以二分查找将全部标签区间一次性映射为轨迹点索引范围，
+    子轨迹文件命名与traj_segmentation_one_folder相同：用户_轨迹文件名_子轨迹id_交通方式.txt。
+
+    :param folder_path: 欲处理的轨迹文件所属志愿者编号文件夹路径。
+    :param output_path: 子轨迹输出文件夹路径。
+    :param chunksize: 给定时按该点数分块处理每个轨迹文件（轨迹点需按时间升序），用于无法一次载入内存的大文件
+    :param catalog: 轨迹片段目录（SegmentCatalog），给定时登记输出的片段
+    :return: 输出的子轨迹文件路径列表
+    """
+    # 读取交通方式标签数据，按开始时间排序（稳定排序，保持同时开始标签的原有顺序）
+    labelsDF = trw.read_label_txt(folder_path)
+    labelsDF = labelsDF.sort_values('start_time', kind='stable').reset_index(drop=True)
+    seg_start_times = labelsDF['start_time'].values.astype('datetime64[ns]').astype(np.int64)
+    seg_end_times = labelsDF['end_time'].values.astype('datetime64[ns]').astype(np.int64)
+    seg_modes = labelsDF['mode'].values
+    user = os.path.basename(os.path.normpath(folder_path))
+    traj_folder_path = os.path.join(folder_path, "Trajectory")  # 轨迹文件所在文件夹路径
+    sub_traj_paths = []
+
+    for traj_file_name in sorted(os.listdir(traj_folder_path)):
+        if chunksize is not None:
+            sub_traj_paths.extend(traj_segmentation_one_file_chunked(
+                os.path.join(traj_folder_path, traj_file_name), output_path, user, labelsDF, chunksize, catalog))
+            continue
+        trajectoryDF = trw.read_traj_txt(os.path.join(traj_folder_path, traj_file_name))
+        timestamps = trajectoryDF['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            trajectoryDF = trajectoryDF.iloc[order].reset_index(drop=True)
+            timestamps = timestamps[order]
+        label_index, starts, ends = interval_join(timestamps, seg_start_times, seg_end_times)
+        # 子轨迹id，以轨迹文件为单次递增空间
+        for sub_traj_id, (ilabel, start, end) in enumerate(zip(label_index, starts, ends), 1):
+            sub_traj = trajectoryDF.iloc[start:end].copy()
+            # 为有出行方式标签的数据增加一列属性表征各个轨迹点的所属出行方式‘mode’
+            sub_traj.loc[:, 'mode'] = seg_modes[ilabel]
+            sub_traj_path = os.path.join(output_path, "{0}_{1}_{2}_{3}.txt".format(
+                user, traj_file_name.split('.')[0], sub_traj_id, seg_modes[ilabel]))
+            sub_traj.to_csv(sub_traj_path, sep=',', index=False, header=False)
+            ins.count('segments_written')
+            ins.count('points_written', end - start)
+            ins.count_file('bytes_written', sub_traj_path)
+            if catalog is not None:
+                catalog.add_frame(user, traj_file_name.split('.')[0], sub_traj_id, seg_modes[ilabel], sub_traj,
+                                  os.path.abspath(sub_traj_path))
+            sub_traj_paths.append(sub_traj_path)
+    return sub_traj_paths
+
+
+@ins.timed('training_traj_segmentation', is_stage=True)
+def training_traj_segmentation(data_path, output_path, chunksize=None, catalog_path=None):
     """
     批量处理：根据交通方式标签文件分割轨迹片段（实验标准数据准备阶段）。
 
     :param data_path: 要处理的轨迹数据文件夹路径。
     :param output_path: 分段轨迹文件存储路径。
+    :param chunksize: 给定时分块处理每个轨迹文件，见traj_segmentation_one_folder_join
+    :param catalog_path: 轨迹片段目录（SQLite）路径，给定时登记输出的全部片段
     """
+    catalog = sc.SegmentCatalog(catalog_path) if catalog_path is not None else None
     # 获取轨迹文件夹列表
     traj_folder_list = os.listdir(data_path)
     # 对数据文件夹中的各个文件进行操作
@@ -155,7 +361,11 @@ def training_traj_segmentation(data_path, output_path):
         # 判断该文件是否为文件夹：是，则进行单文件夹轨迹片段分割；否，不处理跳过。
         if not os.path.isdir(traj_folder_path):
             continue
-        traj_segmentation_one_folder(traj_folder_path, output_path)
+        traj_segmentation_one_folder_join(traj_folder_path, output_path, chunksize, catalog)
+        if catalog is not None:
+            catalog.commit()  # 每个user提交一次
+    if catalog is not None:
+        catalog.close()
 
 
 if __name__ == '__main__':
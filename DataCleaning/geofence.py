@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 地理围栏：从本地GeoJSON/WKT文件加载任意（多）多边形区域，如城区、多个都市圈，
+#              以STRtree空间索引及预处理几何批量判断轨迹点所属区域。
+#              区域坐标按GeoJSON惯例为 (lon, lat)；点落在多个重叠区域内时，取文件中最先出现的区域。
+import json
+import numpy as np
+import shapely
+import shapely.wkt
+from shapely.geometry import shape
+
+OUTSIDE = -1  # 不属于任何区域的点的区域编号
+
+
+class Geofence(object):
+
+    def __init__(self, geometries, region_ids=None):
+        """
+        由几何对象构建地理围栏。
+
+        :param geometries: (多)多边形列表，坐标为 (lon, lat)
+        :param region_ids: 各区域的标识（如区县名称），默认为序号
+        """
+        self.geometries = np.array(geometries, dtype=object)
+        self.region_ids = list(region_ids) if region_ids is not None else list(range(len(geometries)))
+        shapely.prepare(self.geometries)  # 预处理几何，加速重复的点包含判断
+        self.tree = shapely.STRtree(self.geometries)
+
+    def __len__(self):
+        return len(self.region_ids)
+
+    def assign(self, lat, lon, chunk_size=1000000):
+        """
+        批量判断各点所属区域（不含边界）。
+
+        :param lat: 纬度数组
+        :param lon: 经度数组
+        :param chunk_size: 每次查询的点数，控制临时几何对象占用的内存
+        :return: 各点所属区域在region_ids中的序号，不在任何区域内为OUTSIDE
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        region = np.full(len(lat), len(self.region_ids), dtype=np.int64)
+        for start in range(0, len(lat), chunk_size):
+            points = shapely.points(lon[start:start + chunk_size], lat[start:start + chunk_size])
+            point_index, region_index = self.tree.query(points, predicate='within')
+            # 重叠区域取序号最小者，结果与查询顺序无关
+            np.minimum.at(region, point_index + start, region_index)
+        region[region == len(self.region_ids)] = OUTSIDE
+        return region
+
+    def contains(self, lat, lon):
+        """
+        批量判断各点是否在任一区域内。
+        """
+        return self.assign(lat, lon) != OUTSIDE
+
+    def region_of(self, region_index):
+        """
+        将区域序号数组转换为区域标识列表，区域外为None。
+        """
+        return [self.region_ids[i] if i != OUTSIDE else None for i in region_index]
+
+
+def load_geofence_geojson(geojson_path, id_property=None):
+    """
+    从GeoJSON文件加载地理围栏，支持FeatureCollection、Feature及单个几何对象。
+
+    :param geojson_path: GeoJSON文件路径
+    :param id_property: 作为区域标识的要素属性名，默认为要素序号
+    :return: Geofence
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as fp:
+        data = json.load(fp)
+    if data.get('type') == 'FeatureCollection':
+        features = data['features']
+    elif data.get('type') == 'Feature':
+        features = [data]
+    else:
+        features = [{'type': 'Feature', 'geometry': data, 'properties': {}}]
+    geometries = [shape(feature['geometry']) for feature in features]
+    if id_property is None:
+        region_ids = list(range(len(features)))
+    else:
+        region_ids = [feature.get('properties', {}).get(id_property) for feature in features]
+    return Geofence(geometries, region_ids)
+
+
+def load_geofence_wkt(wkt_path):
+    """
+    从WKT文本文件加载地理围栏，每行一个区域，格式为 "WKT" 或 "区域标识<Tab>WKT"。
+
+    :param wkt_path: WKT文件路径
+    :return: Geofence
+    """
+    geometries = []
+    region_ids = []
+    with open(wkt_path, 'r', encoding='utf-8') as fp:
+        for line in fp:
+            line = line.strip()
+            if not line:
+                continue
+            if '\t' in line:
+                region_id, wkt_text = line.split('\t', 1)
+            else:
+                region_id, wkt_text = len(geometries), line
+            geometries.append(shapely.wkt.loads(wkt_text))
+            region_ids.append(region_id)
+    return Geofence(geometries, region_ids)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 出行方式标签区间索引：由全部用户的labels.txt构建，批量回答"用户U在时刻t的出行方式"。
+#              各用户的标签区间预先拆分为互不重叠的基本区间，查询时以二分查找定位。
+#              标签重叠时取开始时间最早者，开始时间相同时取文件中靠前者；标签行无需有序。
+import os
+import numpy as np
+import FileOperation.traj_read_and_write as trw
+
+UNLABELED = -1  # 无标签时刻的出行方式编码
+
+
+def user_label_intervals(labelsDF, mode_codes):
+    """
+    将一个用户的标签拆分为互不重叠的基本区间。
+
+    :param labelsDF: 标签数据（read_label_txt的结果），时间区间为闭区间 [start_time, end_time]
+    :param mode_codes: 出行方式 -> 编码 的字典，遇到新的出行方式时追加
+    :return: (基本区间起点数组（int64纳秒）, 各基本区间的出行方式编码)，
+             第k个基本区间为 [boundaries[k], boundaries[k+1])，最后一个基本区间之后无标签
+    """
+    starts = labelsDF['start_time'].values.astype('datetime64[ns]').astype(np.int64)
+    ends = labelsDF['end_time'].values.astype('datetime64[ns]').astype(np.int64) + 1  # 转为半开区间
+    valid = ends > starts
+    starts, ends, modes = starts[valid], ends[valid], labelsDF['mode'].values[valid]
+    boundaries = np.unique(np.concatenate((starts, ends)))
+    codes = np.full(len(boundaries), UNLABELED, dtype=np.int32)
+    # 按优先级从低到高依次覆盖：开始时间晚者优先级低，开始时间相同时文件中靠后者优先级低
+    priority = np.lexsort((np.arange(len(starts)), starts))
+    for i in priority[::-1]:
+        if modes[i] not in mode_codes:
+            mode_codes[modes[i]] = len(mode_codes)
+        lo = np.searchsorted(boundaries, starts[i])
+        hi = np.searchsorted(boundaries, ends[i])
+        codes[lo:hi] = mode_codes[modes[i]]
+    return boundaries, codes
+
+
+class LabelIndex(object):
+
+    def __init__(self, users, offsets, boundaries, codes, modes):
+        """
+        出行方式标签区间索引，各用户的基本区间首尾相接存放。
+
+        :param users: 用户编号数组
+        :param offsets: 偏移量数组，第k个用户的基本区间位于 [offsets[k], offsets[k+1])
+        :param boundaries: 基本区间起点（int64纳秒）
+        :param codes: 各基本区间的出行方式编码
+        :param modes: 出行方式名称，下标即编码
+        """
+        self.users = np.asarray(users, dtype=str)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.boundaries = np.asarray(boundaries, dtype=np.int64)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.modes = np.asarray(modes, dtype=str)
+        self.user_position = {user: k for k, user in enumerate(self.users)}
+
+    def lookup_codes(self, users, timestamps):
+        """
+        批量查询各(用户, 时刻)的出行方式编码。
+
+        :param users: 用户编号，单个编号或与timestamps等长的数组
+        :param timestamps: 时刻数组（datetime64或int64纳秒）
+        :return: 出行方式编码数组，无标签为UNLABELED
+        """
+        timestamps = np.asarray(timestamps)
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            timestamps = timestamps.astype('datetime64[ns]').astype(np.int64)
+        timestamps = timestamps.astype(np.int64)
+        users = np.broadcast_to(np.asarray(users, dtype=str), timestamps.shape)
+        result = np.full(len(timestamps), UNLABELED, dtype=np.int32)
+        unique_users, inverse = np.unique(users, return_inverse=True)
+        for k, user in enumerate(unique_users):
+            if user not in self.user_position:
+                continue
+            position = self.user_position[user]
+            lo, hi = self.offsets[position], self.offsets[position + 1]
+            points = np.flatnonzero(inverse == k)
+            interval = np.searchsorted(self.boundaries[lo:hi], timestamps[points], side='right') - 1
+            labeled = interval >= 0
+            result[points[labeled]] = self.codes[lo:hi][interval[labeled]]
+        return result
+
+    def lookup(self, users, timestamps):
+        """
+        批量查询各(用户, 时刻)的出行方式。
+
+        :return: 出行方式数组（object），无标签为None
+        """
+        codes = self.lookup_codes(users, timestamps)
+        result = np.full(len(codes), None, dtype=object)
+        labeled = codes != UNLABELED
+        result[labeled] = self.modes[codes[labeled]]
+        return result
+
+    def save(self, index_path):
+        """
+        将索引缓存至磁盘（npz）。
+        """
+        np.savez(index_path, users=self.users, offsets=self.offsets, boundaries=self.boundaries,
+                 codes=self.codes, modes=self.modes)
+
+
+def build_label_index(data_path):
+    """
+    由数据文件夹下各用户的labels.txt构建标签区间索引。
+
+    :param data_path: 数据文件夹路径，其下为各用户文件夹（如 010/labels.txt）
+    :return: LabelIndex
+    """
+    mode_codes = {}
+    users = []
+    boundaries = []
+    codes = []
+    for folder_name in sorted(os.listdir(data_path)):
+        folder_path = os.path.join(data_path, folder_name)
+        if not os.path.exists(os.path.join(folder_path, "labels.txt")):
+            continue
+        user_boundaries, user_codes = user_label_intervals(trw.read_label_txt(folder_path), mode_codes)
+        users.append(folder_name)
+        boundaries.append(user_boundaries)
+        codes.append(user_codes)
+    offsets = np.zeros(len(users) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in boundaries], out=offsets[1:])
+    modes = sorted(mode_codes, key=mode_codes.get)
+    return LabelIndex(users, offsets,
+                      np.concatenate(boundaries) if boundaries else np.zeros(0, dtype=np.int64),
+                      np.concatenate(codes) if codes else np.zeros(0, dtype=np.int32), modes)
+
+
+def load_label_index(index_path):
+    """
+    读取缓存的标签区间索引。
+    """
+    with np.load(index_path) as data:
+        return LabelIndex(data['users'], data['offsets'], data['boundaries'], data['codes'], data['modes'])
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 轨迹数据模型：以类型固定的NumPy列存储一条轨迹，lat、lon为float64，alt为float32，timestamp为int64纪元纳秒，
+#              可附带轨迹点特征列及元数据（user、轨迹文件、出行方式）。切片为零拷贝视图；
+#              逐点访问返回带__slots__的轻量记录，代替DataFrame的iloc及test/TrajPoint.py中带__dict__的逐点对象。
+import numpy as np
+import pandas as pd
+import FeatureExtracting.point_features as pf
+
+COLUMN_TYPES = {'lat': np.float64, 'lon': np.float64, 'alt': np.float32, 'timestamp': np.int64}  # 基本列及其类型
+
+
+class TrajPointRecord(object):
+    __slots__ = ('lat', 'lon', 'alt', 'timestamp', 'features')
+
+    def __init__(self, lat, lon, alt, timestamp, features=None):
+        """
+        轨迹点记录。
+
+        :param lat: 纬度
+        :param lon: 经度
+        :param alt: 高程
+        :param timestamp: 时间戳（int64纪元纳秒）
+        :param features: 以特征列名为键的特征值字典
+        """
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+        self.timestamp = timestamp
+        self.features = features if features is not None else {}
+
+    def __repr__(self):
+        return "TrajPointRecord(lat={0}, lon={1}, alt={2}, timestamp={3})".format(
+            self.lat, self.lon, self.alt, np.datetime64(self.timestamp, 'ns'))
+
+
+class Trajectory(object):
+    __slots__ = ('lat', 'lon', 'alt', 'timestamp', 'features', 'user', 'traj', 'segment', 'mode')
+
+    def __init__(self, lat, lon, alt, timestamp, features=None, user=None, traj=None, segment=None, mode=None):
+        """
+        由各列数组构建轨迹；类型已符合时不复制数据。
+
+        :param lat: 纬度数组
+        :param lon: 经度数组
+        :param alt: 高程数组
+        :param timestamp: 时间戳数组（datetime64或int64纪元纳秒）
+        :param features: 以特征列名为键的轨迹点特征数组字典，如cal_point_features的结果
+        :param user: user编号，如 '010'
+        :param traj: 轨迹文件名（不含扩展名）
+        :param segment: 轨迹片段id
+        :param mode: 出行方式
+        """
+        timestamp = np.asarray(timestamp)
+        if np.issubdtype(timestamp.dtype, np.datetime64):
+            timestamp = timestamp.astype('datetime64[ns]').view(np.int64)
+        self.lat = np.asarray(lat, dtype=COLUMN_TYPES['lat'])
+        self.lon = np.asarray(lon, dtype=COLUMN_TYPES['lon'])
+        self.alt = np.asarray(alt, dtype=COLUMN_TYPES['alt'])
+        self.timestamp = np.asarray(timestamp, dtype=COLUMN_TYPES['timestamp'])
+        point_num = len(self.lat)
+        if not (len(self.lon) == len(self.alt) == len(self.timestamp) == point_num):
+            raise ValueError("轨迹各列长度不一致")
+        self.features = {}
+        for name, values in (features or {}).items():
+            self.set_feature(name, values)
+        self.user = user
+        self.traj = traj
+        self.segment = segment
+        self.mode = mode
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, item):
+        """
+        整数下标返回轨迹点记录；切片返回子轨迹（零拷贝视图）。
+        """
+        if isinstance(item, slice):
+            return self.slice(item)
+        return self.point(item)
+
+    def __repr__(self):
+        return "Trajectory(user={0}, traj={1}, segment={2}, mode={3}, points={4})".format(
+            self.user, self.traj, self.segment, self.mode, len(self))
+
+    @property
+    def datetime(self):
+        """
+        时间戳的datetime64[ns]视图（零拷贝）。
+        """
+        return self.timestamp.view('datetime64[ns]')
+
+    def set_feature(self, name, values):
+        """
+        添加或替换一列轨迹点特征。
+        """
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError("特征列 {} 的长度与轨迹点数不一致".format(name))
+        self.features[name] = values
+
+    def slice(self, item):
+        """
+        按切片截取子轨迹，各列（含特征列）均为原数组的视图，元数据沿用原轨迹。
+
+        :param item: slice对象（步长可为任意整数，仍为视图）
+        """
+        return Trajectory(self.lat[item], self.lon[item], self.alt[item], self.timestamp[item],
+                          {name: values[item] for name, values in self.features.items()},
+                          self.user, self.traj, self.segment, self.mode)
+
+    def point(self, index):
+        """
+        第index个轨迹点的记录。
+        """
+        return TrajPointRecord(float(self.lat[index]), float(self.lon[index]), float(self.alt[index]),
+                               int(self.timestamp[index]),
+                               {name: values[index].item() for name, values in self.features.items()})
+
+    def iter_points(self):
+        """
+        依次遍历全部轨迹点记录。
+        """
+        feature_items = [(name, values.tolist()) for name, values in self.features.items()]
+        for i, (lat, lon, alt, timestamp) in enumerate(zip(self.lat.tolist(), self.lon.tolist(),
+                                                           self.alt.tolist(), self.timestamp.tolist())):
+            yield TrajPointRecord(lat, lon, alt, timestamp, {name: values[i] for name, values in feature_items})
+
+    def cal_point_features(self):
+        """
+        计算轨迹点特征（与前一点的距离、速度、加速度、航向角、转向角）并存为特征列。
+
+        :return: self
+        """
+        features = pf.cal_point_features(self.lat, self.lon, self.datetime)
+        for name in pf.FEATURE_COLUMNS:
+            self.set_feature(name, features[name])
+        return self
+
+    def to_arrays(self):
+        """
+        转为各列数组字典（与read_plt_arrays、TrajStore.get的结果格式相同），含特征列。
+        """
+        arrays = {'lat': self.lat, 'lon': self.lon, 'alt': self.alt, 'timestamp': self.timestamp}
+        arrays.update(self.features)
+        return arrays
+
+    def to_frame(self, with_mode=False):
+        """
+        转为DataFrame，列依次为lat、lon、alt、timestamp（datetime64）、[mode]及各特征列，
+        与read_traj_txt、read_mode_traj、add_features_to_txt输出的列顺序一致。
+
+        :param with_mode: 是否添加出行方式列
+        """
+        trajDF = pd.DataFrame({'lat': self.lat, 'lon': self.lon, 'alt': self.alt, 'timestamp': self.datetime})
+        if with_mode:
+            trajDF['mode'] = self.mode
+        for name, values in self.features.items():
+            trajDF[name] = values
+        return trajDF
+
+    @classmethod
+    def from_arrays(cls, arrays, user=None, traj=None, segment=None, mode=None):
+        """
+        由各列数组字典构建轨迹，如read_plt_arrays、TrajStore.get的结果；其余键作为特征列。
+        """
+        features = {name: values for name, values in arrays.items() if name not in COLUMN_TYPES}
+        return cls(arrays['lat'], arrays['lon'], arrays['alt'], arrays['timestamp'], features,
+                   user, traj, segment, mode)
+
+    @classmethod
+    def from_frame(cls, trajDF, user=None, traj=None, segment=None, mode=None):
+        """
+        由DataFrame构建轨迹，列名同read_traj_txt；含mode列且未指定mode时取其首个值，轨迹点特征列作为特征列。
+        """
+        if mode is None and 'mode' in trajDF.columns and len(trajDF):
+            mode = trajDF['mode'].iloc[0]
+        features = {name: trajDF[name].to_numpy() for name in pf.FEATURE_COLUMNS if name in trajDF.columns}
+        return cls(trajDF['lat'].to_numpy(), trajDF['lon'].to_numpy(), trajDF['alt'].to_numpy(),
+                   trajDF['timestamp'].to_numpy(), features, user, traj, segment, mode)
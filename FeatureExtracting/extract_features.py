@@ -4,10 +4,19 @@
 # description: 提取各轨迹点的基本特征，如速度、加速度、转向角度。
 #              提取轨迹点间的特征：时间、距离等
 #              提取90速度、最大加速度……
+import functools
 import math
 import os
+import tempfile
+import numpy as np
 import pandas as pd
 import FileOperation.traj_read_and_write as trw
+import FileOperation.feature_matrix as fm
+import FeatureExtracting.feature_cache as fc
+import FeatureExtracting.point_features as pf
+import FeatureExtracting.segment_statistics as ss
+import Pipeline.instrumentation as ins
+import Pipeline.parallel as parallel
 
 
 def delta_time(t1, t2):
@@ -108,61 +117,135 @@ def get_steering_angle(azimuth1, azimuth2):
 def cal_common_feature(trajDF):
     """
     计算包括①与前一点的距离 ②速度 ③加速度 ④航向角 ⑤转向角 在内的轨迹点特征。
+    整条轨迹一次性向量化计算，单点对计算仍可使用上方的标量函数。
 
     :param trajDF: 轨迹数据
     :return: 添加特征属性后的trajDF
     """
-    distance = [0]  # 第1点的距离默认为0
-    velocity = [0]  # 第1点的速度默认为0
-    accelerate = [0]  # 第1点的加速度默认为0
-    bearing = []  # 航向
-    # 起点处的航向
-    azimuth = get_azimuth(trajDF.iloc[0, 0], trajDF.iloc[0, 1], trajDF.iloc[1, 0], trajDF.iloc[1, 1])
-    bearing.append(azimuth)
-    steering_angle = [0]  # 转向角，第一点和最后一点默认为0
-    for i in range(1, len(trajDF)):
-        deltaT = delta_time(trajDF.iloc[i - 1, 3], trajDF.iloc[i, 3])  # 与前一点的时间差 s
-        # 计算距离 m
-        s = cal_distance(trajDF.iloc[i - 1, 0], trajDF.iloc[i - 1, 1], trajDF.iloc[i, 0], trajDF.iloc[i, 1])
-        distance.append(s)  # 第i点与前一点的距离
-        # 计算速度
-        vi = get_velocity(s, deltaT)
-        velocity.append(vi)
-        # 计算加速度
-        ai = get_accelerate(velocity[i], velocity[i - 1], deltaT)
-        accelerate.append(ai)
-        if i != len(trajDF) - 1:
-            # 计算航向角
-            azimuth = get_azimuth(trajDF.iloc[i, 0], trajDF.iloc[i, 1], trajDF.iloc[i + 1, 0], trajDF.iloc[i + 1, 1])
-            bearing.append(azimuth)
-            # 计算转向角
-            steer = get_steering_angle(bearing[i - 1], bearing[i])
-            steering_angle.append(steer)
-        else:
-            bearing.append(0)  # 最后一点的航向角默认为0
-            steering_angle.append(0)  # 最后一点的转向角默认为0
-    trajDF['distance'] = distance
-    trajDF['velocity'] = velocity
-    trajDF['accelerate'] = accelerate
-    trajDF['bearing'] = bearing
-    trajDF['steering_A'] = steering_angle
+    features = pf.cal_point_features(trajDF.iloc[:, 0].values, trajDF.iloc[:, 1].values, trajDF.iloc[:, 3].values)
+    for column in pf.FEATURE_COLUMNS:
+        trajDF[column] = features[column]
     return trajDF
 
 
-def add_features_to_txt(path):
+def cal_common_feature_batch(trajDF_list):
+    """
+    批量计算多条轨迹的轨迹点特征，所有轨迹拼接后一次计算，轨迹之间互不影响。
+
+    :param trajDF_list: 轨迹数据列表
+    :return: 添加特征属性后的轨迹数据列表
+    """
+    if len(trajDF_list) == 0:
+        return trajDF_list
+    offsets = pf.offsets_from_lengths([len(trajDF) for trajDF in trajDF_list])
+    lat = np.concatenate([trajDF.iloc[:, 0].values for trajDF in trajDF_list])
+    lon = np.concatenate([trajDF.iloc[:, 1].values for trajDF in trajDF_list])
+    timestamps = np.concatenate([trajDF.iloc[:, 3].values for trajDF in trajDF_list])
+    features = pf.cal_point_features_batch(lat, lon, timestamps, offsets)
+    for column in pf.FEATURE_COLUMNS:
+        for trajDF, values in zip(trajDF_list, pf.split_by_offsets(features[column], offsets)):
+            trajDF[column] = values
+    return trajDF_list
+
+
+@ins.timed('add_features_to_txt', is_stage=True)
+def add_features_to_txt(path, chunksize=None):
     """
     给轨迹文件中各轨迹点添加特征值。
 
     :param path: 轨迹文件存放路径
+    :param chunksize: 给定时分块处理每个轨迹文件，见add_features_one_file
     :return:
     """
     traj_files = os.listdir(path)  # 轨迹文件列表
     # 依次处理每个轨迹文件
     for file in traj_files:
-        traj_path = os.path.join(path, file)
-        trajDF = trw.read_mode_traj(traj_path)  # 由于经过前期处理，每条轨迹点数不为0，故可不讨论为0的情况
-        featureDF = cal_common_feature(trajDF)
-        featureDF.to_csv(traj_path, sep=',', index=False, header=True)
+        add_features_one_file(os.path.join(path, file), chunksize)
+
+
+@ins.timed()
+def add_features_one_file(traj_path, chunksize=None):
+    """
+    给单个轨迹文件中各轨迹点添加特征值。
+
+    :param traj_path: 轨迹文件路径
+    :param chunksize: 给定时按该点数分块处理，用于无法一次载入内存的大文件
+    """
+    if chunksize is not None:
+        add_features_one_file_chunked(traj_path, chunksize)
+        return
+    trajDF = trw.read_mode_traj(traj_path)  # 由于经过前期处理，每条轨迹点数不为0，故可不讨论为0的情况
+    featureDF = cal_common_feature(trajDF)
+    featureDF.to_csv(traj_path, sep=',', index=False, header=True)
+
+
+def add_features_one_file_chunked(traj_path, chunksize=1000000):
+    """
+    分块给单个轨迹文件中各轨迹点添加特征值，结果与整文件计算相同。
+    某点的加速度依赖前两点，航向角、转向角依赖后一点，因此每块计算时在前面带上已输出的最后两点作为上下文，
+    并保留本块最后一点至下一块（其航向角需要下一点，且文件最后一点取默认值）。
+    先写入临时文件，完成后替换原文件。
+
+    :param traj_path: 轨迹文件路径
+    :param chunksize: 每块读取的轨迹点数
+    """
+    context_num = 2  # 上下文点数
+    tmp_path = traj_path + '.tmp'
+    context = None  # 已输出的最后两点
+    pending = None  # 尚未输出的点
+    with open(tmp_path, 'w', newline='') as fp:
+        header = True
+        for trajDF in trw.read_mode_traj_chunks(traj_path, chunksize):
+            if pending is not None:
+                trajDF = pd.concat([pending, trajDF], ignore_index=True)
+            skip = 0
+            if context is not None:
+                trajDF = pd.concat([context, trajDF], ignore_index=True)
+                skip = len(context)
+            featureDF = cal_common_feature(trajDF.copy())
+            featureDF.iloc[skip:-1].to_csv(fp, sep=',', index=False, header=header,
+                                           date_format=trw.CSV_DATE_FORMAT)
+            header = False
+            pending = trajDF.iloc[-1:]
+            context = trajDF.iloc[max(len(trajDF) - 1 - context_num, 0):-1]
+        if pending is not None:
+            trajDF = pd.concat([context, pending], ignore_index=True)
+            featureDF = cal_common_feature(trajDF.copy())
+            featureDF.iloc[len(context):].to_csv(fp, sep=',', index=False, header=header,
+                                                 date_format=trw.CSV_DATE_FORMAT)
+    os.replace(tmp_path, traj_path)
+
+
+@ins.timed('add_features_to_txt_parallel', is_stage=True)
+def add_features_to_txt_parallel(path, workers=None, chunksize=16):
+    """
+    给轨迹文件中各轨迹点添加特征值（多进程版本）。
+
+    :param path: 轨迹文件存放路径
+    :param workers: 进程数，默认为CPU核数
+    :param chunksize: 每次提交给进程池的文件数
+    :return: 以文件名为键的处理失败文件的异常信息
+    """
+    traj_paths = [os.path.join(path, file) for file in os.listdir(path)]
+    _, errors = parallel.run_tasks(add_features_one_file, traj_paths, workers, chunksize)
+    ins.count('files_failed', len(errors))
+    return {os.path.basename(traj_path): error for traj_path, error in errors.items()}
+
+
+@ins.timed('add_features_to_txt_batch', is_stage=True)
+def add_features_to_txt_batch(path, batch_size=5000):
+    """
+    给轨迹文件中各轨迹点添加特征值（批量版本），每batch_size个文件合并为一次计算。
+
+    :param path: 轨迹文件存放路径
+    :param batch_size: 每批处理的轨迹文件数
+    """
+    traj_files = os.listdir(path)  # 轨迹文件列表
+    for batch_start in range(0, len(traj_files), batch_size):
+        traj_paths = [os.path.join(path, file) for file in traj_files[batch_start:batch_start + batch_size]]
+        trajDF_list = cal_common_feature_batch([trw.read_mode_traj(traj_path) for traj_path in traj_paths])
+        for traj_path, featureDF in zip(traj_paths, trajDF_list):
+            featureDF.to_csv(traj_path, sep=',', index=False, header=True)
 
 
 def extract_distance_part(trajDF):
@@ -257,26 +340,190 @@ def extract_steering_part(trajDF):
     return steering
 
 
-def extract_features(path, target_path):
+@ins.timed('extract_features', is_stage=True)
+def extract_features(path, target_path, chunksize=None):
     """
     提取每条轨迹的特征。
 
     :param path: 带特征的轨迹文件存放路径
     :param target_path: 特征存放路径
+    :param chunksize: 给定时分块读取每个轨迹文件，见extract_features_one_file
     """
     traj_files = os.listdir(path)  # 轨迹文件列表
     # 依次处理每个轨迹文件
     for file in traj_files:
-        feature_vector = []  # 由5部分组成：距离、速度、加速度、航向角、转向角
-        traj_path = os.path.join(path, file)
+        extract_features_one_file(os.path.join(path, file), target_path, chunksize)
+
+
+def extract_feature_vector_chunked(traj_path, chunksize=1000000):
+    """
+    分块读取带特征的轨迹文件并提取特征向量，结果与整文件计算相同。
+    分位数需要整列排序，各块只保留参与统计的5列数值并写入临时文件，统计时以内存映射读取，逐列排序。
+
+    :param traj_path: 带特征的轨迹文件路径
+    :param chunksize: 每块读取的轨迹点数
+    :return: 33个特征值组成的列表
+    """
+    columns = ['distance'] + ss.STAT_COLUMNS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        column_paths = {column: os.path.join(tmp_dir, column) for column in columns}
+        column_files = {column: open(column_paths[column], 'wb') for column in columns}
+        point_num = 0
+        for trajDF in trw.read_traj_with_feature_chunks(traj_path, chunksize, usecols=columns):
+            for column in columns:
+                trajDF[column].to_numpy(dtype=np.float64).tofile(column_files[column])
+            point_num += len(trajDF)
+        for fp in column_files.values():
+            fp.close()
+        if point_num == 0:
+            return ss.segment_feature_matrix({column: np.zeros(0) for column in columns}, [0, 0])[0].tolist()
+        features = {column: np.memmap(column_paths[column], dtype=np.float64, mode='r', shape=(point_num,))
+                    for column in columns}
+        feature_vector = ss.segment_feature_matrix(features, [0, point_num])[0].tolist()
+        del features
+    return feature_vector
+
+
+@ins.timed()
+def extract_features_one_file(traj_path, target_path, chunksize=None):
+    """
+    提取单条轨迹的特征，并以同名文件保存。
+
+    :param traj_path: 带特征的轨迹文件路径
+    :param target_path: 特征存放路径
+    :param chunksize: 给定时按该点数分块读取，用于无法一次载入内存的大文件
+    :return: 特征向量
+    """
+    if chunksize is not None:
+        feature_vector = extract_feature_vector_chunked(traj_path, chunksize)
+    else:
         trajDF = trw.read_traj_with_feature(traj_path)
-        feature_vector.extend(extract_distance_part(trajDF))
-        feature_vector.extend(extract_velocity_part(trajDF))
-        feature_vector.extend(extract_accelerate_part(trajDF))
-        feature_vector.extend(extract_bearing_part(trajDF))
-        feature_vector.extend(extract_steering_part(trajDF))
-        # 将特征保存为文本
+        # 由5部分组成：距离、速度、加速度、航向角、转向角，各部分统计量一次计算
+        feature_vector = ss.extract_feature_vector(trajDF)
+    # 将特征保存为文本
+    pd.DataFrame([feature_vector]).to_csv(os.path.join(target_path, os.path.basename(traj_path)),
+                                          sep=',', index=False, header=False)
+    return feature_vector
+
+
+@ins.timed('extract_features_cached', is_stage=True)
+def extract_features_cached(path, target_path, cache_path, max_bytes=fc.DEFAULT_MAX_BYTES):
+    """
+    提取每条轨迹的特征，轨迹点特征取自特征缓存（未命中时计算并写入），代替add_features_to_txt + extract_features。
+    原轨迹片段文件保持不变，修改统计方式后重新提取只需读取缓存。
+
+    :param path: 轨迹片段文件存放路径（未添加特征的training_traj_segmentation输出）
+    :param target_path: 特征存放路径
+    :param cache_path: 特征缓存目录
+    :param max_bytes: 特征缓存总大小上限（字节）
+    :return: 以文件名为键的特征向量
+    """
+    cache = fc.FeatureCache(cache_path, max_bytes)
+    feature_vectors = {}
+    for file in os.listdir(path):
+        trajDF = trw.read_mode_traj(os.path.join(path, file))
+        features = cache.point_features(trajDF['lat'].values, trajDF['lon'].values, trajDF['timestamp'].values)
+        feature_vector = ss.segment_feature_matrix(features, [0, len(trajDF)])[0].tolist()
         pd.DataFrame([feature_vector]).to_csv(os.path.join(target_path, file), sep=',', index=False, header=False)
+        feature_vectors[file] = feature_vector
+    return feature_vectors
+
+
+@ins.timed('extract_features_parallel', is_stage=True)
+def extract_features_parallel(path, target_path, workers=None, chunksize=16):
+    """
+    提取每条轨迹的特征（多进程版本）。
+
+    :param path: 带特征的轨迹文件存放路径
+    :param target_path: 特征存放路径
+    :param workers: 进程数，默认为CPU核数
+    :param chunksize: 每次提交给进程池的文件数
+    :return: (以文件名为键的特征向量, 处理失败的文件及其异常信息)
+    """
+    traj_paths = [os.path.join(path, file) for file in os.listdir(path)]
+    results, errors = parallel.run_tasks(functools.partial(extract_features_one_file, target_path=target_path),
+                                         traj_paths, workers, chunksize)
+    ins.count('files_failed', len(errors))
+    feature_vectors = {os.path.basename(traj_path): vector for traj_path, vector in results.items()}
+    return feature_vectors, {os.path.basename(traj_path): error for traj_path, error in errors.items()}
+
+
+@ins.timed('extract_features_batch', is_stage=True)
+def extract_features_batch(path, target_path, batch_size=5000):
+    """
+    提取每条轨迹的特征（批量版本），每batch_size个文件合并为一次统计。
+
+    :param path: 带特征的轨迹文件存放路径
+    :param target_path: 特征存放路径
+    :param batch_size: 每批处理的轨迹文件数
+    """
+    traj_files = os.listdir(path)  # 轨迹文件列表
+    columns = ['distance'] + ss.STAT_COLUMNS
+    for batch_start in range(0, len(traj_files), batch_size):
+        batch_files = traj_files[batch_start:batch_start + batch_size]
+        trajDF_list = [trw.read_traj_with_feature(os.path.join(path, file)) for file in batch_files]
+        offsets = pf.offsets_from_lengths([len(trajDF) for trajDF in trajDF_list])
+        features = {column: np.concatenate([trajDF[column].values for trajDF in trajDF_list]) for column in columns}
+        feature_matrix = ss.segment_feature_matrix(features, offsets)
+        for file, feature_vector in zip(batch_files, feature_matrix):
+            pd.DataFrame([feature_vector]).to_csv(os.path.join(target_path, file), sep=',', index=False, header=False)
+
+
+@ins.timed('extract_features_to_matrix', is_stage=True)
+def extract_features_to_matrix(path, matrix_path, batch_size=4096):
+    """
+    提取每条轨迹的特征，全部写入同一个特征矩阵文件，代替逐条轨迹保存的单行CSV。
+
+    :param path: 带特征的轨迹文件存放路径，文件名格式为 user_file_id_mode.txt
+    :param matrix_path: 特征矩阵文件路径（.npz 或 .parquet）
+    :param batch_size: 每批处理并写出的轨迹文件数
+    """
+    traj_files = os.listdir(path)  # 轨迹文件列表
+    columns = ['distance'] + ss.STAT_COLUMNS
+    with fm.FeatureMatrixWriter(matrix_path, batch_size) as writer:
+        for batch_start in range(0, len(traj_files), batch_size):
+            batch_files = traj_files[batch_start:batch_start + batch_size]
+            trajDF_list = [trw.read_traj_with_feature(os.path.join(path, file)) for file in batch_files]
+            offsets = pf.offsets_from_lengths([len(trajDF) for trajDF in trajDF_list])
+            features = {column: np.concatenate([trajDF[column].values for trajDF in trajDF_list])
+                        for column in columns}
+            for file, feature_vector in zip(batch_files, ss.segment_feature_matrix(features, offsets)):
+                writer.add(file, feature_vector)
+
+
+@ins.timed('segments_to_feature_matrix', is_stage=True)
+def segments_to_feature_matrix(path, matrix_path, batch_size=4096, cache_path=None):
+    """
+    由未添加特征的轨迹片段文件直接计算特征矩阵，轨迹点特征在内存中计算（或取自特征缓存），不修改轨迹片段文件。
+    文件按文件名排序写出。
+
+    :param path: 轨迹片段文件存放路径，文件名格式为 user_file_id_mode.txt
+    :param matrix_path: 特征矩阵文件路径（.npz 或 .parquet）
+    :param batch_size: 每批处理并写出的轨迹片段数
+    :param cache_path: 特征缓存目录，给定时轨迹点特征取自缓存
+    """
+    traj_files = sorted(file for file in os.listdir(path) if file.endswith('.txt'))
+    cache = fc.FeatureCache(cache_path) if cache_path is not None else None
+    columns = ['distance'] + ss.STAT_COLUMNS
+    with fm.FeatureMatrixWriter(matrix_path, batch_size) as writer:
+        for batch_start in range(0, len(traj_files), batch_size):
+            batch_files = traj_files[batch_start:batch_start + batch_size]
+            trajDF_list = [trw.read_mode_traj(os.path.join(path, file)) for file in batch_files]
+            offsets = pf.offsets_from_lengths([len(trajDF) for trajDF in trajDF_list])
+            if cache is not None:
+                point_features = [cache.point_features(trajDF['lat'].values, trajDF['lon'].values,
+                                                       trajDF['timestamp'].values) for trajDF in trajDF_list]
+                features = {column: np.concatenate([np.zeros(0)] + [values[column] for values in point_features])
+                            for column in columns}
+            elif trajDF_list:
+                features = pf.cal_point_features_batch(
+                    np.concatenate([trajDF['lat'].values for trajDF in trajDF_list]),
+                    np.concatenate([trajDF['lon'].values for trajDF in trajDF_list]),
+                    np.concatenate([trajDF['timestamp'].values for trajDF in trajDF_list]), offsets)
+            else:
+                continue
+            for file, feature_vector in zip(batch_files, ss.segment_feature_matrix(features, offsets)):
+                writer.add(file, feature_vector)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 轨迹点特征缓存：以轨迹段坐标、时间戳内容及特征计算规则版本号的哈希为键，在磁盘上保存各轨迹点特征数组，
+#              原轨迹片段文件保持不变。修改extract_features的统计方式后重新提取时，只需读取缓存并统计，无需重新计算轨迹点特征。
+#              缓存总大小超出上限时，按最近使用时间淘汰最久未用的条目，直至低于上限的90%，避免此后每次写入都触发淘汰。
+import hashlib
+import os
+import time
+import numpy as np
+import FeatureExtracting.point_features as pf
+import Pipeline.instrumentation as ins
+
+DEFAULT_MAX_BYTES = 1 << 30  # 默认缓存总大小上限：1GB
+LOW_WATER_RATIO = 0.9  # 超出上限时淘汰至上限的该比例
+STALE_TMP_SECONDS = 3600  # 临时文件超过该时长未修改时，视为写入进程已中断而遗留，予以删除
+
+
+def content_key(lat, lon, timestamps, version=pf.FEATURE_VERSION):
+    """
+    计算轨迹段内容的缓存键：坐标（float64）与时间戳（int64纪元纳秒）的字节及特征版本号的sha1哈希。
+
+    :param lat: 纬度数组
+    :param lon: 经度数组
+    :param timestamps: 时间戳数组（datetime64或int64纪元纳秒）
+    :param version: 特征计算规则版本号
+    :return: 40位十六进制字符串
+    """
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        timestamps = timestamps.astype('datetime64[ns]').view(np.int64)
+    sha1 = hashlib.sha1("point_features_v{0};{1}".format(version, len(lat)).encode())
+    sha1.update(np.ascontiguousarray(lat, dtype=np.float64).tobytes())
+    sha1.update(np.ascontiguousarray(lon, dtype=np.float64).tobytes())
+    sha1.update(np.ascontiguousarray(timestamps, dtype=np.int64).tobytes())
+    return sha1.hexdigest()
+
+
+class FeatureCache(object):
+
+    def __init__(self, cache_path, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        打开（或新建）特征缓存目录，每个条目为 cache_path/键前两位/键.npz。
+        打开时删除中断的写入遗留的临时文件。
+
+        :param cache_path: 缓存目录
+        :param max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_path, exist_ok=True)
+        self.remove_stale_tmp()
+        self.total_bytes = sum(size for _, size, _ in self.entries())
+
+    def entries(self):
+        """
+        遍历全部缓存条目的 (路径, 大小, 最近使用时间)。
+        """
+        for dir_path, _, file_names in os.walk(self.cache_path):
+            for file_name in file_names:
+                if file_name.endswith('.npz'):
+                    entry_path = os.path.join(dir_path, file_name)
+                    stat = os.stat(entry_path)
+                    yield entry_path, stat.st_size, stat.st_mtime
+
+    def remove_stale_tmp(self, max_age=STALE_TMP_SECONDS):
+        """
+        删除超过max_age秒未修改的临时文件（写入进程中断时遗留，不计入缓存大小，不会被淘汰）。
+
+        :return: 删除的文件数
+        """
+        removed_num = 0
+        now = time.time()
+        for dir_path, _, file_names in os.walk(self.cache_path):
+            for file_name in file_names:
+                if not file_name.endswith('.tmp'):
+                    continue
+                tmp_path = os.path.join(dir_path, file_name)
+                try:
+                    if now - os.stat(tmp_path).st_mtime > max_age:
+                        os.remove(tmp_path)
+                        removed_num += 1
+                except FileNotFoundError:
+                    pass  # 已写入完成并被替换
+        return removed_num
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_path, key[:2], key + '.npz')
+
+    def get(self, key):
+        """
+        读取缓存的轨迹点特征，并将该条目标记为最近使用（更新修改时间，不依赖文件系统的访问时间）。
+
+        :return: 以FEATURE_COLUMNS为键的特征数组字典，未命中时返回None
+        """
+        entry_path = self.entry_path(key)
+        try:
+            with np.load(entry_path) as data:
+                features = {column: data[column] for column in pf.FEATURE_COLUMNS}
+            os.utime(entry_path)
+        except (OSError, KeyError, ValueError):
+            # 不存在、已被其他进程淘汰或写入不完整的条目均视为未命中
+            self.misses += 1
+            ins.count('feature_cache_misses')
+            return None
+        self.hits += 1
+        ins.count('feature_cache_hits')
+        return features
+
+    def put(self, key, features):
+        """
+        写入一个条目（先写临时文件再替换，并发写入同一键时结果相同），写入后按需淘汰。
+        """
+        entry_path = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = "{0}.{1}.tmp".format(entry_path, os.getpid())
+        with open(tmp_path, 'wb') as fp:
+            np.savez(fp, **{column: np.asarray(features[column], dtype=np.float64) for column in pf.FEATURE_COLUMNS})
+        if os.path.exists(entry_path):
+            self.total_bytes -= os.path.getsize(entry_path)
+        os.replace(tmp_path, entry_path)
+        self.total_bytes += os.path.getsize(entry_path)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        """
+        按最近使用时间由旧到新删除条目，直至总大小不超过max_bytes，同时删除遗留的临时文件。
+
+        :param max_bytes: 淘汰后的总大小上限，默认为缓存上限的LOW_WATER_RATIO
+        :return: 删除的条目数
+        """
+        max_bytes = int(self.max_bytes * LOW_WATER_RATIO) if max_bytes is None else max_bytes
+        self.remove_stale_tmp()
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+        removed_num = 0
+        for entry_path, size, _ in entries:
+            if self.total_bytes <= max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            removed_num += 1
+        ins.count('feature_cache_evictions', removed_num)
+        return removed_num
+
+    def point_features(self, lat, lon, timestamps):
+        """
+        取一条轨迹段的轨迹点特征：命中时读取缓存，否则计算（同cal_point_features）并写入缓存。
+
+        :param lat: 纬度数组
+        :param lon: 经度数组
+        :param timestamps: 时间戳数组（datetime64）
+        :return: 以FEATURE_COLUMNS为键的特征数组字典
+        """
+        key = content_key(lat, lon, timestamps)
+        features = self.get(key)
+        if features is None:
+            features = pf.cal_point_features(lat, lon, timestamps)
+            self.put(key, features)
+        return features
+
+    def clear(self):
+        """
+        删除全部缓存条目。
+        """
+        self.evict(0)
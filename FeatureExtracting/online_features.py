@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 在线（流式）提取轨迹特征，用于轨迹点仍在持续到达时的出行方式识别。
+#              轨迹点特征沿用cal_common_feature的定义；最大值、最小值、均值、方差以Welford算法递推，
+#              95/75/50/25分位数以P²算法估计（短轨迹阶段精确计算）。内存占用与轨迹长度无关，任意时刻均可O(1)得到33维特征向量。
+#              前EXACT_POINTS个点内特征向量与cal_common_feature + extract_*_part完全相同；此后分位数为估计值，
+#              估计值在全部观测值中的秩与目标分位数相差约在0.05以内（航向角、转向角上相当于数度至十余度），
+#              距离总和改为逐点累加，与pandas的求和相差约1e-13。
+import bisect
+import copy
+import math
+import numpy as np
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.segment_statistics as ss
+
+EXACT_POINTS = 64  # 精确计算阶段的轨迹点数（分位数缓存大小）
+
+
+class RunningStats(object):
+
+    def __init__(self):
+        """
+        Welford算法递推计数、均值、离差平方和，同时记录最大值、最小值。
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # 离差平方和
+        self.max = -math.inf
+        self.min = math.inf
+
+    def add(self, x):
+        """
+        加入一个观测值。
+        """
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.max = max(self.max, x)
+        self.min = min(self.min, x)
+
+    def variance(self):
+        """
+        样本方差（与pandas的var一致，自由度为n-1），观测值少于2个时为NaN。
+        """
+        if self.count < 2:
+            return math.nan
+        return self.m2 / (self.count - 1)
+
+
+class P2Quantile(object):
+
+    def __init__(self, p, buffer_size=EXACT_POINTS):
+        """
+        P²算法估计单个分位数，仅保存5个标记点。
+        前buffer_size个观测值先缓存并精确计算，缓存满后以其对应分位点初始化标记点，改善短轨迹上的估计精度。
+
+        :param p: 分位数，如0.95
+        :param buffer_size: 精确计算阶段缓存的观测值个数（不少于5）
+        """
+        self.p = p
+        self.buffer_size = max(buffer_size, 5)
+        self.count = 0
+        self.buffer = []  # 精确计算阶段的观测值（升序）
+        self.heights = None  # 标记点高度
+        self.positions = None  # 标记点实际位置
+        self.desired = None  # 标记点期望位置
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]  # 期望位置增量
+
+    def init_markers(self):
+        """
+        由缓存的观测值初始化5个标记点：最小值、p/2、p、(1+p)/2分位点及最大值。
+        """
+        last = len(self.buffer) - 1
+        self.desired = [increment * last for increment in self.increments]
+        self.positions = [int(round(position)) for position in self.desired]
+        self.heights = [self.buffer[position] for position in self.positions]
+        self.buffer = []
+
+    def add(self, x):
+        """
+        加入一个观测值。
+        """
+        self.count += 1
+        if self.heights is None:
+            bisect.insort(self.buffer, x)
+            if self.count <= self.buffer_size:
+                return
+            self.init_markers()
+            return
+        q = self.heights
+        n = self.positions
+        # 找到观测值所在的区间，并更新两端标记点
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        # 调整中间三个标记点的高度与位置
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    # 抛物线插值越界时改用线性插值
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        """
+        当前分位数估计值，无观测值时为NaN。
+        """
+        if self.count == 0:
+            return math.nan
+        if self.heights is not None:
+            return self.heights[2]
+        # 精确计算，线性插值方式同pandas的quantile
+        index = (self.count - 1) * self.p
+        lower = int(math.floor(index))
+        upper = min(lower + 1, self.count - 1)
+        a, b, t = self.buffer[lower], self.buffer[upper], index - lower
+        if a == b:
+            return a
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+class ColumnSummary(object):
+
+    def __init__(self):
+        """
+        单列轨迹点特征的流式统计量：Welford统计量 + 各分位数的P²估计。
+        观测值不超过EXACT_POINTS个时另保存全部观测值，统计量按批量计算的方式精确计算。
+        """
+        self.stats = RunningStats()
+        self.quantiles = [P2Quantile(q) for q in ss.QUANTILES]
+        self.values = []  # 精确计算阶段的观测值，超出后为None
+
+    def add(self, x):
+        self.stats.add(x)
+        for estimator in self.quantiles:
+            estimator.add(x)
+        if self.values is not None:
+            self.values.append(x)
+            if len(self.values) > EXACT_POINTS:
+                self.values = None
+
+    def with_value(self, x):
+        """
+        返回加入一个临时观测值后的统计量副本，自身不变。
+        """
+        summary = copy.deepcopy(self)
+        summary.add(x)
+        return summary
+
+    def feature_part(self):
+        """
+        按extract_velocity_part等函数的顺序输出8个统计量。
+        """
+        if self.values is not None:
+            # 精确计算阶段与批量计算（segment_statistics）结果相同
+            values = np.asarray(self.values, dtype=np.float64)
+            return ss.column_statistics(values, np.array([0]), np.array([len(values)]),
+                                        np.zeros(len(values), dtype=np.int64))[0].tolist()
+        # 舍入方式同pandas（np.round）
+        part = [self.stats.max]
+        part.extend(float(np.round(estimator.value(), 4)) for estimator in self.quantiles)
+        part.append(float(np.round(self.stats.mean, 4)))
+        part.append(float(np.round(self.stats.variance(), 4)))
+        part.append(self.stats.max - self.stats.min)
+        return part
+
+
+class OnlineFeatureExtractor(object):
+
+    def __init__(self):
+        """
+        初始化在线特征提取器。
+        一个点的航向角、转向角需要下一点到达后才能确定，在此之前按"最后一点"的默认值0参与统计。
+        时间戳不晚于上一点的轨迹点被忽略（计入skipped_num），不同于批量计算时抛出ZeroDivisionError，
+        以便实时数据中偶尔出现的重复、乱序点不中断识别。
+        """
+        self.point_num = 0  # 已接收的轨迹点数
+        self.skipped_num = 0  # 因时间戳未递增而被忽略的点数
+        self.distances = [0.0]  # 精确计算阶段各点与前一点的距离，求和方式同pandas；超出后改为逐点累加
+        self.distance_sum = 0.0
+        self.summaries = {column: ColumnSummary() for column in ss.STAT_COLUMNS}
+        self.prev_point = None  # 上一点 (lat, lon, timestamp)
+        self.prev_velocity = 0
+        self.prev_bearing = None  # 上一点之前一点的航向角，用于计算转向角
+
+    def update(self, lat, lon, timestamp):
+        """
+        加入一个轨迹点。
+
+        :param lat: 纬度
+        :param lon: 经度
+        :param timestamp: 时间戳（datetime）
+        :return: 是否被接收；时间戳不晚于上一点的轨迹点会被忽略，不改变任何统计量
+        """
+        if self.prev_point is None:
+            # 第1点的距离、速度、加速度默认为0
+            for column in ['velocity', 'accelerate']:
+                self.summaries[column].add(0)
+            self.prev_point = (lat, lon, timestamp)
+            self.point_num = 1
+            return True
+
+        prev_lat, prev_lon, prev_time = self.prev_point
+        deltaT = ef.delta_time(prev_time, timestamp)
+        if deltaT <= 0:
+            self.skipped_num += 1
+            return False
+        # 当前点的距离、速度、加速度，与cal_common_feature的计算方式相同
+        s = ef.cal_distance(prev_lat, prev_lon, lat, lon)
+        vi = ef.get_velocity(s, deltaT)
+        ai = ef.get_accelerate(vi, self.prev_velocity, deltaT)
+        if self.distances is not None:
+            self.distances.append(s)
+            self.distance_sum = float(np.sum(self.distances))
+            if len(self.distances) > EXACT_POINTS:
+                self.distances = None
+        else:
+            self.distance_sum += s
+        self.summaries['velocity'].add(vi)
+        self.summaries['accelerate'].add(ai)
+        # 上一点的航向角、转向角随当前点的到达而确定
+        azimuth = ef.get_azimuth(prev_lat, prev_lon, lat, lon)
+        if self.prev_bearing is None:
+            steer = 0  # 第一点的转向角默认为0
+        else:
+            steer = ef.get_steering_angle(self.prev_bearing, azimuth)
+        self.summaries['bearing'].add(azimuth)
+        self.summaries['steering_A'].add(steer)
+
+        self.prev_point = (lat, lon, timestamp)
+        self.prev_velocity = vi
+        self.prev_bearing = azimuth
+        self.point_num += 1
+        return True
+
+    def update_many(self, lats, lons, timestamps):
+        """
+        依次加入一批轨迹点。
+
+        :return: 被接收的轨迹点数
+        """
+        accepted = 0
+        for lat, lon, timestamp in zip(lats, lons, timestamps):
+            accepted += self.update(lat, lon, timestamp)
+        return accepted
+
+    def feature_vector(self):
+        """
+        当前时刻的33维特征向量，顺序同extract_features；尚无轨迹点时返回None。
+        """
+        if self.point_num == 0:
+            return None
+        feature_vector = [self.distance_sum]
+        for column in ss.STAT_COLUMNS:
+            summary = self.summaries[column]
+            if column in ('bearing', 'steering_A'):
+                # 当前最后一点的航向角、转向角默认为0
+                summary = summary.with_value(0)
+            feature_vector.extend(summary.feature_part())
+        return feature_vector
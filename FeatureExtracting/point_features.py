@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 向量化计算轨迹点特征：与前一点的距离、速度、加速度、航向角、转向角。
+#              以NumPy数组整体运算替代逐点iloc循环，计算规则（含首末点默认值、舍入位数）与cal_common_feature一致。
+import numpy as np
+
+EARTH_RADIUS = 6378137.0  # 地球半径，单位：米
+FEATURE_COLUMNS = ['distance', 'velocity', 'accelerate', 'bearing', 'steering_A']  # 轨迹点特征列名
+FEATURE_VERSION = 1  # 轨迹点特征计算规则的版本号，修改计算规则（含默认值、舍入位数）时加1，使特征缓存失效
+
+
+def round_array(values, ndigits):
+    """
+    按Python内置round的规则对数组舍入。
+    np.round先放大再取整，在接近"5"的临界值处可能与round相差末位，此类元素改用round逐个计算。
+
+    :param values: 待舍入数组
+    :param ndigits: 保留的小数位数
+    :return: 舍入后的数组
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def delta_time_array(timestamps):
+    """
+    计算相邻轨迹点的时间间隔（s）。
+
+    :param timestamps: 时间戳数组（datetime64），或以秒为单位的数值数组
+    :return: 长度为n-1的时间间隔数组
+    """
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        # 先以整数纳秒作差，避免大数值浮点相减损失精度
+        return np.diff(timestamps.astype('datetime64[ns]').astype(np.int64)) / 1e9
+    return np.diff(timestamps.astype(np.float64))
+
+
+def cal_distance_array(lat1, lon1, lat2, lon2):
+    """
+    半正矢公式批量计算两点间的距离（m），未舍入。
+
+    :param lat1: 前一点的纬度数组
+    :param lon1: 前一点的经度数组
+    :param lat2: 后一点的纬度数组
+    :param lon2: 后一点的经度数组
+    :return: 两点间的距离数组
+    """
+    dlat = np.radians(lat2 - lat1)  # 两点纬度之差
+    dlon = np.radians(lon2 - lon1)  # 两点经度之差
+    h = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(h)) * EARTH_RADIUS
+
+
+def get_azimuth_array(lat1, lon1, lat2, lon2):
+    """
+    批量计算航向（度），保留3位小数，算法同get_azimuth。
+
+    :return: 航向角数组，范围 0~360度
+    """
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    dlon_rad = np.radians(lon2) - np.radians(lon1)
+    x = np.sin(dlon_rad) * np.cos(lat2_rad)
+    y = np.cos(lat1_rad) * np.sin(lat2_rad) - np.sin(lat1_rad) * np.cos(lat2_rad) * np.cos(dlon_rad)
+    bearing = 180 * np.arctan2(x, y) / np.pi
+    return round_array(np.mod(bearing + 360.0, 360.0), 3)
+
+
+def get_steering_angle_array(azimuth1, azimuth2):
+    """
+    批量计算转向角（度），范围 0~180度，规则同get_steering_angle。
+
+    :param azimuth1: 前一段的方位角数组
+    :param azimuth2: 后一段的方位角数组
+    :return: 转向角数组
+    """
+    steering_angle = np.where(azimuth2 <= 180 + azimuth1,
+                              np.abs(azimuth1 - azimuth2),
+                              np.mod(np.abs(360 + azimuth1 - azimuth2), 360))
+    return round_array(steering_angle, 3)
+
+
+def offsets_from_lengths(lengths):
+    """
+    由各轨迹点数生成偏移量数组。
+
+    :param lengths: 各条轨迹的点数
+    :return: 长度为轨迹数+1的偏移量数组，第k条轨迹位于 [offsets[k], offsets[k+1])
+    """
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def split_by_offsets(values, offsets):
+    """
+    按偏移量将拼接后的数组拆回各条轨迹。
+
+    :param values: 拼接后的一维数组
+    :param offsets: 偏移量数组
+    :return: 各条轨迹对应的数组视图列表
+    """
+    return [values[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
+
+
+def cal_point_features(lat, lon, timestamps):
+    """
+    计算一条轨迹全部轨迹点的特征。
+    第1点的距离、速度、加速度默认为0；最后一点的航向角默认为0；第一点和最后一点的转向角默认为0。
+    加速度沿用cal_common_feature的取值方式：(前一点速度 - 当前点速度) / ΔT。
+    相邻点时间戳相同（ΔT为0）时抛出ZeroDivisionError，同cal_common_feature。
+
+    :param lat: 纬度数组
+    :param lon: 经度数组
+    :param timestamps: 时间戳数组（datetime64或秒）
+    :return: 以FEATURE_COLUMNS为键的特征数组字典
+    """
+    return cal_point_features_batch(lat, lon, timestamps, [0, len(lat)])
+
+
+def cal_point_features_batch(lat, lon, timestamps, offsets):
+    """
+    一次计算多条轨迹全部轨迹点的特征。
+    各轨迹首尾相接存放于一维数组中，由offsets划分；跨轨迹边界的点对不参与计算，
+    每条轨迹的首末点取与cal_point_features相同的默认值。
+
+    :param lat: 拼接后的纬度数组
+    :param lon: 拼接后的经度数组
+    :param timestamps: 拼接后的时间戳数组（datetime64或秒）
+    :param offsets: 偏移量数组，第k条轨迹位于 [offsets[k], offsets[k+1])
+    :return: 以FEATURE_COLUMNS为键的特征数组字典，与输入同样按offsets划分
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    point_num = len(lat)
+    features = {column: np.zeros(point_num) for column in FEATURE_COLUMNS}
+    if point_num < 2:
+        return features
+
+    # 标记每条轨迹的首点与末点（空轨迹不产生标记）
+    non_empty = offsets[1:] > offsets[:-1]
+    is_first = np.zeros(point_num, dtype=bool)
+    is_first[offsets[:-1][non_empty]] = True
+    is_last = np.zeros(point_num, dtype=bool)
+    is_last[offsets[1:][non_empty] - 1] = True
+    # 第i个点对为 (i-1, i)，点对的后一点为轨迹首点时即跨越了轨迹边界
+    inner = ~is_first[1:]
+
+    delta_t = delta_time_array(timestamps)
+    distance = round_array(cal_distance_array(lat[:-1], lon[:-1], lat[1:], lon[1:]), 4)
+    features['distance'][1:] = np.where(inner, distance, 0)
+    # 与cal_common_feature一致，ΔT为0（时间戳重复）时报错，不写出inf/nan；跨轨迹边界的点对不参与计算，不检查
+    repeated = np.flatnonzero(inner & (delta_t == 0))
+    if len(repeated):
+        raise ZeroDivisionError("轨迹点时间间隔为0：第{}个点与前一点的时间戳相同".format(repeated[0] + 1))
+    velocity = features['velocity']
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        velocity[1:] = np.where(inner, round_array(distance / delta_t, 4), 0)
+        accelerate = round_array((velocity[:-1] - velocity[1:]) / delta_t, 4)
+    features['accelerate'][1:] = np.where(inner, accelerate, 0)
+    bearing = features['bearing']
+    bearing[:-1] = np.where(inner, get_azimuth_array(lat[:-1], lon[:-1], lat[1:], lon[1:]), 0)
+    steering = get_steering_angle_array(bearing[:-2], bearing[1:-1])
+    features['steering_A'][1:-1] = np.where(is_first[1:-1] | is_last[1:-1], 0, steering)
+    return features
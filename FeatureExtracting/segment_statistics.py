@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 轨迹段特征向量（33个）的批量统计。
+#              距离总和 + 速度、加速度、航向角、转向角各8个统计量：最大值、95/75/50/25分位数、均值、方差、极差。
+#              每列只排序一次，同时得到最值与分位数；多条轨迹段按偏移量或轨迹段id分组一并计算。
+import numpy as np
+import FeatureExtracting.point_features as pf
+
+QUANTILES = [0.95, 0.75, 0.5, 0.25]  # 提取的分位数
+STAT_COLUMNS = ['velocity', 'accelerate', 'bearing', 'steering_A']  # 需要统计的轨迹点特征列
+STAT_NAMES = ['max', 'q95', 'q75', 'q50', 'q25', 'mean', 'var', 'range']  # 每列的统计量名称
+FEATURE_NAMES = ['distance_sum'] + ['{0}_{1}'.format(column, stat) for column in STAT_COLUMNS for stat in STAT_NAMES]
+GATHER_MAX_LENGTH = 1024  # segment_sums中按长度分组一并求和的最大组长
+
+
+def sorted_quantile(sorted_values, starts, lengths, q):
+    """
+    由组内已排序的数组计算各组的分位数，线性插值方式与pandas的quantile一致。
+
+    :param sorted_values: 各组组内升序排列的数组
+    :param starts: 各组起始索引
+    :param lengths: 各组元素个数
+    :param q: 分位数
+    :return: 各组的分位数
+    """
+    virtual_index = (lengths - 1) * q
+    lower = np.floor(virtual_index).astype(np.int64)
+    upper = np.minimum(lower + 1, lengths - 1)
+    t = virtual_index - lower
+    a = sorted_values[starts + lower]
+    b = sorted_values[starts + upper]
+    diff = b - a
+    # 与numpy的插值实现保持一致：t>=0.5时自上界回推，减小舍入误差
+    result = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+    return np.where(a == b, a, result)
+
+
+def segment_sums(values, starts, lengths):
+    """
+    各组元素之和，与逐组调用np.sum（成对求和）及pandas的sum、mean、var结果逐位相同；
+    np.add.reduceat为顺序累加，末位可能不同，故不采用。
+    长度相同的短组取出为二维数组后按行一次求和（逐行仍为成对求和）；长组的逐组开销可忽略，直接逐组求和。
+
+    :param values: 拼接后的数组
+    :param starts: 各组起始索引
+    :param lengths: 各组元素个数
+    :return: 各组之和
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    sums = np.zeros(len(lengths), dtype=np.float64)
+    for k in np.flatnonzero(lengths > GATHER_MAX_LENGTH).tolist():
+        sums[k] = values[starts[k]:starts[k] + lengths[k]].sum()
+    short = np.flatnonzero((lengths > 0) & (lengths <= GATHER_MAX_LENGTH))
+    short = short[np.argsort(lengths[short], kind='stable')]  # 按长度分组
+    unique_lengths, group_starts, group_counts = np.unique(lengths[short], return_index=True, return_counts=True)
+    for length, group_start, group_count in zip(unique_lengths.tolist(), group_starts.tolist(),
+                                                group_counts.tolist()):
+        groups = short[group_start:group_start + group_count]
+        sums[groups] = values[starts[groups][:, None] + np.arange(length)].sum(axis=1)
+    return sums
+
+
+def column_statistics(values, starts, lengths, segment_index):
+    """
+    计算一列轨迹点特征在各组内的8个统计量。
+
+    :param values: 拼接后的特征数组
+    :param starts: 各组起始索引
+    :param lengths: 各组元素个数
+    :param segment_index: 各点所属的组号
+    :return: (组数, 8) 的统计量矩阵，列顺序同STAT_NAMES
+    """
+    # 组号为主键、特征值为次键排序，一次排序即得到每组内的有序序列
+    sorted_values = values[np.lexsort((values, segment_index))]
+    ends = starts + lengths
+    v_max = sorted_values[ends - 1]  # 最大值
+    v_min = sorted_values[starts]  # 最小值
+    v_mean = segment_sums(values, starts, lengths) / lengths  # 均值
+    squared_deviation = (values - np.repeat(v_mean, lengths)) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v_var = segment_sums(squared_deviation, starts, lengths) / (lengths - 1)  # 样本方差，单点时为NaN
+    stats = [v_max]
+    stats.extend(np.round(sorted_quantile(sorted_values, starts, lengths, q), 4) for q in QUANTILES)
+    stats.append(np.round(v_mean, 4))
+    stats.append(np.round(v_var, 4))
+    stats.append(v_max - v_min)  # 极差
+    return np.column_stack(stats)
+
+
+def segment_feature_matrix(features, offsets):
+    """
+    计算多条轨迹段的特征向量，各轨迹段的轨迹点特征按offsets首尾相接存放。
+
+    :param features: 以轨迹点特征列名为键的数组字典（如cal_point_features_batch的结果）
+    :param offsets: 偏移量数组，第k条轨迹段位于 [offsets[k], offsets[k+1])
+    :return: (轨迹段数, 33) 的特征矩阵，列顺序同FEATURE_NAMES；空轨迹段对应行为NaN
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    matrix = np.full((len(lengths), len(FEATURE_NAMES)), np.nan)
+    non_empty = lengths > 0
+    if not non_empty.any():
+        return matrix
+    starts = offsets[:-1][non_empty]
+    lengths = lengths[non_empty]
+    # 空轨迹段不含任何点，非空轨迹段的点恰好连续占据 [offsets[0], offsets[-1])
+    point_index = slice(offsets[0], offsets[-1])
+    compact_starts = starts - offsets[0]
+    segment_index = np.repeat(np.arange(len(lengths)), lengths)
+
+    rows = [segment_sums(np.asarray(features['distance'], dtype=np.float64)[point_index], compact_starts, lengths)]
+    for column in STAT_COLUMNS:
+        values = np.asarray(features[column], dtype=np.float64)[point_index]
+        rows.append(column_statistics(values, compact_starts, lengths, segment_index))
+    matrix[non_empty] = np.column_stack(rows)
+    return matrix
+
+
+def segment_feature_matrix_by_id(featureDF, id_column):
+    """
+    按轨迹段id分组计算特征向量，同一id的轨迹点无需相邻，组内保持原有顺序。
+
+    :param featureDF: 含轨迹点特征及轨迹段id列的数据表
+    :param id_column: 轨迹段id列名
+    :return: (轨迹段id数组, 特征矩阵)
+    """
+    segment_ids = featureDF[id_column].values
+    order = np.argsort(segment_ids, kind='stable')
+    unique_ids, counts = np.unique(segment_ids[order], return_counts=True)
+    features = {column: featureDF[column].values[order] for column in ['distance'] + STAT_COLUMNS}
+    return unique_ids, segment_feature_matrix(features, pf.offsets_from_lengths(counts))
+
+
+def extract_feature_vector(trajDF):
+    """
+    提取一条轨迹段的特征向量。
+
+    :param trajDF: 带轨迹点特征的轨迹数据
+    :return: 33个特征值组成的列表
+    """
+    features = {column: trajDF[column].values for column in ['distance'] + STAT_COLUMNS}
+    return segment_feature_matrix(features, [0, len(trajDF)])[0].tolist()
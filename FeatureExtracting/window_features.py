@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 滑动窗口提取轨迹特征，用于轨迹子段的出行方式识别。
+#              窗口按点数或时间长度沿轨迹滑动，窗口起止索引单调递增，每个轨迹点只进入、离开窗口各一次。
+#              和、均值、方差以累加量增减维护；最值与分位数由基于树状数组的顺序统计结构按秩查询。
+import numpy as np
+import pandas as pd
+import FeatureExtracting.segment_statistics as ss
+
+
+class RankTree(object):
+
+    def __init__(self, values):
+        """
+        顺序统计结构：预先对整列数值排序得到各点的秩，用树状数组记录窗口内各秩是否存在，
+        插入、删除、查询第k小均为O(log n)。
+
+        :param values: 整条轨迹的某列特征值
+        """
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(values, kind='stable')
+        self.sorted_values = values[order]
+        self.ranks = np.empty(len(values), dtype=np.int64)
+        self.ranks[order] = np.arange(len(values))
+        self.size = len(values)
+        self.tree = [0] * (self.size + 1)
+        self.count = 0
+        self.top_bit = 1 << max(self.size.bit_length() - 1, 0)
+
+    def update(self, point_index, delta):
+        """
+        将第point_index个点加入（delta=1）或移出（delta=-1）窗口。
+        """
+        i = int(self.ranks[point_index]) + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & (-i)
+        self.count += delta
+
+    def kth(self, k):
+        """
+        窗口内第k小（从0开始）的数值。
+        """
+        position = 0
+        remaining = k + 1
+        bit = self.top_bit
+        while bit:
+            next_position = position + bit
+            if next_position <= self.size and self.tree[next_position] < remaining:
+                position = next_position
+                remaining -= self.tree[next_position]
+            bit >>= 1
+        return self.sorted_values[position]
+
+    def quantile(self, q):
+        """
+        窗口内的分位数，线性插值方式同pandas的quantile。
+        """
+        index = (self.count - 1) * q
+        lower = int(np.floor(index))
+        a = self.kth(lower)
+        b = self.kth(min(lower + 1, self.count - 1))
+        t = index - lower
+        if a == b:
+            return a
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+class WindowColumn(object):
+
+    def __init__(self, values):
+        """
+        单列轨迹点特征的窗口统计量。累加量以整列均值为偏移，减小方差计算中的舍入误差。
+
+        :param values: 整条轨迹的某列特征值
+        """
+        self.values = np.asarray(values, dtype=np.float64)
+        self.shift = float(self.values.mean()) if len(self.values) else 0.0
+        self.rank_tree = RankTree(self.values)
+        self.sum = 0.0  # 偏移后的一次累加量
+        self.square_sum = 0.0  # 偏移后的二次累加量
+
+    def update(self, point_index, delta):
+        x = self.values[point_index] - self.shift
+        self.sum += delta * x
+        self.square_sum += delta * x * x
+        self.rank_tree.update(point_index, delta)
+
+    def feature_part(self):
+        """
+        按extract_velocity_part等函数的顺序输出窗口内的8个统计量。
+        """
+        n = self.rank_tree.count
+        v_max = self.rank_tree.kth(n - 1)
+        part = [v_max]
+        part.extend(np.round(self.rank_tree.quantile(q), 4) for q in ss.QUANTILES)
+        part.append(np.round(self.shift + self.sum / n, 4))
+        v_var = max(self.square_sum - self.sum * self.sum / n, 0.0) / (n - 1) if n > 1 else np.nan
+        part.append(np.round(v_var, 4))
+        part.append(v_max - self.rank_tree.kth(0))
+        return part
+
+
+def window_bounds_by_count(point_num, window_size, step=1):
+    """
+    按点数划分滑动窗口。
+    最后一个完整窗口之后仍有轨迹点时，追加一个以最后一点结尾的不完整窗口（点数少于window_size），
+    因此step不大于window_size时每个轨迹点至少属于一个窗口；step大于window_size时窗口之间的点不属于任何窗口。
+
+    :param point_num: 轨迹点数
+    :param window_size: 窗口包含的点数
+    :param step: 窗口每次滑动的点数
+    :return: (各窗口起始索引, 各窗口结束索引)，窗口为 [start, end)
+    """
+    starts = np.arange(0, max(point_num - window_size, 0) + 1, step, dtype=np.int64)
+    tail_start = starts[-1] + step
+    if starts[-1] + window_size < point_num and tail_start < point_num:
+        starts = np.append(starts, tail_start)
+    ends = np.minimum(starts + window_size, point_num)
+    return starts, ends
+
+
+def window_bounds_by_time(timestamps, window_seconds, step_seconds):
+    """
+    按时间长度划分滑动窗口，第k个窗口覆盖 [t0 + k*step, t0 + k*step + window) 内的轨迹点。
+    窗口持续滑动至覆盖最后一点，最后一个窗口可能超出轨迹的结束时间（不完整窗口）。
+
+    :param timestamps: 时间戳数组（datetime64），需按时间顺序排列
+    :param window_seconds: 窗口时长（s）
+    :param step_seconds: 窗口每次滑动的时长（s）
+    :return: (各窗口起始索引, 各窗口结束索引)，窗口为 [start, end)，可能为空窗口
+    """
+    seconds = pd.to_datetime(timestamps).values.astype('datetime64[ns]').astype(np.int64) / 1e9
+    if len(seconds) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    seconds = seconds - seconds[0]
+    window_num = int(max(seconds[-1] - window_seconds, 0) // step_seconds) + 1
+    if (window_num - 1) * step_seconds + window_seconds <= seconds[-1]:
+        window_num += 1  # 最后一点恰好落在最后一个完整窗口的右端点（不含）上
+    lefts = np.arange(window_num) * step_seconds
+    starts = np.searchsorted(seconds, lefts, side='left')
+    ends = np.searchsorted(seconds, lefts + window_seconds, side='left')
+    return starts, ends
+
+
+def window_feature_matrix(trajDF, starts, ends):
+    """
+    计算各滑动窗口的33维特征向量。窗口起止索引需单调不减。
+
+    :param trajDF: 带轨迹点特征的轨迹数据（cal_common_feature的结果）
+    :param starts: 各窗口起始索引
+    :param ends: 各窗口结束索引
+    :return: (窗口数, 33) 的特征矩阵，列顺序同FEATURE_NAMES；空窗口对应行为NaN
+    """
+    distance_prefix = np.concatenate(([0.0], np.cumsum(trajDF['distance'].values, dtype=np.float64)))
+    columns = [WindowColumn(trajDF[column].values) for column in ss.STAT_COLUMNS]
+    matrix = np.full((len(starts), len(ss.FEATURE_NAMES)), np.nan)
+    window_start = 0  # 当前窗口内点的索引范围 [window_start, window_end)
+    window_end = 0
+    for k, (start, end) in enumerate(zip(starts, ends)):
+        # 移出左端离开窗口的点；窗口间不重叠时，中间的点从未进入窗口
+        for point_index in range(window_start, min(start, window_end)):
+            for column in columns:
+                column.update(point_index, -1)
+        window_start = start
+        window_end = max(window_end, start)
+        # 加入右端新进入窗口的点
+        for point_index in range(window_end, end):
+            for column in columns:
+                column.update(point_index, 1)
+        window_end = max(window_end, end)
+        if end <= start:
+            continue  # 空窗口
+        feature_vector = [distance_prefix[end] - distance_prefix[start]]
+        for column in columns:
+            feature_vector.extend(column.feature_part())
+        matrix[k] = feature_vector
+    return matrix
+
+
+def extract_window_features(trajDF, window_size, step=1):
+    """
+    按点数滑动窗口提取特征。
+
+    :param trajDF: 带轨迹点特征的轨迹数据
+    :param window_size: 窗口包含的点数
+    :param step: 窗口每次滑动的点数
+    :return: 每个窗口一行的特征表，含窗口起止索引start、end（不含end）及33个特征
+    """
+    starts, ends = window_bounds_by_count(len(trajDF), window_size, step)
+    return window_feature_table(trajDF, starts, ends)
+
+
+def extract_time_window_features(trajDF, window_seconds, step_seconds):
+    """
+    按时间长度滑动窗口提取特征。
+
+    :param trajDF: 带轨迹点特征的轨迹数据，需含timestamp列
+    :param window_seconds: 窗口时长（s）
+    :param step_seconds: 窗口每次滑动的时长（s）
+    :return: 每个窗口一行的特征表，含窗口起止索引start、end（不含end）及33个特征
+    """
+    starts, ends = window_bounds_by_time(trajDF['timestamp'], window_seconds, step_seconds)
+    return window_feature_table(trajDF, starts, ends)
+
+
+def window_feature_table(trajDF, starts, ends):
+    """
+    将各窗口的特征矩阵整理为数据表。
+    """
+    featureDF = pd.DataFrame(window_feature_matrix(trajDF, starts, ends), columns=ss.FEATURE_NAMES)
+    featureDF.insert(0, 'start', starts)
+    featureDF.insert(1, 'end', ends)
+    return featureDF
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 将所有轨迹片段的特征向量写入同一个特征矩阵文件（.npz 或 .parquet），
+#              每行附带由文件名 user_file_id_mode.txt 解析出的用户、轨迹、片段id、出行方式及来源文件名。
+#              特征向量按批缓存后写出，内存占用与轨迹片段数无关。
+import csv
+import os
+import numpy as np
+import pandas as pd
+import FileOperation.traj_read_and_write as trw
+import FeatureExtracting.segment_statistics as ss
+
+META_COLUMNS = ['user', 'traj', 'segment_id', 'mode', 'source_file']  # 特征矩阵的元数据列
+
+
+def parquet_schema():
+    """
+    parquet特征矩阵的表结构：元数据列（segment_id为int64，其余为字符串）及33个float64特征列。
+    """
+    import pyarrow as pa  # 可选依赖，仅写parquet时需要
+    fields = [(column, pa.int64() if column == 'segment_id' else pa.string()) for column in META_COLUMNS]
+    fields.extend((column, pa.float64()) for column in ss.FEATURE_NAMES)
+    return pa.schema(fields)
+
+
+class FeatureMatrixWriter(object):
+
+    def __init__(self, matrix_path, batch_size=4096):
+        """
+        特征矩阵写出器，按扩展名选择格式：
+        .npz —— 各批数据先追加至临时文件，关闭时流式写入npz；
+        .parquet —— 每批写为一个行组，需要安装pyarrow。
+        没有任何特征向量时两种格式均写出0行、列完整的特征矩阵。
+        两种格式均先写临时文件，关闭时替换为正式文件；with块中发生异常时放弃写出，不生成不完整的特征矩阵。
+
+        :param matrix_path: 特征矩阵文件路径
+        :param batch_size: 每批缓存的特征向量数
+        """
+        self.matrix_path = matrix_path
+        self.batch_size = batch_size
+        self.format = os.path.splitext(matrix_path)[1].lower()
+        if self.format not in ('.npz', '.parquet'):
+            raise ValueError("不支持的特征矩阵格式：{}".format(self.format))
+        self.rows = []  # 当前批次的特征向量
+        self.meta_rows = []  # 当前批次的元数据
+        self.row_num = 0  # 已写出的行数
+        self.parquet_writer = None
+        self.closed = False  # 是否已关闭（写出或放弃）
+        if self.format == '.npz':
+            self.feature_tmp = open(matrix_path + '.features.tmp', 'wb')
+            self.meta_tmp = open(matrix_path + '.meta.tmp', 'w', newline='')
+            self.meta_writer = csv.writer(self.meta_tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def add(self, file_name, feature_vector):
+        """
+        加入一条轨迹片段的特征向量。
+
+        :param file_name: 轨迹片段文件名，格式为 user_file_id_mode.txt
+        :param feature_vector: 33维特征向量
+        """
+        user, traj, segment_id, mode = trw.parse_segment_file_name(file_name)
+        self.meta_rows.append([user, traj, segment_id, mode, os.path.basename(file_name)])
+        self.rows.append(feature_vector)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        写出当前批次。
+        """
+        if not self.rows:
+            return
+        features = np.asarray(self.rows, dtype=np.float64).reshape(len(self.rows), len(ss.FEATURE_NAMES))
+        if self.format == '.npz':
+            features.tofile(self.feature_tmp)
+            self.meta_writer.writerows(self.meta_rows)
+        else:
+            import pyarrow as pa  # 可选依赖，仅写parquet时需要
+            import pyarrow.parquet as pq
+            batchDF = pd.DataFrame(self.meta_rows, columns=META_COLUMNS)
+            batchDF = pd.concat([batchDF, pd.DataFrame(features, columns=ss.FEATURE_NAMES)], axis=1)
+            table = pa.Table.from_pandas(batchDF, schema=parquet_schema(), preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.matrix_path + '.tmp', table.schema)
+            self.parquet_writer.write_table(table)
+        self.row_num += len(self.rows)
+        self.rows = []
+        self.meta_rows = []
+
+    def close(self):
+        """
+        写出剩余数据并生成最终的特征矩阵文件。
+        """
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        if self.format == '.parquet':
+            if self.parquet_writer is None:  # 没有任何特征向量，写出0行的特征矩阵
+                import pyarrow.parquet as pq
+                self.parquet_writer = pq.ParquetWriter(self.matrix_path + '.tmp', parquet_schema())
+            self.parquet_writer.close()
+            self.parquet_writer = None
+            os.replace(self.matrix_path + '.tmp', self.matrix_path)
+            return
+        self.feature_tmp.close()
+        self.meta_tmp.close()
+        feature_tmp_path = self.matrix_path + '.features.tmp'
+        meta_tmp_path = self.matrix_path + '.meta.tmp'
+        if self.row_num > 0:
+            features = np.memmap(feature_tmp_path, dtype=np.float64, mode='r',
+                                 shape=(self.row_num, len(ss.FEATURE_NAMES)))
+        else:
+            features = np.zeros((0, len(ss.FEATURE_NAMES)))
+        metaDF = pd.read_csv(meta_tmp_path, header=None, names=META_COLUMNS,
+                             dtype={'user': str, 'traj': str, 'mode': str, 'source_file': str})
+        with open(self.matrix_path + '.tmp', 'wb') as fp:
+            np.savez(fp, features=features, columns=np.array(ss.FEATURE_NAMES),
+                     user=metaDF['user'].to_numpy(dtype=str), traj=metaDF['traj'].to_numpy(dtype=str),
+                     segment_id=metaDF['segment_id'].to_numpy(dtype=np.int64),
+                     mode=metaDF['mode'].to_numpy(dtype=str), source_file=metaDF['source_file'].to_numpy(dtype=str))
+        del features
+        os.replace(self.matrix_path + '.tmp', self.matrix_path)
+        os.remove(feature_tmp_path)
+        os.remove(meta_tmp_path)
+
+    def abort(self):
+        """
+        放弃写出：删除临时文件，不生成（也不替换已有的）特征矩阵文件。
+        """
+        self.rows = []
+        self.meta_rows = []
+        if self.closed:
+            return
+        self.closed = True
+        if self.format == '.parquet':
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+                self.parquet_writer = None
+                os.remove(self.matrix_path + '.tmp')
+            return
+        self.feature_tmp.close()
+        self.meta_tmp.close()
+        os.remove(self.matrix_path + '.features.tmp')
+        os.remove(self.matrix_path + '.meta.tmp')
+
+
+def read_feature_matrix(matrix_path):
+    """
+    读取特征矩阵文件。
+
+    :param matrix_path: 特征矩阵文件路径（.npz 或 .parquet）
+    :return: featureDF，元数据列在前，33个特征列在后
+    """
+    if matrix_path.lower().endswith('.parquet'):
+        return pd.read_parquet(matrix_path)
+    with np.load(matrix_path) as data:
+        featureDF = pd.DataFrame({column: data[column] for column in META_COLUMNS})
+        featureDF = pd.concat([featureDF, pd.DataFrame(data['features'], columns=list(data['columns']))], axis=1)
+    return featureDF
@@ -5,6 +5,7 @@
 
 import os
 import shutil
+import FileOperation.manifest as mf
 
 
 def labeled_data_filter():
@@ -27,8 +28,123 @@ def labeled_data_filter():
             continue
         # 复制user文件夹至路径：
         target_store_path = os.path.join(store_dir, folder)
-        # 复制文件夹
-        shutil.copytree(user_folder_path, target_store_path)
+        # 复制文件夹，目标已存在时覆盖其中的同名文件
+        shutil.copytree(user_folder_path, target_store_path, dirs_exist_ok=True)
+
+
+def labeled_data_filter_incremental(raw_geolife_path, store_dir, manifest_path=None):
+    """
+    增量筛选带标签文件的数据：依据转换清单只复制新增或变化的文件，并删除源文件已不存在的副本。
+    转换清单在每个user文件夹处理完后保存。
+
+    :param raw_geolife_path: 原始geolife数据集存放路径，至 ./Data一级
+    :param store_dir: 筛选出的数据存放路径
+    :param manifest_path: 转换清单路径，默认为 store_dir/manifest.json
+    :return: (复制的文件数, 跳过的文件数, 删除副本的源文件数)
+    """
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    if manifest_path is None:
+        manifest_path = os.path.join(store_dir, "manifest.json")
+    manifest = mf.ConversionManifest(manifest_path)
+    seen_inputs = set()  # 本次存在的源文件
+    copied_num = 0
+    skipped_num = 0
+    for folder in sorted(os.listdir(raw_geolife_path)):
+        user_folder_path = os.path.join(raw_geolife_path, folder)
+        # 只处理包含标签文件的user文件夹
+        if not os.path.exists(os.path.join(user_folder_path, "labels.txt")):
+            continue
+        for dir_path, _, file_names in os.walk(user_folder_path):
+            target_dir = os.path.join(store_dir, folder, os.path.relpath(dir_path, user_folder_path))
+            for file_name in file_names:
+                input_path = os.path.join(dir_path, file_name)
+                seen_inputs.add(input_path)
+                if manifest.is_unchanged(input_path):
+                    skipped_num += 1
+                    continue
+                if not os.path.exists(target_dir):
+                    os.makedirs(target_dir)
+                output_path = os.path.normpath(os.path.join(target_dir, file_name))
+                shutil.copyfile(input_path, output_path)
+                manifest.record(input_path, [output_path])
+                copied_num += 1
+        manifest.save()  # 每个user文件夹处理完即保存，中断后重新运行时从下一个文件夹继续
+    removed = manifest.remove_missing(seen_inputs)
+    manifest.save()
+    return copied_num, skipped_num, len(removed)
+
+
+def find_labeled_users(raw_geolife_path):
+    """
+    找出包含标签文件的user文件夹。
+
+    :param raw_geolife_path: 原始geolife数据集存放路径，至 ./Data一级
+    :return: user文件夹路径列表
+    """
+    user_folders = []
+    for folder in sorted(os.listdir(raw_geolife_path)):
+        user_folder_path = os.path.join(raw_geolife_path, folder)
+        if os.path.exists(os.path.join(user_folder_path, "labels.txt")):
+            user_folders.append(user_folder_path)
+    return user_folders
+
+
+def build_labeled_index(raw_geolife_path, index_path):
+    """
+    生成带标签user文件夹的索引文件（每行一个文件夹路径），代替复制数据。
+
+    :param raw_geolife_path: 原始geolife数据集存放路径，至 ./Data一级
+    :param index_path: 索引文件路径
+    :return: user文件夹路径列表
+    """
+    user_folders = find_labeled_users(raw_geolife_path)
+    with open(index_path, 'w') as fp:
+        fp.write(''.join("{}\n".format(os.path.abspath(folder)) for folder in user_folders))
+    return user_folders
+
+
+def read_labeled_index(index_path):
+    """
+    读取带标签user文件夹的索引文件。
+
+    :return: user文件夹路径列表
+    """
+    with open(index_path, 'r') as fp:
+        return [line.strip() for line in fp if line.strip()]
+
+
+def link_labeled_data(raw_geolife_path, store_dir, link_type='symlink'):
+    """
+    以链接代替复制，在store_dir下生成带标签数据的视图。
+    symlink：每个user文件夹建立一个符号链接；hardlink：重建目录结构，各文件建立硬链接（需位于同一文件系统）。
+    已存在的链接或文件保持不变，可重复运行。
+
+    :param raw_geolife_path: 原始geolife数据集存放路径，至 ./Data一级
+    :param store_dir: 筛选出的数据存放路径
+    :param link_type: 'symlink' 或 'hardlink'
+    :return: 链接的user文件夹数
+    """
+    if link_type not in ('symlink', 'hardlink'):
+        raise ValueError("不支持的链接方式：{}".format(link_type))
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    user_folders = find_labeled_users(raw_geolife_path)
+    for user_folder_path in user_folders:
+        target_store_path = os.path.join(store_dir, os.path.basename(user_folder_path))
+        if link_type == 'symlink':
+            if not os.path.lexists(target_store_path):
+                os.symlink(os.path.abspath(user_folder_path), target_store_path, target_is_directory=True)
+            continue
+        for dir_path, _, file_names in os.walk(user_folder_path):
+            target_dir = os.path.normpath(os.path.join(target_store_path, os.path.relpath(dir_path, user_folder_path)))
+            if not os.path.exists(target_dir):
+                os.makedirs(target_dir)
+            for file_name in file_names:
+                target_file = os.path.join(target_dir, file_name)
+                if not os.path.exists(target_file):
+                    os.link(os.path.join(dir_path, file_name), target_file)
+    return len(user_folders)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 转换清单：记录每个输入文件的路径、大小、修改时间、内容哈希及由其生成的输出文件，
+#              重复运行时仅处理新增或变化的输入，并删除输入已不存在的输出。
+import hashlib
+import json
+import os
+
+HASH_BLOCK_SIZE = 1 << 20  # 计算哈希时每次读取的字节数
+
+
+def file_hash(file_path):
+    """
+    计算文件内容的sha1哈希。
+    """
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as fp:
+        block = fp.read(HASH_BLOCK_SIZE)
+        while block:
+            sha1.update(block)
+            block = fp.read(HASH_BLOCK_SIZE)
+    return sha1.hexdigest()
+
+
+class ConversionManifest(object):
+
+    def __init__(self, manifest_path):
+        """
+        读取（或新建）转换清单。
+
+        :param manifest_path: 清单文件路径（json）
+        """
+        self.manifest_path = manifest_path
+        self.entries = {}  # 输入文件路径 -> {size, mtime, sha1, outputs}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as fp:
+                self.entries = json.load(fp)
+
+    def is_unchanged(self, input_path):
+        """
+        判断输入文件自上次记录以来是否未变化，且其输出文件均存在。
+        大小与修改时间均一致时直接判定未变化；仅修改时间变化时再比较内容哈希。
+        """
+        entry = self.entries.get(input_path)
+        if entry is None or not all(os.path.exists(output) for output in entry['outputs']):
+            return False
+        stat = os.stat(input_path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime == entry['mtime']:
+            return True
+        if file_hash(input_path) != entry['sha1']:
+            return False
+        entry['mtime'] = stat.st_mtime  # 内容未变，仅更新修改时间
+        return True
+
+    def record(self, input_path, outputs):
+        """
+        记录一个已处理的输入文件及其输出文件。
+        """
+        stat = os.stat(input_path)
+        self.entries[input_path] = {'size': stat.st_size,
+                                    'mtime': stat.st_mtime,
+                                    'sha1': file_hash(input_path),
+                                    'outputs': list(outputs)}
+
+    def remove_missing(self, existing_inputs):
+        """
+        删除已不存在的输入文件所对应的输出文件及记录。
+
+        :param existing_inputs: 本次运行中存在的输入文件路径集合
+        :return: 被删除的输入文件路径列表
+        """
+        removed = [input_path for input_path in self.entries if input_path not in existing_inputs]
+        for input_path in removed:
+            for output in self.entries.pop(input_path)['outputs']:
+                if os.path.exists(output):
+                    os.remove(output)
+        return removed
+
+    def save(self):
+        """
+        保存清单，先写临时文件再替换，避免中断时清单损坏。
+        """
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(self.entries, fp, indent=1)
+        os.replace(tmp_path, self.manifest_path)
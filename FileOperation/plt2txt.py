@@ -3,10 +3,15 @@
 # time: 2021/12/12
 # description: 将plt文件转为txt文件，同时删除每个文件中的前6行无用数据
 
+import functools
 import os
 import shutil   # 复制文件需要使用
+import FileOperation.manifest as mf
+import Pipeline.instrumentation as ins
+import Pipeline.parallel as parallel
 
 
+@ins.timed()
 def plt2txt_one_file(traj_file_path, store_path):
     """
     读取单一的plt文件，并转为txt文件。
@@ -34,8 +39,11 @@ def plt2txt_one_file(traj_file_path, store_path):
     traj_path = os.path.join(output_path, "{}.txt".format(file_name))
     # 'w+'表示打开一个文件用于读写。如果该文件已存在则打开文件，并从开头开始编辑，即原有内容会被删除。如果该文件不存在，创建新文件。
     with open(traj_path, 'w+') as fp:
-        for line in l_list:  # 循环读取行数据
-            fp.write(line)
+        fp.write(''.join(l_list))  # 一次性写入全部行数据
+    ins.count('points_read', len(l_list))
+    ins.count_file('bytes_read', traj_file_path)
+    ins.count_file('bytes_written', traj_path)
+    return traj_path
 
 
 def plt2txt_one_folder(data_root_path, userdata_folder_path):
@@ -49,7 +57,7 @@ def plt2txt_one_folder(data_root_path, userdata_folder_path):
     user_folder_files_list = os.listdir(userdata_folder_path)
 
     # 获取志愿者数据文件夹名 如：010
-    folder_name = userdata_folder_path.split('\\')[-1]
+    folder_name = os.path.basename(os.path.normpath(userdata_folder_path))
     # 处理结果存储路径 eg. E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Process_01\010
     store_path = os.path.join(data_root_path, "Process_01/{}".format(folder_name))
     print(store_path)   # 输出目前处理至哪一userdata文件夹
@@ -78,6 +86,7 @@ def plt2txt_one_folder(data_root_path, userdata_folder_path):
             plt2txt_one_file(traj_file_path, store_path)
 
 
+@ins.timed('plt2txt_all_folders', is_stage=True)
 def plt2txt_all_folders(data_root_path):
     """
     处理所有文件夹下的轨迹文件格式转换。
@@ -87,7 +96,7 @@ def plt2txt_all_folders(data_root_path):
     """
 
     # 带标签的原始数据路径 E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Labeled_Data
-    labeled_data_folder_path = os.path.join(data_root_dir, "Labeled_Data")
+    labeled_data_folder_path = os.path.join(data_root_path, "Labeled_Data")
 
     # 获取原始轨迹数据文件夹（指定文件夹）下所有文件名列表
     raw_traj_folder_list = os.listdir(labeled_data_folder_path)
@@ -104,6 +113,88 @@ def plt2txt_all_folders(data_root_path):
         plt2txt_one_folder(data_root_path, file_path)
 
 
+@ins.timed('plt2txt_all_folders_parallel', is_stage=True)
+def plt2txt_all_folders_parallel(data_root_path, user_folders=None, workers=None):
+    """
+    多进程处理所有文件夹下的轨迹文件格式转换，每个user文件夹为一个任务。
+
+    :param data_root_path: 数据文件夹的路径。
+    :param user_folders: 要处理的user文件夹路径列表（如read_labeled_index的结果，可为原始数据中的文件夹），
+                         默认为 Labeled_Data 下的全部文件夹（可为符号链接）
+    :param workers: 进程数，默认为CPU核数
+    :return: 处理失败的user文件夹及其异常信息
+    """
+    if user_folders is None:
+        labeled_data_folder_path = os.path.join(data_root_path, "Labeled_Data")
+        user_folders = [os.path.join(labeled_data_folder_path, folder)
+                        for folder in sorted(os.listdir(labeled_data_folder_path))]
+    user_folders = [folder for folder in user_folders if os.path.isdir(folder)]
+    process_path = os.path.join(data_root_path, "Process_01")
+    if not os.path.exists(process_path):
+        os.makedirs(process_path)
+    _, errors = parallel.run_tasks(functools.partial(plt2txt_one_folder, data_root_path), user_folders,
+                                   workers, chunksize=1, ordered=False)
+    ins.count('folders_failed', len(errors))
+    return errors
+
+
+@ins.timed('plt2txt_all_folders_incremental', is_stage=True)
+def plt2txt_all_folders_incremental(data_root_path, manifest_path=None):
+    """
+    增量处理所有文件夹下的轨迹文件格式转换：依据转换清单只转换新增或变化的plt文件与labels.txt，
+    并删除输入已不存在的输出文件。转换清单在每个user文件夹处理完后保存。
+
+    :param data_root_path: 数据文件夹的路径。
+    :param manifest_path: 转换清单路径，默认为 Process_01/manifest.json
+    :return: (转换的文件数, 跳过的文件数, 删除输出的输入文件数)
+    """
+    labeled_data_folder_path = os.path.join(data_root_path, "Labeled_Data")
+    process_path = os.path.join(data_root_path, "Process_01")
+    if not os.path.exists(process_path):
+        os.makedirs(process_path)
+    if manifest_path is None:
+        manifest_path = os.path.join(process_path, "manifest.json")
+    manifest = mf.ConversionManifest(manifest_path)
+    seen_inputs = set()  # 本次存在的输入文件
+    converted_num = 0
+    skipped_num = 0
+
+    for folder_name in sorted(os.listdir(labeled_data_folder_path)):
+        userdata_folder_path = os.path.join(labeled_data_folder_path, folder_name)
+        if not os.path.isdir(userdata_folder_path):
+            continue
+        store_path = os.path.join(process_path, folder_name)
+        if not os.path.exists(store_path):
+            os.mkdir(store_path)
+        # 待处理的输入文件及其输出：labels.txt 直接复制，plt文件转为txt
+        tasks = []
+        label_path = os.path.join(userdata_folder_path, "labels.txt")
+        if os.path.exists(label_path):
+            tasks.append((label_path, os.path.join(store_path, "labels.txt")))
+        traj_folder_path = os.path.join(userdata_folder_path, "Trajectory")
+        if os.path.isdir(traj_folder_path):
+            for traj in sorted(os.listdir(traj_folder_path)):
+                tasks.append((os.path.join(traj_folder_path, traj),
+                              os.path.join(store_path, "Trajectory", "{}.txt".format(traj.split('.')[0]))))
+
+        for input_path, output_path in tasks:
+            seen_inputs.add(input_path)
+            if manifest.is_unchanged(input_path):
+                skipped_num += 1
+                continue
+            if input_path == label_path:
+                shutil.copyfile(input_path, output_path)  # 复制labels.txt
+            else:
+                plt2txt_one_file(input_path, store_path)
+            manifest.record(input_path, [output_path])
+            converted_num += 1
+        manifest.save()  # 每个user文件夹处理完即保存，中断后重新运行时从下一个文件夹继续
+
+    removed = manifest.remove_missing(seen_inputs)
+    manifest.save()
+    return converted_num, skipped_num, len(removed)
+
+
 if __name__ == '__main__':
     # 获取数据路径
     data_root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../3_Data"))
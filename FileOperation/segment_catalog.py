@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 轨迹片段目录：以本地SQLite数据库记录每个轨迹片段的user、来源轨迹文件、片段id、出行方式、点数、
+#              时间范围、经纬度范围及存储位置，写出片段时同步登记；
+#              按出行方式、点数等条件选取片段变为带索引的查询，代替os.listdir + 文件名解析及文件复制。
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import FileOperation.traj_read_and_write as trw
+
+CATALOG_COLUMNS = ['user', 'traj', 'segment_id', 'mode', 'point_num', 'start_time', 'end_time',
+                   'min_lat', 'max_lat', 'min_lon', 'max_lon', 'location']  # 目录表列名，时间为int64纪元纳秒
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    user TEXT NOT NULL,
+    traj TEXT NOT NULL,
+    segment_id INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    point_num INTEGER NOT NULL,
+    start_time INTEGER,
+    end_time INTEGER,
+    min_lat REAL,
+    max_lat REAL,
+    min_lon REAL,
+    max_lon REAL,
+    location TEXT NOT NULL,
+    PRIMARY KEY (user, traj, segment_id)
+);
+CREATE INDEX IF NOT EXISTS segments_mode ON segments (mode, point_num);
+CREATE INDEX IF NOT EXISTS segments_time ON segments (start_time, end_time);
+CREATE INDEX IF NOT EXISTS segments_location ON segments (location);
+"""
+
+
+def summarize(lat, lon, timestamps):
+    """
+    统计一个轨迹片段（或其一部分）的点数、时间范围及经纬度范围。
+
+    :param lat: 纬度数组
+    :param lon: 经度数组
+    :param timestamps: 时间戳数组（datetime64或int64纪元纳秒）
+    :return: 统计字典，空片段返回None
+    """
+    if len(lat) == 0:
+        return None
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        timestamps = timestamps.astype('datetime64[ns]').astype(np.int64)
+    return {'point_num': len(lat), 'start_time': int(timestamps.min()), 'end_time': int(timestamps.max()),
+            'min_lat': float(np.min(lat)), 'max_lat': float(np.max(lat)),
+            'min_lon': float(np.min(lon)), 'max_lon': float(np.max(lon))}
+
+
+def merge_summaries(first, second):
+    """
+    合并同一片段两部分的统计（用于分块写出的片段）。
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return {'point_num': first['point_num'] + second['point_num'],
+            'start_time': min(first['start_time'], second['start_time']),
+            'end_time': max(first['end_time'], second['end_time']),
+            'min_lat': min(first['min_lat'], second['min_lat']), 'max_lat': max(first['max_lat'], second['max_lat']),
+            'min_lon': min(first['min_lon'], second['min_lon']), 'max_lon': max(first['max_lon'], second['max_lon'])}
+
+
+class SegmentCatalog(object):
+
+    def __init__(self, catalog_path):
+        """
+        打开（或新建）轨迹片段目录。
+
+        :param catalog_path: SQLite数据库文件路径
+        """
+        self.catalog_path = catalog_path
+        self.connection = sqlite3.connect(catalog_path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    def add(self, user, traj, segment_id, mode, summary, location):
+        """
+        登记一个轨迹片段，同一 (user, traj, segment_id) 再次登记时覆盖。
+
+        :param summary: summarize的结果
+        :param location: 片段的存储位置（文件路径，或列式存储路径）
+        """
+        summary = summary or {'point_num': 0}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(user), str(traj), int(segment_id), mode, summary['point_num'], summary.get('start_time'),
+             summary.get('end_time'), summary.get('min_lat'), summary.get('max_lat'), summary.get('min_lon'),
+             summary.get('max_lon'), location))
+
+    def add_frame(self, user, traj, segment_id, mode, trajDF, location):
+        """
+        登记一个DataFrame形式的轨迹片段，列为lat、lon、alt、timestamp。
+        """
+        self.add(user, traj, segment_id, mode,
+                 summarize(trajDF['lat'].values, trajDF['lon'].values, trajDF['timestamp'].values), location)
+
+    def add_file(self, segment_path):
+        """
+        读取已有的轨迹片段文件（user_file_id_mode.txt）并登记。
+        """
+        user, traj, segment_id, mode = trw.parse_segment_file_name(segment_path)
+        self.add_frame(user, traj, segment_id, mode, trw.read_mode_traj(segment_path), os.path.abspath(segment_path))
+
+    def remove(self, location):
+        """
+        删除存储于location的轨迹片段记录。
+        """
+        self.connection.execute("DELETE FROM segments WHERE location = ?", (location,))
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def modes(self):
+        """
+        全部轨迹片段的出行方式类别（代替get_traffic_mode中的目录扫描）。
+        """
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT mode FROM segments ORDER BY mode")]
+
+    def select(self, modes=None, exclude_modes=None, min_points=None, users=None, bbox=None,
+               start_time=None, end_time=None):
+        """
+        按条件选取轨迹片段，如 select(modes=['walk', 'bike', 'bus'], min_points=50)。
+
+        :param modes: 出行方式列表
+        :param exclude_modes: 排除的出行方式列表
+        :param min_points: 最少点数
+        :param users: user编号列表
+        :param bbox: (min_lat, min_lon, max_lat, max_lon)，选取经纬度范围与之相交的片段
+        :param start_time: 时间范围起点（可被pd.Timestamp解析），选取时间范围与之相交的片段
+        :param end_time: 时间范围终点
+        :return: 片段记录表，列同CATALOG_COLUMNS，按 user、traj、segment_id 排序
+        """
+        conditions = []
+        parameters = []
+        for column, values, negate in (('mode', modes, False), ('mode', exclude_modes, True), ('user', users, False)):
+            if values is not None:
+                values = list(values)
+                conditions.append("{0} {1}IN ({2})".format(column, "NOT " if negate else "",
+                                                           ", ".join("?" * len(values))))
+                parameters.extend(str(value) for value in values)
+        if min_points is not None:
+            conditions.append("point_num >= ?")
+            parameters.append(int(min_points))
+        if bbox is not None:
+            conditions.append("max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?")
+            parameters.extend([bbox[0], bbox[2], bbox[1], bbox[3]])
+        if start_time is not None:
+            conditions.append("end_time >= ?")
+            parameters.append(pd.Timestamp(start_time).value)
+        if end_time is not None:
+            conditions.append("start_time <= ?")
+            parameters.append(pd.Timestamp(end_time).value)
+        query = "SELECT {0} FROM segments".format(", ".join(CATALOG_COLUMNS))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY user, traj, segment_id"
+        return pd.read_sql_query(query, self.connection, params=parameters)
+
+    def locations(self, **conditions):
+        """
+        按条件选取轨迹片段的存储位置，条件同select。
+        """
+        return self.select(**conditions)['location'].tolist()
+
+
+def build_catalog(folder_path, catalog_path):
+    """
+    为已有的轨迹片段文件夹补建目录。
+
+    :param folder_path: 轨迹片段文件存放路径
+    :param catalog_path: SQLite数据库文件路径
+    :return: 登记的片段数
+    """
+    num = 0
+    with SegmentCatalog(catalog_path) as catalog:
+        for file in sorted(os.listdir(folder_path)):
+            if not file.endswith('.txt'):
+                continue
+            catalog.add_file(os.path.join(folder_path, file))
+            num += 1
+    return num
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 全数据集轨迹点空间索引：以本地SQLite数据库按经纬度网格分桶存储清洗后的全部轨迹点，
+#              每个点记录所属轨迹（片段）文件及点序号；范围查询与k近邻查询只读取相关网格，无需读取全部轨迹文件。
+#              按文件大小、修改时间增量更新：新增或变化的文件重新入库，已删除的文件移出索引。
+import math
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import FeatureExtracting.point_features as pf
+import FileOperation.traj_read_and_write as trw
+
+DEFAULT_CELL_SIZE = 0.01  # 网格边长（度），约1km
+METERS_PER_DEGREE = pf.EARTH_RADIUS * math.pi / 180  # 每度纬度对应的距离（m），与cal_distance的地球半径一致
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY,
+    location TEXT NOT NULL UNIQUE,
+    user TEXT,
+    traj TEXT,
+    point_num INTEGER,
+    size INTEGER,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS points (
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    timestamp INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    point_index INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS points_cell ON points (cell_x, cell_y);
+CREATE INDEX IF NOT EXISTS points_file ON points (file_id);
+"""
+RESULT_COLUMNS = ['location', 'user', 'traj', 'point_index', 'lat', 'lon', 'timestamp']  # 查询结果列名
+
+
+def read_points(traj_path):
+    """
+    读取轨迹（片段）文件中的纬度、经度、时间戳三列，适用于traj_filter与training_traj_segmentation的输出（无表头）。
+    """
+    trajDF = pd.read_csv(traj_path, sep=',', header=None, usecols=[0, 1, 3], names=['lat', 'lon', 'timestamp'])
+    trajDF['timestamp'] = trw.parse_timestamp(trajDF['timestamp'])
+    return trajDF
+
+
+def file_owner(traj_path):
+    """
+    由文件路径确定所属user及轨迹名：traj_filter输出为 user/Trajectory/轨迹.txt，轨迹片段为 user_file_id_mode.txt。
+    """
+    parent = os.path.dirname(os.path.abspath(traj_path))
+    if os.path.basename(parent) == "Trajectory":
+        return os.path.basename(os.path.dirname(parent)), os.path.basename(traj_path).split('.')[0]
+    user, traj, segment_id, mode = trw.parse_segment_file_name(traj_path)
+    return user, "{0}_{1}_{2}".format(traj, segment_id, mode)
+
+
+class SpatialIndex(object):
+
+    def __init__(self, index_path, cell_size=DEFAULT_CELL_SIZE):
+        """
+        打开（或新建）空间索引；已有索引沿用建立时的网格边长。
+
+        :param index_path: SQLite数据库文件路径
+        :param cell_size: 新建索引的网格边长（度）
+        """
+        self.index_path = index_path
+        self.connection = sqlite3.connect(index_path)
+        self.connection.executescript(SCHEMA)
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'cell_size'").fetchone()
+        if row is None:
+            self.connection.execute("INSERT INTO meta VALUES ('cell_size', ?)", (repr(float(cell_size)),))
+            self.connection.commit()
+            self.cell_size = float(cell_size)
+        else:
+            self.cell_size = float(row[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def cell_of(self, lat, lon):
+        """
+        各点所在网格的 (cell_x, cell_y)，cell_x按经度、cell_y按纬度划分。
+        """
+        return (np.floor(np.asarray(lon, dtype=np.float64) / self.cell_size).astype(np.int64),
+                np.floor(np.asarray(lat, dtype=np.float64) / self.cell_size).astype(np.int64))
+
+    def add(self, location, user, traj, lat, lon, timestamps, size=None, mtime=None):
+        """
+        将一条轨迹（片段）的全部点加入索引，同一location已存在时先移除。
+
+        :param location: 轨迹文件路径
+        :param timestamps: 时间戳数组（datetime64或int64纪元纳秒）
+        :param size: 文件大小，用于增量更新
+        :param mtime: 文件修改时间，用于增量更新
+        """
+        self.remove(location)
+        timestamps = np.asarray(timestamps)
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            timestamps = timestamps.astype('datetime64[ns]').astype(np.int64)
+        cursor = self.connection.execute(
+            "INSERT INTO files (location, user, traj, point_num, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            (location, user, traj, len(lat), size, mtime))
+        file_id = cursor.lastrowid
+        cell_x, cell_y = self.cell_of(lat, lon)
+        self.connection.executemany(
+            "INSERT INTO points VALUES (?, ?, ?, ?, ?, ?, ?)",
+            zip(cell_x.tolist(), cell_y.tolist(), np.asarray(lat, dtype=np.float64).tolist(),
+                np.asarray(lon, dtype=np.float64).tolist(), timestamps.tolist(),
+                [file_id] * len(lat), range(len(lat))))
+
+    def add_file(self, traj_path):
+        """
+        读取轨迹（片段）文件并加入索引。
+        """
+        location = os.path.abspath(traj_path)
+        user, traj = file_owner(location)
+        trajDF = read_points(location)
+        stat = os.stat(location)
+        self.add(location, user, traj, trajDF['lat'].values, trajDF['lon'].values, trajDF['timestamp'].values,
+                 stat.st_size, stat.st_mtime)
+
+    def remove(self, location):
+        """
+        将一个轨迹文件的全部点移出索引。
+        """
+        row = self.connection.execute("SELECT file_id FROM files WHERE location = ?", (location,)).fetchone()
+        if row is None:
+            return
+        self.connection.execute("DELETE FROM points WHERE file_id = ?", row)
+        self.connection.execute("DELETE FROM files WHERE file_id = ?", row)
+
+    def update_from_folder(self, folder_path):
+        """
+        增量更新：索引文件夹（含子文件夹）下新增或变化的轨迹文件，移除已不存在的文件。
+
+        :param folder_path: traj_filter输出文件夹或轨迹片段文件夹
+        :return: (入库的文件数, 未变化的文件数, 移除的文件数)
+        """
+        indexed = {location: (size, mtime) for location, size, mtime in
+                   self.connection.execute("SELECT location, size, mtime FROM files")}
+        folder_path = os.path.abspath(folder_path)
+        seen = set()
+        added_num = 0
+        for dir_path, _, file_names in os.walk(folder_path):
+            for file_name in sorted(file_names):
+                if not file_name.endswith('.txt') or file_name == "labels.txt":
+                    continue
+                location = os.path.join(dir_path, file_name)
+                seen.add(location)
+                stat = os.stat(location)
+                if indexed.get(location) == (stat.st_size, stat.st_mtime):
+                    continue
+                self.add_file(location)
+                added_num += 1
+            self.connection.commit()
+        removed = [location for location in indexed
+                   if location not in seen and os.path.commonpath([folder_path, location]) == folder_path]
+        for location in removed:
+            self.remove(location)
+        self.connection.commit()
+        return added_num, len(seen) - added_num, len(removed)
+
+    def query_cells(self, cell_x_range, cell_y_range):
+        """
+        读取网格范围内的全部点，每列网格以 (cell_x, cell_y) 索引范围扫描。
+        没有点时返回列类型相同的空表。
+        """
+        rows = []
+        for cell_x in range(cell_x_range[0], cell_x_range[1] + 1):
+            rows.extend(self.connection.execute(
+                "SELECT f.location, f.user, f.traj, p.point_index, p.lat, p.lon, p.timestamp "
+                "FROM points p JOIN files f ON p.file_id = f.file_id "
+                "WHERE p.cell_x = ? AND p.cell_y BETWEEN ? AND ?",
+                (cell_x, cell_y_range[0], cell_y_range[1])))
+        resultDF = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+        # 无结果时各列为object类型，显式指定类型，与其他网格的结果拼接后数值列仍为数值类型
+        resultDF = resultDF.astype({'point_index': np.int64, 'lat': np.float64, 'lon': np.float64})
+        resultDF['timestamp'] = resultDF['timestamp'].astype(np.int64).astype('datetime64[ns]')
+        return resultDF
+
+    def range_query(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        范围查询：经纬度范围内（含边界）的全部轨迹点。
+
+        :return: 轨迹点表，列同RESULT_COLUMNS，按location、point_index排序
+        """
+        (x0, x1), (y0, y1) = self.cell_of([min_lat, max_lat], [min_lon, max_lon])
+        resultDF = self.query_cells((int(x0), int(x1)), (int(y0), int(y1)))
+        inside = resultDF['lat'].between(min_lat, max_lat) & resultDF['lon'].between(min_lon, max_lon)
+        return resultDF[inside].sort_values(['location', 'point_index']).reset_index(drop=True)
+
+    def segments_in_range(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        范围查询：经过该经纬度范围的轨迹（片段）文件及其在范围内的点数。
+        """
+        resultDF = self.range_query(min_lat, min_lon, max_lat, max_lon)
+        return resultDF.groupby(['location', 'user', 'traj'], as_index=False).size()
+
+    def extent(self):
+        """
+        已索引点的网格范围 ((cell_x最小值, 最大值), (cell_y最小值, 最大值))，空索引返回None。
+        """
+        row = self.connection.execute("SELECT MIN(cell_x), MAX(cell_x), MIN(cell_y), MAX(cell_y) FROM points").fetchone()
+        if row[0] is None:
+            return None
+        return (row[0], row[1]), (row[2], row[3])
+
+    def knn_query(self, lat, lon, k=10):
+        """
+        k近邻查询：由查询点所在网格逐圈向外扩展，
+        已找到k个点且第k近的距离不超过未搜索区域的最小可能距离时停止。
+
+        :param lat: 查询点纬度
+        :param lon: 查询点经度
+        :param k: 近邻个数
+        :return: 轨迹点表，列同RESULT_COLUMNS另加distance（m，未舍入），按距离升序
+        """
+        extent = self.extent()
+        if extent is None or k <= 0:
+            return pd.DataFrame(columns=RESULT_COLUMNS + ['distance'])
+        cell_x, cell_y = (int(value[0]) for value in self.cell_of([lat], [lon]))
+        (x0, x1), (y0, y1) = extent
+        # 与已索引范围相交的第一圈及最后一圈，其余圈内没有点
+        first_ring = max(x0 - cell_x, cell_x - x1, y0 - cell_y, cell_y - y1, 0)
+        max_ring = max(abs(cell_x - x0), abs(cell_x - x1), abs(cell_y - y0), abs(cell_y - y1))
+        frames = [self.query_cells((max(cell_x - first_ring, x0), min(cell_x + first_ring, x1)),
+                                   (max(cell_y - first_ring, y0), min(cell_y + first_ring, y1)))]
+        ring = first_ring
+        while True:
+            candidates = pd.concat(frames, ignore_index=True)
+            if len(candidates) >= k or ring >= max_ring:
+                distance = pf.cal_distance_array(np.float64(lat), np.float64(lon), candidates['lat'].values,
+                                                 candidates['lon'].values)
+                kth_distance = np.partition(distance, k - 1)[k - 1] if len(distance) >= k else np.inf
+                if kth_distance <= self.searched_radius(lat, lon, ring) or ring >= max_ring:
+                    candidates['distance'] = distance
+                    return candidates.sort_values(['distance', 'location', 'point_index'], kind='stable') \
+                        .head(k).reset_index(drop=True)
+            ring += 1
+            # 第ring圈网格：正方形边上的网格，分为上下两行及左右两列，均截取至已索引范围内
+            for x_range, y_range in (((cell_x - ring, cell_x + ring), (cell_y - ring, cell_y - ring)),
+                                     ((cell_x - ring, cell_x + ring), (cell_y + ring, cell_y + ring)),
+                                     ((cell_x - ring, cell_x - ring), (cell_y - ring + 1, cell_y + ring - 1)),
+                                     ((cell_x + ring, cell_x + ring), (cell_y - ring + 1, cell_y + ring - 1))):
+                x_range = (max(x_range[0], x0), min(x_range[1], x1))
+                y_range = (max(y_range[0], y0), min(y_range[1], y1))
+                if x_range[0] <= x_range[1] and y_range[0] <= y_range[1]:
+                    frames.append(self.query_cells(x_range, y_range))
+
+    def searched_radius(self, lat, lon, ring):
+        """
+        已搜索的 (2*ring+1)^2 个网格所覆盖正方形内，查询点到正方形边界的最小距离（m）的下界；
+        该距离以内的点均已被搜索。
+        """
+        cell_x, cell_y = (int(value[0]) for value in self.cell_of([lat], [lon]))
+        lat_gap = min(lat - (cell_y - ring) * self.cell_size, (cell_y + ring + 1) * self.cell_size - lat)
+        lon_gap = min(lon - (cell_x - ring) * self.cell_size, (cell_x + ring + 1) * self.cell_size - lon)
+        # 经度方向的距离随纬度增大而减小，取正方形内最高纬度处的缩放系数；再乘以0.99留出余量，保证为下界
+        max_abs_lat = min(abs(lat) + (ring + 1) * self.cell_size, 90.0)
+        lon_scale = math.cos(math.radians(max_abs_lat))
+        return 0.99 * METERS_PER_DEGREE * min(lat_gap, lon_gap * lon_scale)
+
+
+def build_spatial_index(folder_path, index_path, cell_size=DEFAULT_CELL_SIZE):
+    """
+    由清洗后的轨迹文件夹建立（或增量更新）空间索引。
+
+    :param folder_path: traj_filter输出文件夹或轨迹片段文件夹
+    :param index_path: SQLite数据库文件路径
+    :param cell_size: 新建索引的网格边长（度）
+    :return: (入库的文件数, 未变化的文件数, 移除的文件数)
+    """
+    with SpatialIndex(index_path, cell_size) as index:
+        return index.update_from_folder(folder_path)
@@ -3,7 +3,31 @@
 # time: 2022/2/16
 # description: 轨迹文件读写操作
 import os
+import numpy as np
 import pandas as pd
+import FileOperation.traj_store as ts
+import DataModel.trajectory as tm
+import Pipeline.instrumentation as ins
+
+PLT_HEADER_LINES = 6  # plt文件前6行为说明信息
+PLT_DAY_ORIGIN = 25569.0  # plt文件第5列为自1899-12-30起的天数，1970-01-01对应25569天
+TIMESTAMP_FORMAT = '%Y/%m/%d %H:%M:%S'  # 原始数据的时间格式
+CSV_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'  # to_csv写出的时间格式；分块写出时显式指定，避免某块全为零点时只写出日期
+CHUNK_NUMERIC_COLUMNS = ['lat', 'lon', 'alt']  # 分块读取时需统一类型的数值列
+INTEGER_PATTERN = r'\s*[-+]?\d+\s*'  # pandas推断为整数的取值
+
+
+def parse_timestamp(values):
+    """
+    将时间字符串转为datetime类型，兼容原始数据的 %Y/%m/%d 格式与to_csv写出的ISO格式。
+    """
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except ValueError:
+        try:
+            return pd.to_datetime(values, format='ISO8601')  # pandas>=2.0
+        except ValueError:
+            return pd.to_datetime(values)
 
 
 def read_label_txt(folder_path):
@@ -30,6 +54,7 @@ def read_label_txt(folder_path):
     return labelDF
 
 
+@ins.timed()
 def read_raw_traj_txt(traj_txt_path):
     """
     读取原始轨迹数据文件。
@@ -44,17 +69,19 @@ def read_raw_traj_txt(traj_txt_path):
     trajDF.drop(['0', 'datetime'], axis=1, inplace=True)
     # 将日期和时间列合并，并转为datetime类型数据
     trajDF['timestamp'] = trajDF['date'] + ' ' + trajDF['time']
-    trajDF['timestamp'] = pd.to_datetime(trajDF['timestamp'], format='%Y/%m/%d %H:%M:%S')
+    trajDF['timestamp'] = parse_timestamp(trajDF['timestamp'])  # plt中日期为 %Y-%m-%d 格式
     # 删除日期和时间两列数据
     trajDF.drop(['date', 'time'], axis=1, inplace=True)
 
-    print(trajDF.shape)  # 输出数据表大小
+    ins.count('points_read', len(trajDF))
+    ins.count_file('bytes_read', traj_txt_path)
     # print(type(trajDF['lat'][0]))
     # print(type(trajDF['timestamp'][0]))
     # print(trajDF.head())
     return trajDF
 
 
+@ins.timed()
 def read_traj_txt(traj_txt_path):
     """
     读取过滤后的轨迹数据文件。
@@ -65,11 +92,13 @@ def read_traj_txt(traj_txt_path):
     column_name = ['lat', 'lon', 'alt', 'timestamp']
     # 读取轨迹数据文件
     trajDF = pd.read_csv(traj_txt_path, sep=',', header=None, names=column_name)
-    trajDF['timestamp'] = pd.to_datetime(trajDF['timestamp'], format='%Y/%m/%d %H:%M:%S')
-    print(trajDF.shape)  # 输出数据表大小
+    trajDF['timestamp'] = parse_timestamp(trajDF['timestamp'])
+    ins.count('points_read', len(trajDF))
+    ins.count_file('bytes_read', traj_txt_path)
     return trajDF
 
 
+@ins.timed()
 def read_mode_traj(traj_txt_path):
     """
     读取过滤后的轨迹数据文件。
@@ -80,18 +109,207 @@ def read_mode_traj(traj_txt_path):
     column_name = ['lat', 'lon', 'alt', 'timestamp', 'mode']
     # 读取轨迹数据文件
     trajDF = pd.read_csv(traj_txt_path, sep=',', header=None, names=column_name)
-    trajDF['timestamp'] = pd.to_datetime(trajDF['timestamp'], format='%Y/%m/%d %H:%M:%S')
-    print(trajDF.shape)  # 输出数据表大小
+    trajDF['timestamp'] = parse_timestamp(trajDF['timestamp'])
+    ins.count('points_read', len(trajDF))
+    ins.count_file('bytes_read', traj_txt_path)
     return trajDF
 
 
+@ins.timed()
 def read_traj_with_feature(traj_txt_path):
     # 含轨迹点特征的数据 有表头，读取数据时需要跳过
     # 读取轨迹数据文件
     trajDF = pd.read_csv(traj_txt_path, sep=',', header=0)
-    print(trajDF.shape)  # 输出数据表大小
+    ins.count('points_read', len(trajDF))
+    ins.count_file('bytes_read', traj_txt_path)
     return trajDF
 
 
+def infer_chunk_column_types(traj_txt_path, column_name, chunksize=1000000):
+    """
+    预先扫描整个文件，推断数值列的类型：全部为整数时为int64，否则为float64，与整文件读取时pandas的推断一致。
+    分块读取时按此类型读取各块，使各块列类型一致，写出的数值格式（如高程 163 与 163.0）也与整文件处理相同。
+
+    :param traj_txt_path: 轨迹数据文件路径
+    :param column_name: 文件的全部列名
+    :param chunksize: 扫描时每块的行数
+    :return: 数值列名 -> 类型
+    """
+    integer_columns = set(CHUNK_NUMERIC_COLUMNS)
+    for chunk in pd.read_csv(traj_txt_path, sep=',', header=None, names=column_name, usecols=CHUNK_NUMERIC_COLUMNS,
+                             dtype=str, chunksize=chunksize):
+        for column in list(integer_columns):
+            if not chunk[column].str.fullmatch(INTEGER_PATTERN).fillna(False).all():
+                integer_columns.discard(column)
+        if not integer_columns:
+            break
+    return {column: np.int64 if column in integer_columns else np.float64 for column in CHUNK_NUMERIC_COLUMNS}
+
+
+def read_traj_txt_chunks(traj_txt_path, chunksize=1000000):
+    """
+    分块读取过滤后的轨迹数据文件，用于无法一次载入内存的大文件。
+    lat、lon、alt的类型由infer_chunk_column_types预先扫描确定，各块列类型一致且与read_traj_txt相同。
+
+    :param traj_txt_path: 轨迹数据文件路径
+    :param chunksize: 每块的轨迹点数
+    :return: 依次生成各块的trajDF，列与read_traj_txt相同
+    """
+    column_name = ['lat', 'lon', 'alt', 'timestamp']
+    column_types = infer_chunk_column_types(traj_txt_path, column_name, chunksize)
+    ins.count_file('bytes_read', traj_txt_path)
+    for trajDF in pd.read_csv(traj_txt_path, sep=',', header=None, names=column_name,
+                              dtype=column_types, chunksize=chunksize):
+        trajDF['timestamp'] = parse_timestamp(trajDF['timestamp'])
+        ins.count('points_read', len(trajDF))
+        yield trajDF
+
+
+def read_mode_traj_chunks(traj_txt_path, chunksize=1000000):
+    """
+    分块读取带出行方式的轨迹片段文件，数值列类型同read_traj_txt_chunks。
+
+    :return: 依次生成各块的trajDF，列与read_mode_traj相同
+    """
+    column_name = ['lat', 'lon', 'alt', 'timestamp', 'mode']
+    column_types = infer_chunk_column_types(traj_txt_path, column_name, chunksize)
+    ins.count_file('bytes_read', traj_txt_path)
+    for trajDF in pd.read_csv(traj_txt_path, sep=',', header=None, names=column_name,
+                              dtype=dict(column_types, mode=str), chunksize=chunksize):
+        trajDF['timestamp'] = parse_timestamp(trajDF['timestamp'])
+        ins.count('points_read', len(trajDF))
+        yield trajDF
+
+
+def read_traj_with_feature_chunks(traj_txt_path, chunksize=1000000, usecols=None):
+    """
+    分块读取含轨迹点特征的轨迹文件（有表头）。
+
+    :param usecols: 只读取的列名，默认为全部列
+    :return: 依次生成各块的trajDF
+    """
+    ins.count_file('bytes_read', traj_txt_path)
+    for trajDF in pd.read_csv(traj_txt_path, sep=',', header=0, usecols=usecols, chunksize=chunksize):
+        ins.count('points_read', len(trajDF))
+        yield trajDF
+
+
+@ins.timed()
+def read_plt_arrays(plt_path):
+    """
+    直接读取原始plt轨迹文件为数值数组，跳过前6行说明信息，无需先转为txt。
+    以内存映射方式读取，仅解析纬度、经度、高程和天数四列；时间戳由天数换算，不解析日期、时间字符串。
+
+    :param plt_path: plt轨迹文件路径
+    :return: 含lat、lon（float64）、alt、timestamp（int64，纪元纳秒）的数组字典；
+             alt的类型与read_raw_traj_txt相同（由pandas推断：全为整数时为int64，否则为float64），数值不损失精度
+    """
+    column_name = ['lat', 'lon', '0', 'alt', 'days', 'date', 'time']
+    trajDF = pd.read_csv(plt_path, sep=',', header=None, names=column_name, skiprows=PLT_HEADER_LINES,
+                         usecols=['lat', 'lon', 'alt', 'days'], memory_map=True, engine='c',
+                         dtype={'lat': np.float64, 'lon': np.float64, 'days': np.float64})
+    # 天数精确到约1e-5秒，四舍五入到整秒与日期、时间字符串一致
+    seconds = np.rint((trajDF['days'].to_numpy() - PLT_DAY_ORIGIN) * 86400.0).astype(np.int64)
+    ins.count('points_read', len(trajDF))
+    ins.count_file('bytes_read', plt_path)
+    return {'lat': trajDF['lat'].to_numpy(),
+            'lon': trajDF['lon'].to_numpy(),
+            'alt': trajDF['alt'].to_numpy(),
+            'timestamp': seconds * 1000000000}
+
+
+def read_plt(plt_path):
+    """
+    直接读取原始plt轨迹文件，列与read_traj_txt相同。
+
+    :param plt_path: plt轨迹文件路径
+    :return: trajDF轨迹数据表，列为lat、lon、alt、timestamp（datetime64），与plt2txt后read_raw_traj_txt的结果相同
+    """
+    arrays = read_plt_arrays(plt_path)
+    trajDF = pd.DataFrame({'lat': arrays['lat'],
+                           'lon': arrays['lon'],
+                           'alt': arrays['alt'],
+                           'timestamp': arrays['timestamp'].astype('datetime64[ns]')})
+    return trajDF
+
+
+def read_plt_trajectory(plt_path, user=None):
+    """
+    直接读取原始plt轨迹文件为Trajectory。
+
+    :param plt_path: plt轨迹文件路径
+    :param user: user编号
+    :return: Trajectory，traj为文件名（不含扩展名）
+    """
+    return tm.Trajectory.from_arrays(read_plt_arrays(plt_path), user=user,
+                                     traj=os.path.basename(plt_path).split('.')[0])
+
+
+def parse_segment_file_name(file_name):
+    """
+    解析轨迹片段文件名 user_file_id_mode.txt，如 010_20080328144824_1_walk.txt。
+    范围筛选切断的子轨迹文件名含编号，如 010_20080328144824_0_1_walk.txt，其file部分为 20080328144824_0。
+
+    :param file_name: 轨迹片段文件名（可含路径）
+    :return: (user, traj, segment_id, mode)
+    """
+    parts = os.path.basename(file_name).split('.')[0].split('_')
+    user, traj, segment_id, mode = parts[0], '_'.join(parts[1:-2]), parts[-2], parts[-1]
+    return user, traj, int(segment_id), mode
+
+
+def write_traj_store(store_path, segments, append=False):
+    """
+    将轨迹写入列式轨迹存储。
+
+    :param store_path: 存储文件夹路径
+    :param segments: 可迭代的 (user, traj, segment, trajDF, mode)，trajDF列为lat、lon、alt、timestamp
+    :param append: 是否在已有存储后追加
+    :return: 写入的轨迹数
+    """
+    num = 0
+    with ts.TrajStoreWriter(store_path, append) as writer:
+        for user, traj, segment, trajDF, mode in segments:
+            writer.append_frame(user, traj, segment, trajDF, mode)
+            num += 1
+    return num
+
+
+def read_traj_store(store_path):
+    """
+    以内存映射方式打开列式轨迹存储。
+
+    :param store_path: 存储文件夹路径
+    :return: TrajStore，可按 (user, traj, segment) 零拷贝切片
+    """
+    return ts.TrajStore(store_path)
+
+
+def read_store_segment(store_path, user, traj, segment=0):
+    """
+    从列式轨迹存储中读取一条轨迹（片段）。
+
+    :return: trajDF轨迹数据表，列与read_traj_txt相同
+    """
+    return ts.TrajStore(store_path).get_frame(user, traj, segment)
+
+
+def mode_trajs_to_store(folder_path, store_path, append=False):
+    """
+    将分段后的轨迹片段文件夹（文件名为 user_file_id_mode.txt）转存为列式轨迹存储。
+
+    :param folder_path: 轨迹片段文件存放路径
+    :param store_path: 存储文件夹路径
+    :return: 写入的轨迹片段数
+    """
+    def iter_segments():
+        for file in sorted(os.listdir(folder_path)):
+            user, traj, segment_id, mode = parse_segment_file_name(file)
+            trajDF = read_mode_traj(os.path.join(folder_path, file))
+            yield user, traj, segment_id, trajDF, mode
+
+    return write_traj_store(store_path, iter_segments(), append)
+
+
 if __name__ == '__main__':
     pass
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 列式轨迹存储：一个数据集的全部轨迹点按列连续存放于二进制文件中，
+#              lat、lon为float64，alt为float32，timestamp为int64纪元纳秒；
+#              另以索引表记录 (user, traj, segment) → (offset, length)，读取时内存映射、按索引零拷贝切片。
+import json
+import os
+import numpy as np
+import pandas as pd
+import DataModel.trajectory as tm
+
+STORE_COLUMNS = {'lat': np.float64, 'lon': np.float64, 'alt': np.float32, 'timestamp': np.int64}  # 列及其类型
+INDEX_COLUMNS = ['user', 'traj', 'segment', 'mode', 'offset', 'length']  # 索引表列名
+INDEX_FILE = 'index.csv'
+META_FILE = 'meta.json'
+STORE_VERSION = 1
+
+
+def column_file(store_path, column):
+    """
+    某列数据文件的路径。
+    """
+    return os.path.join(store_path, "{0}.{1}".format(column, np.dtype(STORE_COLUMNS[column]).str[1:]))
+
+
+def to_epoch_ns(timestamps):
+    """
+    将时间戳转为int64纪元纳秒。
+
+    :param timestamps: datetime64数组/序列，或已为纪元纳秒的整数数组
+    """
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return timestamps.astype('datetime64[ns]').astype(np.int64)
+    return timestamps.astype(np.int64)
+
+
+class TrajStoreWriter(object):
+
+    def __init__(self, store_path, append=False):
+        """
+        列式轨迹存储写出器，轨迹点追加写入各列文件，索引表在关闭时写出。
+        元信息最后写出，其中的点数与轨迹数为已提交的数据；追加时各列文件先截断至已提交的点数，
+        上次写出中断时残留在列文件末尾的数据被丢弃，不会使之后的偏移量错位。
+
+        :param store_path: 存储文件夹路径
+        :param append: 是否在已有存储后追加；否则清空重写
+        """
+        self.store_path = store_path
+        if not os.path.exists(store_path):
+            os.makedirs(store_path)
+        self.index_rows = []
+        self.point_num = 0
+        if append and os.path.exists(os.path.join(store_path, META_FILE)):
+            with open(os.path.join(store_path, META_FILE), 'r') as fp:
+                meta = json.load(fp)
+            indexDF = read_store_index(store_path)
+            if 'segment_num' in meta:
+                indexDF = indexDF.iloc[:meta['segment_num']]
+            else:
+                indexDF = indexDF[indexDF['offset'] + indexDF['length'] <= meta['point_num']]
+            self.index_rows = indexDF.values.tolist()
+            self.point_num = meta['point_num']
+        self.segment_keys = {(row[0], row[1], int(row[2])) for row in self.index_rows}
+        self.files = {}
+        for column, dtype in STORE_COLUMNS.items():
+            path = column_file(store_path, column)
+            committed_size = self.point_num * np.dtype(dtype).itemsize
+            if committed_size == 0:
+                self.files[column] = open(path, 'wb')
+                continue
+            if os.path.getsize(path) < committed_size:
+                raise ValueError("列文件不完整：{0}，应至少为{1}字节".format(path, committed_size))
+            os.truncate(path, committed_size)
+            self.files[column] = open(path, 'ab')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def append(self, user, traj, segment, lat, lon, alt, timestamp, mode=''):
+        """
+        追加一条轨迹（片段）。
+
+        :param user: 用户编号，如 '010'
+        :param traj: 轨迹文件名（不含扩展名）
+        :param segment: 轨迹片段id，未分段的整条轨迹为0
+        :param lat: 纬度数组
+        :param lon: 经度数组
+        :param alt: 高程数组
+        :param timestamp: 时间戳数组（datetime64或纪元纳秒）
+        :param mode: 出行方式，无标签时为空
+        :return: 该轨迹在存储中的起始偏移量
+        """
+        key = (str(user), str(traj), int(segment))
+        if key in self.segment_keys:
+            raise ValueError("轨迹已存在：user={0}, traj={1}, segment={2}".format(*key))
+        values = {'lat': lat, 'lon': lon, 'alt': alt, 'timestamp': to_epoch_ns(timestamp)}
+        length = len(values['lat'])
+        for column, dtype in STORE_COLUMNS.items():
+            np.ascontiguousarray(values[column], dtype=dtype).tofile(self.files[column])
+        offset = self.point_num
+        self.index_rows.append([str(user), str(traj), int(segment), mode, offset, length])
+        self.segment_keys.add(key)
+        self.point_num += length
+        return offset
+
+    def append_frame(self, user, traj, segment, trajDF, mode=''):
+        """
+        追加一条DataFrame形式的轨迹，列为lat、lon、alt、timestamp。
+        """
+        return self.append(user, traj, segment, trajDF['lat'].values, trajDF['lon'].values,
+                           trajDF['alt'].values, trajDF['timestamp'].values, mode)
+
+    def close(self):
+        """
+        关闭各列文件并写出索引表与元信息（均先写临时文件再替换）。
+        """
+        if all(fp.closed for fp in self.files.values()):
+            return
+        for fp in self.files.values():
+            fp.close()
+        index_path = os.path.join(self.store_path, INDEX_FILE)
+        pd.DataFrame(self.index_rows, columns=INDEX_COLUMNS).to_csv(index_path + '.tmp', sep=',', index=False,
+                                                                    header=True)
+        os.replace(index_path + '.tmp', index_path)
+        meta_path = os.path.join(self.store_path, META_FILE)
+        with open(meta_path + '.tmp', 'w') as fp:
+            json.dump({'version': STORE_VERSION, 'point_num': self.point_num, 'segment_num': len(self.index_rows),
+                       'columns': {column: np.dtype(dtype).str for column, dtype in STORE_COLUMNS.items()}}, fp)
+        os.replace(meta_path + '.tmp', meta_path)
+
+
+def read_store_index(store_path):
+    """
+    读取存储的索引表。
+    """
+    return pd.read_csv(os.path.join(store_path, INDEX_FILE), sep=',', header=0,
+                       dtype={'user': str, 'traj': str, 'mode': str}, keep_default_na=False)
+
+
+class TrajStore(object):
+
+    def __init__(self, store_path):
+        """
+        以内存映射方式打开列式轨迹存储。
+
+        :param store_path: 存储文件夹路径
+        """
+        self.store_path = store_path
+        with open(os.path.join(store_path, META_FILE), 'r') as fp:
+            self.meta = json.load(fp)
+        self.index = read_store_index(store_path)
+        self.columns = {}
+        for column, dtype in STORE_COLUMNS.items():
+            if self.meta['point_num'] == 0:
+                self.columns[column] = np.zeros(0, dtype=dtype)  # 空文件无法内存映射
+            else:
+                self.columns[column] = np.memmap(column_file(store_path, column), dtype=dtype, mode='r',
+                                                 shape=(self.meta['point_num'],))
+        if 'segment_num' in self.meta:
+            self.index = self.index.iloc[:self.meta['segment_num']]  # 忽略元信息写出前中断时多出的索引行
+        self.positions = {}
+        self.index_rows = {}  # 键 -> 索引表中的行号
+        for i, row in enumerate(self.index.itertuples(index=False)):
+            key = (row.user, row.traj, int(row.segment))
+            self.positions[key] = (int(row.offset), int(row.length))
+            self.index_rows[key] = i
+
+    def __len__(self):
+        return len(self.positions)
+
+    def keys(self):
+        """
+        全部 (user, traj, segment) 键，按写入顺序排列。
+        """
+        return list(self.positions.keys())
+
+    def slice(self, offset, length):
+        """
+        按偏移量切片，返回各列的内存映射视图（零拷贝）。
+        """
+        return {column: values[offset:offset + length] for column, values in self.columns.items()}
+
+    def get(self, user, traj, segment=0):
+        """
+        读取一条轨迹（片段）的各列视图。
+
+        :return: 以列名为键的数组字典，timestamp为纪元纳秒
+        """
+        offset, length = self.positions[(str(user), str(traj), int(segment))]
+        return self.slice(offset, length)
+
+    def get_frame(self, user, traj, segment=0):
+        """
+        读取一条轨迹（片段）为DataFrame，列与read_traj_txt相同。
+        """
+        arrays = self.get(user, traj, segment)
+        return pd.DataFrame({'lat': arrays['lat'], 'lon': arrays['lon'], 'alt': arrays['alt'],
+                             'timestamp': np.asarray(arrays['timestamp']).astype('datetime64[ns]')})
+
+    def get_trajectory(self, user, traj, segment=0):
+        """
+        读取一条轨迹（片段）为Trajectory，各列为内存映射视图（零拷贝），出行方式取自索引表。
+        """
+        offset, length = self.positions[(str(user), str(traj), int(segment))]
+        mode = self.index['mode'].values[self.index_rows[(str(user), str(traj), int(segment))]]
+        return tm.Trajectory.from_arrays(self.slice(offset, length), str(user), str(traj), int(segment), mode or None)
+
+    def iter_segments(self):
+        """
+        依次遍历全部轨迹（片段）。
+
+        :return: 生成 (索引行, 各列视图)
+        """
+        for row in self.index.itertuples(index=False):
+            yield row, self.slice(int(row.offset), int(row.length))
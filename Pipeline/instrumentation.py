@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 运行统计：各阶段及各函数的耗时、轨迹点计数（读入、删除、切分、写出）、读写字节数及内存峰值，
+#              输出为json运行报告，并可对指定函数做cProfile性能分析；代替读取函数及数据清洗中的print。
+#              默认关闭，关闭时计数、计时只做一次标志判断。
+#              开启方式：环境变量 TRAJ_INSTRUMENT=1（TRAJ_INSTRUMENT_REPORT 为报告路径，进程退出时写出；
+#              TRAJ_PROFILE 为逗号分隔的函数名，TRAJ_PROFILE_OUTPUT 为cProfile结果路径），或调用enable。
+#              多进程版本中各子进程分别计数，不汇总至主进程。
+import atexit
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+
+try:
+    import resource  # Windows下不可用，内存峰值记为None
+except ImportError:
+    resource = None
+
+
+def peak_memory_kb():
+    """
+    当前进程的内存峰值（KB）。
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS单位为字节
+
+
+def process_io():
+    """
+    当前进程累计读写的字节数（Linux的/proc/self/io，含缓存命中），不可用时返回None。
+    """
+    try:
+        with open('/proc/self/io', 'r') as fp:
+            values = dict(line.split(': ') for line in fp.read().splitlines())
+    except (OSError, ValueError):
+        return None
+    return {'read_bytes': int(values['rchar']), 'write_bytes': int(values['wchar'])}
+
+
+class Instrumentation(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.report_path = None
+        self.profile_functions = set()
+        self.profile_path = None
+        self.profiler = None
+        self.profile_depth = 0  # 正在分析的函数嵌套层数，只在最外层开启、关闭profiler
+        self.reset()
+
+    def reset(self):
+        """
+        清空已记录的统计。
+        """
+        self.start_time = time.time()
+        self.start_io = process_io()
+        self.stages = {}  # 阶段名 -> {calls, seconds, peak_memory_kb, counters}
+        self.functions = {}  # 函数名 -> {calls, seconds}
+        self.counters = {}
+        self.active_stages = []  # 正在运行的阶段，计数同时累加至各阶段
+
+    def add(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+        for stage_name in self.active_stages:
+            counters = self.stages[stage_name]['counters']
+            counters[name] = counters.get(name, 0) + value
+
+    def record(self, table, name, seconds):
+        entry = table.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        return entry
+
+    def start_profile(self):
+        if self.profile_depth == 0:
+            if self.profiler is None:
+                self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.profile_depth += 1
+
+    def stop_profile(self):
+        self.profile_depth -= 1
+        if self.profile_depth == 0:
+            self.profiler.disable()
+
+
+STATE = Instrumentation()
+
+
+def enable(report_path=None, profile_functions=None, profile_path=None):
+    """
+    开启运行统计。
+
+    :param report_path: 运行报告路径（json），给定时进程退出时自动写出
+    :param profile_functions: 需做cProfile分析的函数名（函数的__qualname__或timed给定的名称）
+    :param profile_path: cProfile结果路径，可用pstats或snakeviz查看
+    """
+    STATE.enabled = True
+    STATE.report_path = report_path
+    STATE.profile_functions = set(profile_functions or [])
+    STATE.profile_path = profile_path
+    STATE.reset()
+
+
+def disable():
+    STATE.enabled = False
+
+
+def is_enabled():
+    return STATE.enabled
+
+
+def count(name, value=1):
+    """
+    累加计数，如 count('points_read', len(trajDF))。
+    """
+    if STATE.enabled:
+        STATE.add(name, int(value))
+
+
+def count_file(name, file_path):
+    """
+    按文件大小累加字节数计数，如 count_file('bytes_written', path)；关闭时不访问文件系统。
+    """
+    if STATE.enabled:
+        STATE.add(name, os.path.getsize(file_path))
+
+
+class Timer(object):
+
+    def __init__(self, name, is_stage=False):
+        """
+        计时上下文：with stage('traj_filter'): ...
+
+        :param name: 阶段名或函数名
+        :param is_stage: 是否为阶段（阶段另记录结束时的内存峰值）
+        """
+        self.name = name
+        self.is_stage = is_stage
+        self.start = None
+        self.profiled = False
+
+    def __enter__(self):
+        if STATE.enabled:
+            self.profiled = self.name in STATE.profile_functions
+            if self.profiled:
+                STATE.start_profile()
+            if self.is_stage:
+                STATE.stages.setdefault(self.name, {'calls': 0, 'seconds': 0.0, 'counters': {}})
+                STATE.active_stages.append(self.name)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.start is None:
+            return
+        seconds = time.perf_counter() - self.start
+        if self.profiled:
+            STATE.stop_profile()
+        if self.is_stage:
+            STATE.active_stages.remove(self.name)
+            entry = STATE.record(STATE.stages, self.name, seconds)
+            entry['peak_memory_kb'] = peak_memory_kb()
+        else:
+            STATE.record(STATE.functions, self.name, seconds)
+        self.start = None
+
+
+def stage(name):
+    """
+    阶段计时上下文。
+    """
+    return Timer(name, is_stage=True)
+
+
+def timed(name=None, is_stage=False):
+    """
+    函数计时装饰器：@timed() 以函数名记录，@timed('traj_filter', is_stage=True) 记为阶段。
+    关闭时直接调用原函数。生成器函数的计时从开始迭代至迭代结束（含使用方处理各元素的时间），而非只计生成器的创建。
+    """
+    def decorator(func):
+        key = name or func.__qualname__
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not STATE.enabled:
+                    return (yield from func(*args, **kwargs))
+                with Timer(key, is_stage):
+                    return (yield from func(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not STATE.enabled:
+                return func(*args, **kwargs)
+            with Timer(key, is_stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def report():
+    """
+    生成运行报告。
+
+    :return: 报告字典：耗时、各阶段及函数的调用次数与耗时、计数、进程读写字节数、内存峰值
+    """
+    counters = dict(STATE.counters)
+    dropped = counters.get('points_duplicate', 0) + counters.get('points_outside', 0)
+    if dropped:
+        counters['points_dropped'] = dropped
+    io = process_io()
+    if io is not None and STATE.start_io is not None:
+        io = {key: io[key] - STATE.start_io[key] for key in io}
+    return {'pid': os.getpid(),
+            'start_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(STATE.start_time)),
+            'elapsed_seconds': time.time() - STATE.start_time,
+            'stages': STATE.stages,
+            'functions': dict(sorted(STATE.functions.items(), key=lambda item: -item[1]['seconds'])),
+            'counters': counters,
+            'process_io': io,
+            'peak_memory_kb': peak_memory_kb()}
+
+
+def write_report(report_path=None, profile_path=None):
+    """
+    写出运行报告（json）及cProfile结果。
+
+    :param report_path: 报告路径，默认为enable时给定的路径
+    :param profile_path: cProfile结果路径，默认为enable时给定的路径
+    :return: 报告字典
+    """
+    run_report = report()
+    report_path = report_path or STATE.report_path
+    if report_path:
+        with open(report_path, 'w') as fp:
+            json.dump(run_report, fp, ensure_ascii=False, indent=2)
+    profile_path = profile_path or STATE.profile_path
+    if profile_path and STATE.profiler is not None:
+        STATE.profiler.dump_stats(profile_path)
+    return run_report
+
+
+def write_report_at_exit():
+    if STATE.enabled and (STATE.report_path or STATE.profile_path):
+        write_report()
+
+
+if os.environ.get('TRAJ_INSTRUMENT', '').lower() in ('1', 'true', 'yes', 'on'):
+    enable(os.environ.get('TRAJ_INSTRUMENT_REPORT'),
+           [name for name in os.environ.get('TRAJ_PROFILE', '').split(',') if name],
+           os.environ.get('TRAJ_PROFILE_OUTPUT'))
+atexit.register(write_report_at_exit)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 多进程并行执行相互独立的任务（如逐文件的特征计算）。
+#              任务分块提交至进程池，按任务键收集结果；单个任务出错只记录错误信息，不中断其余任务。
+#              工作进程异常退出（段错误、内存不足被终止）使进程池损坏时，重建进程池继续执行未完成的块，
+#              退出时正在执行的块逐个任务重试，只有导致进程退出的任务记为失败。
+import os
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+
+def run_chunk(func, items):
+    """
+    在工作进程中依次执行一块任务，逐个捕获异常。
+
+    :param func: 任务函数，需为模块级函数（或其functools.partial）以便序列化
+    :param items: 本块任务参数列表
+    :return: [(任务参数, 是否成功, 结果或异常信息)]
+    """
+    outcomes = []
+    for item in items:
+        try:
+            outcomes.append((item, True, func(item)))
+        except Exception:
+            outcomes.append((item, False, traceback.format_exc()))
+    return outcomes
+
+
+def run_pool(func, chunks, workers, max_in_flight):
+    """
+    在一个进程池中执行各块任务，同时提交的块数不超过max_in_flight，以便进程池损坏时缩小可疑范围。
+    进程池损坏后不再提交新的块。
+
+    :param func: 任务函数
+    :param chunks: 各块的任务参数列表
+    :param workers: 进程数
+    :param max_in_flight: 同时提交的最大块数
+    :return: (已完成块的outcomes列表, 进程池损坏时已提交未完成的块序号, 未提交的块序号)
+    """
+    finished = []
+    broken = []
+    waiting = deque(range(len(chunks)))
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while waiting or running:
+            while waiting and len(running) < max_in_flight and not broken:
+                index = waiting.popleft()
+                try:
+                    running[executor.submit(run_chunk, func, chunks[index])] = index
+                except BrokenProcessPool:
+                    waiting.appendleft(index)
+                    break
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    finished.append(future.result())
+                except BrokenProcessPool:
+                    broken.append(index)
+                except Exception:
+                    # 结果无法序列化等情况，整块任务记为失败
+                    error = traceback.format_exc()
+                    finished.append([(item, False, error) for item in chunks[index]])
+            if broken:
+                # 进程池已损坏，其余已提交的块同样无法完成
+                broken.extend(running.values())
+                break
+    return finished, broken, list(waiting)
+
+
+def run_tasks(func, items, workers=None, chunksize=16, ordered=True):
+    """
+    以进程池并行执行func(item)。
+
+    :param func: 任务函数，需为模块级函数（或其functools.partial）
+    :param items: 任务参数列表，同时作为结果的键，需可哈希
+    :param workers: 进程数，默认为CPU核数；为1时在当前进程中顺序执行
+    :param chunksize: 每次提交给进程池的任务数
+    :param ordered: 结果是否按items的顺序排列；否则按完成顺序排列
+    :return: (results, errors) 两个字典：成功任务的结果，失败任务的异常信息
+    """
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    outcomes = []
+    if workers == 1:
+        for chunk in chunks:
+            outcomes.extend(run_chunk(func, chunk))
+    else:
+        suspects = []  # 进程池损坏时正在执行的块中的任务
+        while chunks:
+            finished, broken, waiting = run_pool(func, chunks, workers, 2 * workers)
+            for chunk_outcomes in finished:
+                outcomes.extend(chunk_outcomes)
+            suspects.extend(item for index in broken for item in chunks[index])
+            chunks = [chunks[index] for index in waiting]
+        # 可疑任务逐个重试；再次损坏时，当时正在执行的任务各自在单独的进程池中执行，以确定导致退出的任务
+        chunks = [[item] for item in suspects]
+        while chunks:
+            finished, broken, waiting = run_pool(func, chunks, workers, workers)
+            for chunk_outcomes in finished:
+                outcomes.extend(chunk_outcomes)
+            for index in broken:
+                finished, isolated_broken, _ = run_pool(func, [chunks[index]], 1, 1)
+                for chunk_outcomes in finished:
+                    outcomes.extend(chunk_outcomes)
+                if isolated_broken:
+                    outcomes.append((chunks[index][0], False, "工作进程异常退出（如段错误、内存不足被终止）"))
+            chunks = [chunks[index] for index in waiting]
+        if ordered:
+            positions = {item: position for position, item in enumerate(items)}
+            outcomes.sort(key=lambda outcome: positions[outcome[0]])
+    results = {}
+    errors = {}
+    for item, succeeded, value in outcomes:
+        if succeeded:
+            results[item] = value
+        else:
+            errors[item] = value
+    return results, errors
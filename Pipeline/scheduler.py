@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 可恢复的任务调度：每个 阶段 × user 为一个任务，声明输入、输出路径，由输入输出关系确定任务间的依赖。
+#              任务先写入暂存目录，成功后由主进程以重命名替换正式输出并记录检查点，任务执行中断时的部分输出不会进入正式目录；
+#              重新运行时跳过检查点中已完成且输入未变化的任务，从中断处继续。相互独立的任务以进程池并行执行。
+#              暂存目录位于状态目录下，状态目录应与输出目录在同一文件系统中，以保证重命名为原子操作。
+#              文件/文件夹输出的提交为一次重命名，是原子的；FileSetOutput（共享文件夹中的一组文件）的提交逐个文件重命名，
+#              不是原子的：提交过程中（或提交时中断后）读取方可能看到新旧文件并存，即部分user的片段已更新、
+#              多余的旧片段尚未删除。中断时该任务的检查点尚未写入，重新运行时会重新执行并完成提交；
+#              读取共享文件夹应在调度结束后进行。
+import hashlib
+import json
+import os
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import DataCleaning.data_filter as dfl
+import DataCleaning.extract_labeled_segmentation as els
+import FileOperation.segment_catalog as sc
+import Pipeline.instrumentation as ins
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class CommitRejected(Exception):
+    """
+    提交前的检查未通过（如分片的认领已被其他进程接管），调度中止，不再提交输出或写入检查点。
+    """
+
+
+class FileSetOutput(object):
+
+    def __init__(self, folder_path, prefix):
+        """
+        共享文件夹中以prefix开头的一组文件，如轨迹片段文件夹中某一user的全部片段（prefix为 'user_'）。
+        提交时先逐个移入新文件（替换同名旧文件），再删除该组中本次不再输出的旧文件；整组的提交不是原子的，见模块说明。
+        """
+        self.folder_path = folder_path
+        self.prefix = prefix
+
+    def __repr__(self):
+        return os.path.join(self.folder_path, self.prefix + '*')
+
+
+class Task(object):
+
+    def __init__(self, name, function, args=(), inputs=(), outputs=(), on_commit=None):
+        """
+        调度任务，执行 function(*args, *暂存输出路径)。
+
+        :param name: 任务名，如 'traj_filter/010'
+        :param function: 任务函数，需为模块级函数以便序列化
+        :param args: 任务参数
+        :param inputs: 输入路径列表（文件或文件夹），用于确定依赖及判断输入是否变化
+        :param outputs: 输出列表：路径（文件或文件夹）或FileSetOutput，函数收到对应的暂存路径，
+                        路径输出由函数自行创建，FileSetOutput为已建立的暂存文件夹
+        :param on_commit: 提交后在主进程中调用 on_commit(task, 提交的路径列表, 上次提交而本次不再存在的路径列表)，
+                          如登记轨迹片段目录
+        """
+        self.name = name
+        self.function = function
+        self.args = tuple(args)
+        self.inputs = [os.path.abspath(path) for path in inputs]
+        self.outputs = [output if isinstance(output, FileSetOutput) else os.path.abspath(output)
+                        for output in outputs]
+        self.on_commit = on_commit
+
+    def __repr__(self):
+        return "Task({})".format(self.name)
+
+
+def is_within(path, folder_path):
+    return path == folder_path or path.startswith(folder_path.rstrip(os.sep) + os.sep)
+
+
+def output_overlaps(output, input_path):
+    """
+    判断任务输出是否与另一任务的输入重叠（相同，或一方包含另一方）。
+    """
+    if isinstance(output, FileSetOutput):
+        folder_path = os.path.abspath(output.folder_path)
+        if is_within(folder_path, input_path):
+            return True
+        return is_within(input_path, folder_path) and \
+            os.path.relpath(input_path, folder_path).split(os.sep)[0].startswith(output.prefix)
+    return is_within(input_path, output) or is_within(output, input_path)
+
+
+def input_signature(paths):
+    """
+    输入路径的签名：全部文件（文件夹递归）的相对路径、大小及修改时间的sha1哈希；不存在的路径记为缺失。
+    """
+    sha1 = hashlib.sha1()
+    for path in paths:
+        sha1.update(path.encode())
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            sha1.update("{0}:{1}".format(stat.st_size, stat.st_mtime_ns).encode())
+        elif os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(dir_path, file_name)
+                    stat = os.stat(file_path)
+                    sha1.update("{0}:{1}:{2}".format(os.path.relpath(file_path, path), stat.st_size,
+                                                     stat.st_mtime_ns).encode())
+        else:
+            sha1.update(b"missing")
+    return sha1.hexdigest()
+
+
+def execute_task(function, args, staged_outputs, stage_name=None):
+    """
+    在工作进程中执行任务：清空上次中断留下的暂存内容，建立暂存文件夹后调用任务函数。
+
+    :param staged_outputs: [(暂存路径, 是否需预先建立该文件夹)]
+    :param stage_name: 运行统计中的阶段名，如 'traj_filter'；在子进程中执行时计入子进程的统计
+    :return: 耗时（s）
+    """
+    for staged_path, is_folder in staged_outputs:
+        if os.path.isdir(staged_path):
+            shutil.rmtree(staged_path)
+        elif os.path.exists(staged_path):
+            os.remove(staged_path)
+        os.makedirs(staged_path if is_folder else os.path.dirname(staged_path), exist_ok=True)
+    start = time.perf_counter()
+    with ins.stage(stage_name or function.__name__):
+        function(*args, *[staged_path for staged_path, _ in staged_outputs])
+    return time.perf_counter() - start
+
+
+def replace_path(staged_path, path):
+    """
+    以暂存路径替换正式输出：已有的文件夹先重命名为 .old 再删除，任一时刻正式路径只能是旧输出或完整的新输出（或缺失）。
+    """
+    old_path = path + '.old'
+    if os.path.isdir(old_path):
+        shutil.rmtree(old_path)
+    if os.path.isdir(path) and not os.path.islink(path):
+        os.replace(path, old_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(staged_path, path)
+    if os.path.isdir(old_path):
+        shutil.rmtree(old_path)
+
+
+class Scheduler(object):
+
+    def __init__(self, state_path, workers=None, guard=None, staging_path=None):
+        """
+        :param state_path: 状态目录，存放检查点文件及暂存目录
+        :param workers: 进程数，默认为CPU核数；为1时在当前进程中顺序执行
+        :param guard: 每次提交输出或写入检查点前调用，返回False时抛出CommitRejected，
+                      如分片执行时检查认领是否仍有效，避免已被接管的进程覆盖新持有者的输出
+        :param staging_path: 暂存目录，默认为 状态目录/staging；多个进程可能共用状态目录时应各自指定
+        """
+        self.state_path = state_path
+        self.workers = workers or os.cpu_count() or 1
+        self.guard = guard
+        self.tasks = {}
+        self.checkpoint_path = os.path.join(state_path, CHECKPOINT_FILE)
+        self.staging_path = staging_path or os.path.join(state_path, "staging")
+        os.makedirs(self.staging_path, exist_ok=True)
+        self.checkpoints = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r') as fp:
+                self.checkpoints = json.load(fp)
+
+    def add(self, task):
+        if task.name in self.tasks:
+            raise ValueError("任务名重复：{}".format(task.name))
+        self.tasks[task.name] = task
+
+    def add_tasks(self, tasks):
+        for task in tasks:
+            self.add(task)
+
+    def dependencies(self):
+        """
+        由输入输出关系确定各任务依赖的任务：某任务的输出与另一任务的输入重叠时，后者依赖前者。
+        """
+        dependencies = {name: set() for name in self.tasks}
+        for name, task in self.tasks.items():
+            for other_name, other in self.tasks.items():
+                if other_name != name and any(output_overlaps(output, input_path)
+                                              for output in other.outputs for input_path in task.inputs):
+                    dependencies[name].add(other_name)
+        return dependencies
+
+    def save_checkpoints(self):
+        """
+        写出检查点文件（先写临时文件再替换）。
+        """
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(self.checkpoints, fp, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def staged_outputs(self, task):
+        """
+        任务各输出的暂存路径及其是否需预先建立（FileSetOutput的暂存文件夹）。
+        """
+        task_path = os.path.join(self.staging_path, task.name.replace('/', '__'))
+        staged = []
+        for k, output in enumerate(task.outputs):
+            if isinstance(output, FileSetOutput):
+                staged.append((os.path.join(task_path, str(k)), True))
+            else:
+                staged.append((os.path.join(task_path, str(k), os.path.basename(output)), False))
+        return staged
+
+    def is_complete(self, task, signature):
+        """
+        判断任务是否已完成：检查点记录为完成、输入签名一致且输出均存在。
+        """
+        checkpoint = self.checkpoints.get(task.name)
+        if checkpoint is None or checkpoint['status'] != 'done' or checkpoint['signature'] != signature:
+            return False
+        return all(os.path.exists(path) for path in checkpoint['outputs'])
+
+    def check_guard(self, task):
+        if self.guard is not None and not self.guard():
+            raise CommitRejected("提交前检查未通过，中止调度：{}".format(task.name))
+
+    def commit(self, task, signature, seconds):
+        """
+        将暂存输出替换为正式输出，并记录检查点。
+        """
+        self.check_guard(task)
+        committed = []
+        previous = self.checkpoints.get(task.name, {}).get('outputs', [])
+        for output, (staged_path, _) in zip(task.outputs, self.staged_outputs(task)):
+            if isinstance(output, FileSetOutput):
+                # 先逐个替换为新文件，再删除本次不再输出的旧文件；组内各文件始终为完整的新文件或旧文件
+                os.makedirs(output.folder_path, exist_ok=True)
+                new_names = sorted(os.listdir(staged_path))
+                for file_name in new_names:
+                    file_path = os.path.abspath(os.path.join(output.folder_path, file_name))
+                    os.replace(os.path.join(staged_path, file_name), file_path)
+                    committed.append(file_path)
+                for file_name in os.listdir(output.folder_path):
+                    if file_name.startswith(output.prefix) and file_name not in new_names:
+                        os.remove(os.path.join(output.folder_path, file_name))
+            else:
+                replace_path(staged_path, output)
+                committed.append(output)
+        shutil.rmtree(os.path.join(self.staging_path, task.name.replace('/', '__')), ignore_errors=True)
+        if task.on_commit is not None:
+            task.on_commit(task, committed, [path for path in previous if path not in committed])
+        self.checkpoints[task.name] = {'status': 'done', 'signature': signature, 'outputs': committed,
+                                       'seconds': seconds, 'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self.save_checkpoints()
+
+    def fail(self, task, error):
+        self.check_guard(task)
+        self.checkpoints[task.name] = {'status': 'failed', 'error': error,
+                                       'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self.save_checkpoints()
+
+    def stage_name(self, task):
+        """
+        任务在运行统计中的阶段名：任务名中 '/' 之前的部分，如 'traj_filter/010' 记为 'traj_filter'。
+        """
+        return task.name.split('/')[0]
+
+    @ins.timed('scheduler', is_stage=True)
+    def run(self):
+        """
+        运行全部任务：依赖均已完成的任务即可执行，已完成且输入未变化的任务跳过；
+        失败任务的下游任务不执行，重新运行时重试。各状态的任务数计入运行统计（tasks_done等）。
+        guard检查未通过时抛出CommitRejected，已提交的任务保持不变。
+        工作进程异常退出（段错误、内存不足被终止）时重建进程池，当时正在执行的任务逐个单独重新执行，
+        只有单独执行时仍导致进程退出的任务记为失败（同Pipeline.parallel.run_tasks）。
+
+        :return: 各状态的任务名列表：done（本次执行）、skipped（已完成）、failed、blocked（上游失败）
+        """
+        dependencies = self.dependencies()
+        status = {}  # 任务名 -> done / skipped / failed / blocked
+        running = {}  # future -> (任务, 输入签名)
+        suspects = set()  # 进程池损坏时正在执行的任务，逐个单独执行以确定导致工作进程退出的任务
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            while len(status) < len(self.tasks):
+                progress = len(status)
+                broken = False
+                for name in self.tasks:
+                    if name in status or any(future_task.name == name for future_task, _ in running.values()):
+                        continue
+                    upstream = [status.get(dependency) for dependency in dependencies[name]]
+                    if any(state in ('failed', 'blocked') for state in upstream):
+                        status[name] = 'blocked'
+                        continue
+                    if not all(state in ('done', 'skipped') for state in upstream):
+                        continue
+                    task = self.tasks[name]
+                    signature = input_signature(task.inputs)
+                    if self.is_complete(task, signature):
+                        status[name] = 'skipped'
+                        continue
+                    if executor is None:
+                        try:
+                            seconds = execute_task(task.function, task.args, self.staged_outputs(task),
+                                                   self.stage_name(task))
+                            self.commit(task, signature, seconds)
+                            status[name] = 'done'
+                        except CommitRejected:
+                            raise
+                        except Exception:
+                            self.fail(task, traceback.format_exc())
+                            status[name] = 'failed'
+                    elif len(running) < self.workers and not (suspects and (running or name not in suspects)):
+                        try:
+                            future = executor.submit(execute_task, task.function, task.args,
+                                                     self.staged_outputs(task), self.stage_name(task))
+                        except BrokenProcessPool:
+                            broken = True
+                            break
+                        running[future] = (task, signature)
+                if not running and not broken:
+                    if len(status) == progress:
+                        raise ValueError("任务依赖存在环")
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED) if running else ((), ())
+                for future in finished:
+                    task, signature = running[future]
+                    try:
+                        seconds = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        continue
+                    except Exception:
+                        seconds = None
+                        error = traceback.format_exc()
+                    del running[future]
+                    suspects.discard(task.name)
+                    try:
+                        if seconds is None:
+                            self.fail(task, error)
+                            status[task.name] = 'failed'
+                        else:
+                            self.commit(task, signature, seconds)
+                            status[task.name] = 'done'
+                    except CommitRejected:
+                        raise
+                    except Exception:
+                        self.fail(task, traceback.format_exc())
+                        status[task.name] = 'failed'
+                if broken:
+                    # 工作进程异常退出，进程池已损坏：只有一个任务在执行时记为失败，否则均列为可疑任务，
+                    # 重建进程池后逐个单独重新执行，不计为失败
+                    executor.shutdown()
+                    executor = ProcessPoolExecutor(max_workers=self.workers)
+                    crashed = [task for task, _ in running.values()]
+                    running = {}
+                    if len(crashed) == 1:
+                        suspects.discard(crashed[0].name)
+                        self.fail(crashed[0], "工作进程异常退出（如段错误、内存不足被终止）")
+                        status[crashed[0].name] = 'failed'
+                    else:
+                        suspects.update(task.name for task in crashed)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        summary = {state: [] for state in ('done', 'skipped', 'failed', 'blocked')}
+        for name, state in status.items():
+            summary[state].append(name)
+        for state, names in summary.items():
+            ins.count('tasks_' + state, len(names))
+        return summary
+
+
+def filter_user_folder(user_folder_path, chunksize, staged_path):
+    """
+    任务函数：过滤一个user文件夹（时间戳去重及范围筛选），输出 user/Trajectory/*.txt 及 labels.txt。
+    """
+    traj_path = os.path.join(staged_path, "Trajectory")
+    os.makedirs(traj_path, exist_ok=True)
+    shutil.copyfile(os.path.join(user_folder_path, "labels.txt"), os.path.join(staged_path, "labels.txt"))
+    dfl.traj_filter_one_folder(user_folder_path, traj_path, chunksize)
+
+
+def segment_user_folder(user_folder_path, chunksize, staged_path):
+    """
+    任务函数：按标签分割一个user文件夹中过滤后的轨迹。
+    """
+    els.traj_segmentation_one_folder_join(user_folder_path, staged_path, chunksize)
+
+
+def catalog_updater(catalog_path):
+    """
+    生成提交时登记轨迹片段目录的回调：登记新片段，删除已不存在的旧片段。
+    """
+    def on_commit(task, committed, removed):
+        with sc.SegmentCatalog(catalog_path) as catalog:
+            for location in removed:
+                catalog.remove(location)
+            for location in committed:
+                catalog.add_file(location)
+    return on_commit
+
+
+def pipeline_tasks(data_path, filtered_path, segment_path, users=None, chunksize=None, catalog_path=None):
+    """
+    生成 traj_filter 与 training_traj_segmentation 两个阶段的按user划分的任务。
+
+    :param data_path: 要处理的轨迹数据文件夹路径（user/Trajectory/*.txt 及 labels.txt）
+    :param filtered_path: 过滤后的轨迹输出路径
+    :param segment_path: 轨迹片段输出路径
+    :param users: 要处理的user文件夹名列表，默认为data_path下含Trajectory文件夹的全部user
+    :param chunksize: 给定时分块处理每个轨迹文件
+    :param catalog_path: 轨迹片段目录（SQLite）路径，给定时在主进程中登记提交的片段
+    :return: 任务列表
+    """
+    if users is None:
+        users = sorted(folder for folder in os.listdir(data_path)
+                       if os.path.isdir(os.path.join(data_path, folder, "Trajectory")))
+    on_commit = catalog_updater(catalog_path) if catalog_path is not None else None
+    tasks = []
+    for user in users:
+        user_folder_path = os.path.join(data_path, user)
+        filtered_user_path = os.path.join(filtered_path, user)
+        tasks.append(Task("traj_filter/{}".format(user), filter_user_folder, (user_folder_path, chunksize),
+                          inputs=[user_folder_path], outputs=[filtered_user_path]))
+        tasks.append(Task("training_traj_segmentation/{}".format(user), segment_user_folder,
+                          (filtered_user_path, chunksize), inputs=[filtered_user_path],
+                          outputs=[FileSetOutput(segment_path, user + '_')], on_commit=on_commit))
+    return tasks
+
+
+def run_pipeline(data_path, filtered_path, segment_path, state_path, users=None, workers=None, chunksize=None,
+                 catalog_path=None, guard=None, staging_path=None):
+    """
+    可恢复地运行 traj_filter → training_traj_segmentation，中断后再次调用即从检查点继续。
+
+    :param state_path: 状态目录（检查点及暂存目录）
+    :param workers: 进程数
+    :param guard: 见Scheduler
+    :param staging_path: 见Scheduler
+    :return: Scheduler.run的结果（各状态的任务名列表）
+    """
+    scheduler = Scheduler(state_path, workers, guard, staging_path)
+    scheduler.add_tasks(pipeline_tasks(data_path, filtered_path, segment_path, users, chunksize, catalog_path))
+    return scheduler.run()
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 多进程/多机分片执行：按user文件夹名的哈希将user确定地划分为若干分片，各工作进程（可在不同主机上）
+#              通过共享目录认领分片，对分片内的user运行 traj_filter → training_traj_segmentation（可恢复调度）并计算
+#              分片的特征矩阵，结果写入分片各自的存储目录；全部分片完成后由合并步骤汇总过滤后的轨迹、轨迹片段、
+#              片段目录及特征矩阵。
+#              协调只依赖共享目录中的文件（O_EXCL创建认领文件、定期更新修改时间作为心跳、os.replace写完成/失败标记），
+#              可在同一台Linux机器上以多个进程测试，也可将共享目录挂载至多台主机（需各主机的数据路径相同）。
+#              认领超时被接管的进程在每次提交前检查认领，失效后即中止，不会覆盖新持有者的输出；各次认领使用各自的暂存目录。
+#              分片失败时写出失败标记，其他进程不再认领，合并时报告失败的分片；修复后以retry命令清除失败标记重新执行。
+#              用法：python -m Pipeline.sharding plan 数据文件夹 共享目录 --shards 8
+#                    python -m Pipeline.sharding worker 共享目录 --workers 4      （每个进程/主机各运行一个）
+#                    python -m Pipeline.sharding merge 共享目录 输出文件夹
+#                    python -m Pipeline.sharding retry 共享目录                  （清除失败标记）
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import pandas as pd
+import FeatureExtracting.extract_features as ef
+import FileOperation.feature_matrix as fm
+import FileOperation.segment_catalog as sc
+import Pipeline.instrumentation as ins
+import Pipeline.scheduler as sched
+
+PLAN_FILE = "plan.json"
+DEFAULT_LEASE_SECONDS = 600  # 认领文件超过该时间未更新即视为工作进程已退出，分片可被重新认领
+FILTERED_FOLDER = "Filtered_Data"
+SEGMENT_FOLDER = "Training_traj_segments"
+CATALOG_FILE = "catalog.db"
+MATRIX_FILE = "features.npz"
+
+
+def shard_of(user, shard_count):
+    """
+    user所属的分片序号，由文件夹名的sha1决定，与主机、进程及Python的哈希随机化无关。
+    """
+    return int(hashlib.sha1(str(user).encode()).hexdigest(), 16) % shard_count
+
+
+def write_json(path, value):
+    """
+    先写临时文件再替换，读取方不会读到写入不完整的文件。
+    """
+    tmp_path = "{0}.{1}.{2}.tmp".format(path, socket.gethostname(), os.getpid())
+    with open(tmp_path, 'w') as fp:
+        json.dump(value, fp, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with open(path, 'r') as fp:
+        return json.load(fp)
+
+
+def plan_shards(data_path, shared_path, shard_count, users=None):
+    """
+    划分分片并写出 共享目录/plan.json。
+
+    :param data_path: 要处理的轨迹数据文件夹路径（user/Trajectory/*.txt 及 labels.txt），各工作进程须能以同一路径访问
+    :param shared_path: 共享目录
+    :param shard_count: 分片数
+    :param users: 要处理的user文件夹名列表，默认为data_path下含Trajectory文件夹的全部user
+    :return: 分片计划
+    """
+    if users is None:
+        users = [folder for folder in os.listdir(data_path)
+                 if os.path.isdir(os.path.join(data_path, folder, "Trajectory"))]
+    shards = [[] for _ in range(shard_count)]
+    for user in sorted(users):
+        shards[shard_of(user, shard_count)].append(user)
+    plan = {'data_path': os.path.abspath(data_path), 'shard_count': shard_count, 'shards': shards}
+    for folder in ("claims", "done", "failed", "shards"):
+        os.makedirs(os.path.join(shared_path, folder), exist_ok=True)
+    write_json(os.path.join(shared_path, PLAN_FILE), plan)
+    return plan
+
+
+def read_plan(shared_path):
+    return read_json(os.path.join(shared_path, PLAN_FILE))
+
+
+def shard_store_path(shared_path, shard_index):
+    """
+    分片的存储目录：过滤后的轨迹、轨迹片段、片段目录、特征矩阵及调度状态。
+    """
+    return os.path.join(shared_path, "shards", "{:04d}".format(shard_index))
+
+
+def done_path(shared_path, shard_index):
+    return os.path.join(shared_path, "done", "{:04d}.json".format(shard_index))
+
+
+def failed_path(shared_path, shard_index):
+    return os.path.join(shared_path, "failed", "{:04d}.json".format(shard_index))
+
+
+def claim_paths(shared_path, shard_index):
+    """
+    分片已有的认领文件，按认领次序排列：claims/分片序号.次序.claim
+    """
+    paths = glob.glob(os.path.join(shared_path, "claims", "{:04d}.*.claim".format(shard_index)))
+    return sorted(paths, key=lambda path: int(os.path.basename(path).split('.')[1]))
+
+
+def claim_shard(shared_path, shard_index, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    尝试认领一个分片：分片未被认领，或最近一次认领已超过lease_seconds未更新时，以O_EXCL创建下一次序的认领文件。
+    同一次序的文件只有一个进程能创建成功，因此同一时刻至多一个进程持有分片。
+
+    :return: 认领文件路径，分片已完成、已失败或被其他进程持有时返回None
+    """
+    if os.path.exists(done_path(shared_path, shard_index)) or os.path.exists(failed_path(shared_path, shard_index)):
+        return None
+    paths = claim_paths(shared_path, shard_index)
+    attempt = 0
+    if paths:
+        try:
+            if time.time() - os.path.getmtime(paths[-1]) < lease_seconds:
+                return None
+        except FileNotFoundError:
+            pass
+        attempt = int(os.path.basename(paths[-1]).split('.')[1]) + 1
+    claim_path = os.path.join(shared_path, "claims", "{0:04d}.{1}.claim".format(shard_index, attempt))
+    try:
+        fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, 'w') as fp:
+        json.dump({'host': socket.gethostname(), 'pid': os.getpid(), 'time': time.time()}, fp)
+    return claim_path
+
+
+def holds_claim(shared_path, shard_index, claim_path):
+    """
+    认领是否仍有效：没有更晚次序的认领（超时后被其他进程接管时失效）。
+    """
+    paths = claim_paths(shared_path, shard_index)
+    return bool(paths) and paths[-1] == claim_path
+
+
+class Heartbeat(threading.Thread):
+
+    def __init__(self, claim_path, interval):
+        """
+        后台线程，每interval秒更新一次认领文件的修改时间。
+        """
+        super(Heartbeat, self).__init__(daemon=True)
+        self.claim_path = claim_path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.claim_path)
+            except FileNotFoundError:
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def process_shard(plan, shared_path, shard_index, workers=None, chunksize=None, cache_path=None, claim_path=None):
+    """
+    处理一个分片：可恢复地运行 traj_filter → training_traj_segmentation（检查点位于分片存储目录，
+    分片被接管后从中断处继续），再由轨迹片段计算分片的特征矩阵。
+    给定claim_path时，每次提交输出前检查认领是否仍有效，失效时抛出sched.CommitRejected；
+    暂存目录及特征矩阵的临时文件按认领区分，与接管后的新持有者互不干扰。
+
+    :param claim_path: 本进程的认领文件路径
+    :return: 分片统计
+    """
+    store_path = shard_store_path(shared_path, shard_index)
+    segment_path = os.path.join(store_path, SEGMENT_FOLDER)
+    state_path = os.path.join(store_path, "state")
+    os.makedirs(segment_path, exist_ok=True)
+    sc.SegmentCatalog(os.path.join(store_path, CATALOG_FILE)).close()  # 不含user的分片也生成空的片段目录
+    if claim_path is not None:
+        claim_name = os.path.basename(claim_path)
+
+        def guard():
+            return holds_claim(shared_path, shard_index, claim_path)
+        staging_path = os.path.join(state_path, "staging." + claim_name)
+        matrix_path = os.path.join(store_path, "{0}.{1}.npz".format(os.path.splitext(MATRIX_FILE)[0], claim_name))
+    else:
+        guard = None
+        staging_path = None
+        matrix_path = os.path.join(store_path, MATRIX_FILE)
+    start = time.perf_counter()
+    summary = sched.run_pipeline(plan['data_path'], os.path.join(store_path, FILTERED_FOLDER), segment_path,
+                                 state_path, plan['shards'][shard_index], workers, chunksize,
+                                 os.path.join(store_path, CATALOG_FILE), guard, staging_path)
+    if summary['failed'] or summary['blocked']:
+        raise RuntimeError("分片{0}的任务失败：{1}".format(shard_index, summary['failed']))
+    ef.segments_to_feature_matrix(segment_path, matrix_path, cache_path=cache_path)
+    if claim_path is not None:
+        if not guard():
+            os.remove(matrix_path)
+            raise sched.CommitRejected("分片{}的认领已被其他进程接管".format(shard_index))
+        os.replace(matrix_path, os.path.join(store_path, MATRIX_FILE))
+        shutil.rmtree(staging_path, ignore_errors=True)
+    return {'shard': shard_index,
+            'users': plan['shards'][shard_index],
+            'segments': len([file for file in os.listdir(segment_path) if file.endswith('.txt')]),
+            'tasks_done': len(summary['done']),
+            'tasks_skipped': len(summary['skipped']),
+            'seconds': time.perf_counter() - start,
+            'host': socket.gethostname(),
+            'pid': os.getpid()}
+
+
+def run_worker(shared_path, workers=None, chunksize=None, lease_seconds=DEFAULT_LEASE_SECONDS, cache_path=None):
+    """
+    工作进程：依次认领并处理分片，直至没有可认领的分片（全部完成、已失败或均被其他进程持有）。
+    处理期间由心跳线程保持认领；分片失败时写出失败标记（failed/分片序号.json，含异常信息）并释放认领，
+    此后任何进程都不再认领该分片，直至retry_failed_shards清除标记。认领被接管时中止该分片，不写出标记。
+    各结果的分片数计入运行统计（shards_done、shards_failed、shards_taken_over）。
+
+    :param shared_path: 共享目录
+    :param workers: 每个分片内的进程数
+    :param chunksize: 给定时分块处理每个轨迹文件
+    :param lease_seconds: 认领超时时间，应远大于心跳间隔（lease_seconds / 4）
+    :param cache_path: 特征缓存目录，给定时计算特征矩阵使用特征缓存
+    :return: (完成的分片序号列表, 失败的分片序号列表)
+    """
+    plan = read_plan(shared_path)
+    finished = []
+    failed = []
+    while True:
+        claimed = False
+        for shard_index in range(plan['shard_count']):
+            if shard_index in failed:
+                continue
+            claim_path = claim_shard(shared_path, shard_index, lease_seconds)
+            if claim_path is None:
+                continue
+            claimed = True
+            heartbeat = Heartbeat(claim_path, lease_seconds / 4.0)
+            heartbeat.start()
+            try:
+                shard_summary = process_shard(plan, shared_path, shard_index, workers, chunksize, cache_path,
+                                              claim_path)
+            except sched.CommitRejected:
+                heartbeat.stop()
+                ins.count('shards_taken_over')
+                continue
+            except Exception:
+                heartbeat.stop()
+                ins.count('shards_failed')
+                failed.append(shard_index)
+                if holds_claim(shared_path, shard_index, claim_path):
+                    os.makedirs(os.path.dirname(failed_path(shared_path, shard_index)), exist_ok=True)
+                    write_json(failed_path(shared_path, shard_index),
+                               {'shard': shard_index, 'error': traceback.format_exc(), 'host': socket.gethostname(),
+                                'pid': os.getpid(), 'time': time.strftime('%Y-%m-%d %H:%M:%S')})
+                    os.remove(claim_path)
+                continue
+            heartbeat.stop()
+            if holds_claim(shared_path, shard_index, claim_path):
+                write_json(done_path(shared_path, shard_index), shard_summary)
+                finished.append(shard_index)
+                ins.count('shards_done')
+            else:
+                ins.count('shards_taken_over')
+        if not claimed:
+            return finished, failed
+
+
+def retry_failed_shards(shared_path):
+    """
+    清除全部失败标记，使失败的分片可被重新认领；分片从检查点处继续，已完成的任务不再执行。
+
+    :return: 清除标记的分片序号列表
+    """
+    plan = read_plan(shared_path)
+    cleared = []
+    for shard_index in range(plan['shard_count']):
+        if os.path.exists(failed_path(shared_path, shard_index)):
+            os.remove(failed_path(shared_path, shard_index))
+            cleared.append(shard_index)
+    return cleared
+
+
+def wait_for_shards(shared_path, shard_count, poll_seconds=5.0, timeout=None):
+    """
+    等待全部分片完成或失败。
+
+    :return: 未完成且未失败的分片序号列表（超时时非空）
+    """
+    start = time.time()
+    while True:
+        pending = [k for k in range(shard_count) if not os.path.exists(done_path(shared_path, k))
+                   and not os.path.exists(failed_path(shared_path, k))]
+        if not pending or (timeout is not None and time.time() - start >= timeout):
+            return pending
+        time.sleep(poll_seconds)
+
+
+def merge_catalog(shard_catalog_path, shard_segment_path, catalog_path, segment_path):
+    """
+    将分片的片段目录并入合并后的片段目录，存储位置改写为合并后的轨迹片段文件夹。
+    """
+    shard_prefix = os.path.abspath(shard_segment_path) + os.sep
+    prefix = os.path.abspath(segment_path) + os.sep
+    with sc.SegmentCatalog(catalog_path) as catalog:
+        catalog.connection.execute("ATTACH DATABASE ? AS shard", (shard_catalog_path,))
+        catalog.connection.execute(
+            "INSERT OR REPLACE INTO segments SELECT user, traj, segment_id, mode, point_num, start_time, end_time, "
+            "min_lat, max_lat, min_lon, max_lon, "
+            "CASE WHEN substr(location, 1, length(?1)) = ?1 THEN ?2 || substr(location, length(?1) + 1) "
+            "ELSE location END FROM shard.segments", (shard_prefix, prefix))
+        catalog.commit()
+        catalog.connection.execute("DETACH DATABASE shard")
+
+
+def merge_shards(shared_path, output_path, move=False, poll_seconds=5.0, timeout=None):
+    """
+    合并全部分片的输出：output_path/Filtered_Data、Training_traj_segments、catalog.db 及 features.npz，
+    与单机运行 traj_filter、training_traj_segmentation、build_catalog、segments_to_feature_matrix 的结果相同。
+    特征矩阵按来源文件名排序，与分片数无关；合并时整个特征矩阵载入内存。
+
+    :param shared_path: 共享目录
+    :param output_path: 输出文件夹
+    :param move: 是否移动（而非复制）分片的轨迹文件，移动更快但合并后分片存储不再完整
+    :param poll_seconds: 等待分片完成时的检查间隔（s）
+    :param timeout: 等待的最长时间（s），默认一直等待至全部分片完成或失败
+    :return: 合并统计
+    """
+    plan = read_plan(shared_path)
+    pending = wait_for_shards(shared_path, plan['shard_count'], poll_seconds, timeout)
+    if pending:
+        raise RuntimeError("分片未完成：{}".format(pending))
+    failed = {k: read_json(failed_path(shared_path, k))['error'].strip().splitlines()[-1]
+              for k in range(plan['shard_count'])
+              if not os.path.exists(done_path(shared_path, k)) and os.path.exists(failed_path(shared_path, k))}
+    if failed:
+        raise RuntimeError("分片失败：{}".format(failed))
+    filtered_path = os.path.join(output_path, FILTERED_FOLDER)
+    segment_path = os.path.join(output_path, SEGMENT_FOLDER)
+    catalog_path = os.path.join(output_path, CATALOG_FILE)
+    os.makedirs(filtered_path, exist_ok=True)
+    os.makedirs(segment_path, exist_ok=True)
+    transfer = shutil.move if move else shutil.copy2
+    featureDF_list = []
+    segment_num = 0
+    for shard_index in range(plan['shard_count']):
+        store_path = shard_store_path(shared_path, shard_index)
+        shard_filtered_path = os.path.join(store_path, FILTERED_FOLDER)
+        shard_segment_path = os.path.join(store_path, SEGMENT_FOLDER)
+        for user in plan['shards'][shard_index]:
+            user_path = os.path.join(filtered_path, user)
+            shutil.rmtree(user_path, ignore_errors=True)
+            shutil.copytree(os.path.join(shard_filtered_path, user), user_path, copy_function=transfer)
+        for file in os.listdir(shard_segment_path):
+            if file.endswith('.txt'):
+                transfer(os.path.join(shard_segment_path, file), os.path.join(segment_path, file))
+                segment_num += 1
+        merge_catalog(os.path.join(store_path, CATALOG_FILE), shard_segment_path, catalog_path, segment_path)
+        featureDF_list.append(fm.read_feature_matrix(os.path.join(store_path, MATRIX_FILE)))
+    featureDF = pd.concat(featureDF_list, ignore_index=True).sort_values('source_file', kind='stable')
+    feature_columns = [column for column in featureDF.columns if column not in fm.META_COLUMNS]
+    with fm.FeatureMatrixWriter(os.path.join(output_path, MATRIX_FILE)) as writer:
+        for file, feature_vector in zip(featureDF['source_file'].values, featureDF[feature_columns].values):
+            writer.add(file, feature_vector)
+    with sqlite3.connect(catalog_path) as connection:
+        catalog_num = connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+    return {'shards': plan['shard_count'], 'segments': segment_num, 'catalog_segments': catalog_num,
+            'feature_rows': len(featureDF)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="分片执行 traj_filter → training_traj_segmentation → 特征矩阵")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    plan_parser = subparsers.add_parser('plan', help="划分分片")
+    plan_parser.add_argument('data_path', help="轨迹数据文件夹")
+    plan_parser.add_argument('shared_path', help="共享目录")
+    plan_parser.add_argument('--shards', type=int, required=True, help="分片数")
+    worker_parser = subparsers.add_parser('worker', help="认领并处理分片")
+    worker_parser.add_argument('shared_path', help="共享目录")
+    worker_parser.add_argument('--workers', type=int, default=None, help="每个分片内的进程数")
+    worker_parser.add_argument('--chunksize', type=int, default=None)
+    worker_parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS, help="认领超时时间（s）")
+    worker_parser.add_argument('--cache', default=None, help="特征缓存目录")
+    merge_parser = subparsers.add_parser('merge', help="合并分片输出")
+    merge_parser.add_argument('shared_path', help="共享目录")
+    merge_parser.add_argument('output_path', help="输出文件夹")
+    merge_parser.add_argument('--move', action='store_true', help="移动而非复制分片的轨迹文件")
+    merge_parser.add_argument('--timeout', type=float, default=None, help="等待分片完成的最长时间（s）")
+    retry_parser = subparsers.add_parser('retry', help="清除失败标记，使失败的分片可被重新认领")
+    retry_parser.add_argument('shared_path', help="共享目录")
+    args = parser.parse_args()
+    if args.command == 'plan':
+        shard_plan = plan_shards(args.data_path, args.shared_path, args.shards)
+        for k, shard_users in enumerate(shard_plan['shards']):
+            print("分片", k, "：", len(shard_users), "个user")
+    elif args.command == 'worker':
+        finished_shards, failed_shards = run_worker(args.shared_path, args.workers, args.chunksize, args.lease,
+                                                    args.cache)
+        print("完成的分片：", finished_shards, "失败的分片：", failed_shards)
+    elif args.command == 'retry':
+        print("清除失败标记的分片：", retry_failed_shards(args.shared_path))
+    else:
+        merge_summary = merge_shards(args.shared_path, args.output_path, args.move, timeout=args.timeout)
+        print("合并分片：", merge_summary['shards'], "轨迹片段数：", merge_summary['segments'],
+              "特征矩阵行数：", merge_summary['feature_rows'])
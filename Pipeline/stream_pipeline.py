@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 内存流式处理流程：plt读取 → 时间戳去重 → 范围筛选 → 按标签分段 → 选取出行方式 → 轨迹点特征 → 轨迹特征，
+#              各阶段为生成器，以数组在内存中逐个user传递，不再经由中间txt文件；中间结果仅在指定路径时写出。
+#              同一时刻只保留一个user的数据，内存占用取决于单个user的轨迹点数。
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import DataCleaning.data_filter as dfl
+import DataCleaning.extract_labeled_segmentation as els
+import FileOperation.feature_matrix as fm
+import FileOperation.filter_labeled_data as fld
+import FileOperation.segment_catalog as sc
+import FileOperation.traj_read_and_write as trw
+import FeatureExtracting.point_features as pf
+import FeatureExtracting.segment_statistics as ss
+import Pipeline.instrumentation as ins
+
+
+def arrays_to_frame(arrays, mode=None):
+    """
+    将轨迹数组字典转为DataFrame，列与read_traj_txt（给定mode时与read_mode_traj）相同。
+    """
+    trajDF = pd.DataFrame({'lat': arrays['lat'], 'lon': arrays['lon'], 'alt': arrays['alt'],
+                           'timestamp': np.asarray(arrays['timestamp']).astype('datetime64[ns]')})
+    if mode is not None:
+        trajDF['mode'] = mode
+    return trajDF
+
+
+def read_user_trajs(user_folder_path):
+    """
+    阶段一：依次读取一个user的全部plt轨迹文件。
+
+    :return: 生成 (轨迹文件名（不含扩展名）, 轨迹数组字典)
+    """
+    traj_folder_path = os.path.join(user_folder_path, "Trajectory")
+    for traj_file_name in sorted(os.listdir(traj_folder_path)):
+        yield traj_file_name.split('.')[0], trw.read_plt_arrays(os.path.join(traj_folder_path, traj_file_name))
+
+
+def clean_trajs(trajs, stats, polygon=None, geofence=None):
+    """
+    阶段二：时间戳去重及范围筛选，切分规则与traj_filter_one_folder一致。
+
+    :param trajs: 阶段一的输出
+    :param stats: 计数字典，累加重复点数、范围外点数
+    :param polygon: 范围多边形，默认为SCOPE_POLYGON
+    :param geofence: 地理围栏，给定时代替polygon
+    :return: 生成 (子轨迹名, 轨迹数组字典)，子轨迹名与traj_filter输出的文件名（不含扩展名）相同
+    """
+    for traj_name, arrays in trajs:
+        stats['points_read'] += len(arrays['timestamp'])
+        arrays, duplicate_num = dfl.repetition_filter_arrays(arrays)
+        stats['duplicates'] += duplicate_num
+        ins.count('points_duplicate', duplicate_num)
+        if geofence is not None:
+            inside = geofence.contains(arrays['lat'], arrays['lon'])
+        else:
+            inside = dfl.scope_mask(arrays['lat'], arrays['lon'], polygon)
+        stats['outside'] += int(len(inside) - inside.sum())
+        ins.count('points_outside', int(len(inside) - inside.sum()))
+        starts, ends, traj_is_cut = dfl.split_inside_runs(inside)
+        if not traj_is_cut:
+            yield traj_name, arrays
+            continue
+        for sub_traj_index, (start, end) in enumerate(zip(starts, ends)):
+            yield "{0}_{1}".format(traj_name, sub_traj_index), \
+                {column: values[start:end] for column, values in arrays.items()}
+
+
+def segment_trajs(trajs, labelsDF, user):
+    """
+    阶段三：按出行方式标签分割轨迹，规则与traj_segmentation_one_folder_join一致。
+
+    :param trajs: 阶段二的输出
+    :param labelsDF: 该user的出行方式标签
+    :param user: user编号
+    :return: 生成 (轨迹片段文件名, 出行方式, 轨迹数组字典)
+    """
+    labelsDF = labelsDF.sort_values('start_time', kind='stable').reset_index(drop=True)
+    seg_start_times = labelsDF['start_time'].values.astype('datetime64[ns]').astype(np.int64)
+    seg_end_times = labelsDF['end_time'].values.astype('datetime64[ns]').astype(np.int64)
+    seg_modes = labelsDF['mode'].values
+    for traj_name, arrays in trajs:
+        timestamps = arrays['timestamp']
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            arrays = {column: values[order] for column, values in arrays.items()}
+            timestamps = arrays['timestamp']
+        label_index, starts, ends = els.interval_join(timestamps, seg_start_times, seg_end_times)
+        for sub_traj_id, (ilabel, start, end) in enumerate(zip(label_index, starts, ends), 1):
+            segment_name = "{0}_{1}_{2}_{3}.txt".format(user, traj_name, sub_traj_id, seg_modes[ilabel])
+            yield segment_name, seg_modes[ilabel], {column: values[start:end] for column, values in arrays.items()}
+
+
+def select_segments(segments, stats, excluded_modes=dfl.EXCLUDED_MODES):
+    """
+    阶段四：剔除不用于提取特征的出行方式，规则与select_experimental_traj一致。
+    """
+    for segment_name, mode, arrays in segments:
+        stats['segments'] += 1
+        if mode in excluded_modes:
+            continue
+        stats['selected'] += 1
+        yield segment_name, mode, arrays
+
+
+def segment_features(segments):
+    """
+    阶段五：计算一个user全部轨迹片段的轨迹点特征及轨迹特征向量，片段拼接后一次计算。
+
+    :param segments: 阶段四的输出
+    :return: 生成 (轨迹片段文件名, 出行方式, 轨迹数组字典, 轨迹点特征字典, 33维特征向量)
+    """
+    segments = list(segments)
+    if not segments:
+        return
+    offsets = pf.offsets_from_lengths([len(arrays['timestamp']) for _, _, arrays in segments])
+    features = pf.cal_point_features_batch(np.concatenate([arrays['lat'] for _, _, arrays in segments]),
+                                           np.concatenate([arrays['lon'] for _, _, arrays in segments]),
+                                           np.concatenate([arrays['timestamp'] for _, _, arrays in segments])
+                                           .astype('datetime64[ns]'), offsets)
+    feature_matrix = ss.segment_feature_matrix(features, offsets)
+    for k, (segment_name, mode, arrays) in enumerate(segments):
+        point_features = {column: features[column][offsets[k]:offsets[k + 1]] for column in pf.FEATURE_COLUMNS}
+        yield segment_name, mode, arrays, point_features, feature_matrix[k]
+
+
+def write_filtered_trajs(trajs, user_folder_path, filtered_path):
+    """
+    将阶段二的输出按traj_filter的目录结构写出，并原样传递。
+    """
+    out_path = os.path.join(filtered_path, os.path.basename(os.path.normpath(user_folder_path)))
+    out_traj_path = os.path.join(out_path, "Trajectory")
+    if not os.path.exists(out_traj_path):
+        os.makedirs(out_traj_path)
+    shutil.copyfile(os.path.join(user_folder_path, "labels.txt"), os.path.join(out_path, "labels.txt"))
+    for traj_name, arrays in trajs:
+        arrays_to_frame(arrays).to_csv(os.path.join(out_traj_path, "{}.txt".format(traj_name)),
+                                       sep=',', index=False, header=False)
+        yield traj_name, arrays
+
+
+def write_segments(segments, segment_path, catalog=None):
+    """
+    将阶段三/四的输出按training_traj_segmentation的格式写出，并原样传递。
+
+    :param catalog: 轨迹片段目录（SegmentCatalog），给定时登记写出的片段
+    """
+    if not os.path.exists(segment_path):
+        os.makedirs(segment_path)
+    for segment_name, mode, arrays in segments:
+        sub_traj_path = os.path.join(segment_path, segment_name)
+        arrays_to_frame(arrays, mode).to_csv(sub_traj_path, sep=',', index=False, header=False)
+        if catalog is not None:
+            user, traj, segment_id, _ = trw.parse_segment_file_name(segment_name)
+            catalog.add(user, traj, segment_id, mode, sc.summarize(arrays['lat'], arrays['lon'], arrays['timestamp']),
+                        os.path.abspath(sub_traj_path))
+        yield segment_name, mode, arrays
+
+
+@ins.timed()
+def process_user(user_folder_path, stats, polygon=None, geofence=None, excluded_modes=dfl.EXCLUDED_MODES,
+                 filtered_path=None, segment_path=None, feature_path=None, catalog=None):
+    """
+    串联处理一个user：生成器逐级传递数组，仅在给定路径时写出中间结果。
+
+    :param user_folder_path: 原始user文件夹路径（含labels.txt与Trajectory文件夹）
+    :param stats: 计数字典
+    :param filtered_path: 去重、范围筛选后的轨迹输出路径（同traj_filter），默认不写出
+    :param segment_path: 选取后的轨迹片段输出路径（同Used_sub_traj），默认不写出
+    :param feature_path: 含轨迹点特征的轨迹片段输出路径（同add_features_to_txt），默认不写出
+    :param catalog: 轨迹片段目录（SegmentCatalog），给定segment_path时登记写出的片段
+    :return: 生成 (轨迹片段文件名, 33维特征向量)
+    """
+    user = os.path.basename(os.path.normpath(user_folder_path))
+    trajs = clean_trajs(read_user_trajs(user_folder_path), stats, polygon, geofence)
+    if filtered_path is not None:
+        trajs = write_filtered_trajs(trajs, user_folder_path, filtered_path)
+    segments = select_segments(segment_trajs(trajs, trw.read_label_txt(user_folder_path), user),
+                               stats, excluded_modes)
+    if segment_path is not None:
+        segments = write_segments(segments, segment_path, catalog)
+    if feature_path is not None and not os.path.exists(feature_path):
+        os.makedirs(feature_path)
+    for segment_name, mode, arrays, point_features, feature_vector in segment_features(segments):
+        if feature_path is not None:
+            featureDF = arrays_to_frame(arrays, mode)
+            for column in pf.FEATURE_COLUMNS:
+                featureDF[column] = point_features[column]
+            featureDF.to_csv(os.path.join(feature_path, segment_name), sep=',', index=False, header=True)
+        yield segment_name, feature_vector
+
+
+@ins.timed('run_stream_pipeline', is_stage=True)
+def run_stream_pipeline(raw_geolife_path, matrix_path, user_folders=None, polygon=None, geofence=None,
+                        excluded_modes=dfl.EXCLUDED_MODES, filtered_path=None, segment_path=None, feature_path=None,
+                        catalog_path=None, batch_size=4096):
+    """
+    从原始Geolife数据直接得到特征矩阵，代替 labeled_data_filter → plt2txt_all_folders → traj_filter →
+    training_traj_segmentation → select_experimental_traj → add_features_to_txt → extract_features 的逐级文件读写。
+
+    :param raw_geolife_path: 原始geolife数据集存放路径，至 ./Data一级；只处理含labels.txt的user文件夹
+    :param matrix_path: 特征矩阵文件路径（.npz 或 .parquet）
+    :param user_folders: 要处理的user文件夹路径列表，默认为raw_geolife_path下全部带标签的user
+    :param filtered_path: 见process_user
+    :param segment_path: 见process_user
+    :param feature_path: 见process_user
+    :param catalog_path: 轨迹片段目录（SQLite）路径，给定segment_path时登记写出的片段
+    :param batch_size: 特征矩阵每批写出的行数
+    :return: 计数字典：读取点数、重复点数、范围外点数、轨迹片段数、选取的轨迹片段数、user数
+    """
+    if user_folders is None:
+        user_folders = fld.find_labeled_users(raw_geolife_path)
+    stats = {'users': 0, 'points_read': 0, 'duplicates': 0, 'outside': 0, 'segments': 0, 'selected': 0}
+    catalog = sc.SegmentCatalog(catalog_path) if catalog_path is not None and segment_path is not None else None
+    with fm.FeatureMatrixWriter(matrix_path, batch_size) as writer:
+        for user_folder_path in user_folders:
+            for segment_name, feature_vector in process_user(user_folder_path, stats, polygon, geofence,
+                                                             excluded_modes, filtered_path, segment_path,
+                                                             feature_path, catalog):
+                writer.add(segment_name, feature_vector)
+            stats['users'] += 1
+            if catalog is not None:
+                catalog.commit()
+    if catalog is not None:
+        catalog.close()
+    return stats
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: pytest公共夹具：以Benchmark.geolife_generator生成确定的模拟数据集，
+#              转换为traj_filter读取的4列格式，并生成整文件处理的参考输出（过滤后的轨迹、轨迹片段）。
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Benchmark.geolife_generator as gg  # noqa: E402
+import Benchmark.run_benchmark as rb  # noqa: E402
+import DataCleaning.data_filter as dfl  # noqa: E402
+import DataCleaning.extract_labeled_segmentation as els  # noqa: E402
+import FileOperation.plt2txt as p2t  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def geolife_root(tmp_path_factory):
+    """
+    模拟数据集根目录（Labeled_Data/user/Trajectory/*.plt 及 labels.txt），3个user × 2个文件 × 400点。
+    """
+    root = str(tmp_path_factory.mktemp('geolife'))
+    gg.generate_geolife(root, users=3, files_per_user=2, points_per_file=400, duplicate_rate=0.02,
+                        outside_rate=0.005, seed=7)
+    return root
+
+
+@pytest.fixture(scope='session')
+def traj_data(geolife_root):
+    """
+    traj_filter的输入：user/Trajectory/*.txt（lat,lon,alt,timestamp）及 labels.txt。
+    """
+    paths = rb.stage_paths(geolife_root)
+    os.makedirs(paths['plt2txt'], exist_ok=True)
+    p2t.plt2txt_all_folders(geolife_root)
+    rb.raw_txt_to_traj(paths['plt2txt'], paths['raw_txt_to_traj'])
+    return paths['raw_txt_to_traj']
+
+
+@pytest.fixture(scope='session')
+def reference_outputs(traj_data, tmp_path_factory):
+    """
+    整文件处理的参考输出：(过滤后的轨迹文件夹, 轨迹片段文件夹)。
+    """
+    root = str(tmp_path_factory.mktemp('reference'))
+    filtered_path = os.path.join(root, "Filtered_Data")
+    segment_path = os.path.join(root, "Training_traj_segments")
+    os.makedirs(filtered_path)
+    os.makedirs(segment_path)
+    dfl.traj_filter(traj_data, filtered_path)
+    els.training_traj_segmentation(filtered_path, segment_path)
+    return filtered_path, segment_path
+
+
+def folder_files(folder_path):
+    """
+    文件夹中全部文件的 相对路径 -> 内容（字节）。
+    """
+    files = {}
+    for dir_path, _, file_names in os.walk(folder_path):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            with open(path, 'rb') as fp:
+                files[os.path.relpath(path, folder_path)] = fp.read()
+    return files
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 分块处理（chunksize）与整文件处理的输出逐字节一致：traj_filter、training_traj_segmentation、
+#              add_features_to_txt 及 extract_features。
+import os
+import shutil
+
+import pytest
+
+import DataCleaning.data_filter as dfl
+import DataCleaning.extract_labeled_segmentation as els
+import FeatureExtracting.extract_features as ef
+from conftest import folder_files
+
+CHUNKSIZES = [1, 5, 97]
+
+
+@pytest.fixture(scope='module')
+def whole_file_features(reference_outputs, tmp_path_factory):
+    """
+    整文件处理的 (带特征的轨迹片段文件夹, 特征向量文件夹)。
+    """
+    root = tmp_path_factory.mktemp('whole_features')
+    feature_path = str(root / 'features')
+    vector_path = str(root / 'vectors')
+    shutil.copytree(reference_outputs[1], feature_path)
+    os.makedirs(vector_path)
+    ef.add_features_to_txt(feature_path)
+    ef.extract_features(feature_path, vector_path)
+    return feature_path, vector_path
+
+
+@pytest.mark.parametrize('chunksize', CHUNKSIZES)
+def test_chunked_traj_filter(traj_data, reference_outputs, tmp_path, chunksize):
+    dfl.traj_filter(traj_data, str(tmp_path), chunksize)
+    assert folder_files(str(tmp_path)) == folder_files(reference_outputs[0])
+
+
+@pytest.mark.parametrize('chunksize', CHUNKSIZES)
+def test_chunked_segmentation(reference_outputs, tmp_path, chunksize):
+    els.training_traj_segmentation(reference_outputs[0], str(tmp_path), chunksize)
+    assert folder_files(str(tmp_path)) == folder_files(reference_outputs[1])
+
+
+@pytest.mark.parametrize('chunksize', CHUNKSIZES)
+def test_chunked_features(reference_outputs, whole_file_features, tmp_path, chunksize):
+    feature_path = str(tmp_path / 'features')
+    vector_path = str(tmp_path / 'vectors')
+    shutil.copytree(reference_outputs[1], feature_path)
+    os.makedirs(vector_path)
+    ef.add_features_to_txt(feature_path, chunksize)
+    assert folder_files(feature_path) == folder_files(whole_file_features[0])
+    ef.extract_features(feature_path, vector_path, chunksize)
+    assert folder_files(vector_path) == folder_files(whole_file_features[1])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 特征缓存：命中与未命中、按最近使用时间淘汰至低水位、遗留临时文件的清理。
+import os
+import time
+
+import numpy as np
+
+import FeatureExtracting.feature_cache as fc
+import FeatureExtracting.point_features as pf
+
+
+def make_segment(seed, n=50):
+    rng = np.random.RandomState(seed)
+    lat = 39.9 + np.cumsum(rng.uniform(-1e-4, 1e-4, n))
+    lon = 116.3 + np.cumsum(rng.uniform(-1e-4, 1e-4, n))
+    timestamps = np.datetime64('2008-04-04T01:00:00') + np.arange(n) * np.timedelta64(2, 's')
+    return lat, lon, timestamps
+
+
+def test_hit_and_miss(tmp_path):
+    cache = fc.FeatureCache(str(tmp_path))
+    lat, lon, timestamps = make_segment(0)
+    first = cache.point_features(lat, lon, timestamps)
+    second = cache.point_features(lat, lon, timestamps)
+    assert (cache.hits, cache.misses) == (1, 1)
+    expected = pf.cal_point_features(lat, lon, timestamps)
+    for column in pf.FEATURE_COLUMNS:
+        np.testing.assert_array_equal(first[column], expected[column])
+        np.testing.assert_array_equal(second[column], expected[column])
+    # 重新打开后仍命中
+    reopened = fc.FeatureCache(str(tmp_path))
+    reopened.point_features(lat, lon, timestamps)
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+
+def test_evict_to_low_water_mark(tmp_path):
+    probe = fc.FeatureCache(str(tmp_path / 'probe'))
+    probe.point_features(*make_segment(0))
+    entry_size = probe.total_bytes
+
+    cache = fc.FeatureCache(str(tmp_path / 'cache'), max_bytes=20 * entry_size)
+    evicting_puts = 0
+    for seed in range(100):
+        entry_num_before = len(list(cache.entries()))
+        cache.point_features(*make_segment(seed))
+        if len(list(cache.entries())) <= entry_num_before:
+            evicting_puts += 1
+        assert cache.total_bytes <= cache.max_bytes
+    assert cache.total_bytes == sum(size for _, size, _ in cache.entries())
+    # 超出上限时淘汰至18个条目，此后两次写入不再触发淘汰，而非每次写入都淘汰1个
+    assert evicting_puts <= 100 // 2
+    # 最近写入的条目保留，最早的已被淘汰
+    assert cache.get(fc.content_key(*make_segment(99))) is not None
+    assert cache.get(fc.content_key(*make_segment(0))) is None
+
+
+def test_remove_stale_tmp(tmp_path):
+    cache = fc.FeatureCache(str(tmp_path))
+    cache.point_features(*make_segment(0))
+    stale_path = os.path.join(str(tmp_path), 'ab', 'ab00.npz.123.tmp')
+    fresh_path = os.path.join(str(tmp_path), 'ab', 'ab01.npz.124.tmp')
+    os.makedirs(os.path.dirname(stale_path), exist_ok=True)
+    for path in (stale_path, fresh_path):
+        with open(path, 'wb') as fp:
+            fp.write(b'\0' * 100)
+    old = time.time() - fc.STALE_TMP_SECONDS - 10
+    os.utime(stale_path, (old, old))
+
+    reopened = fc.FeatureCache(str(tmp_path))
+    assert not os.path.exists(stale_path)
+    assert os.path.exists(fresh_path)  # 可能仍在写入
+    assert len(list(reopened.entries())) == 1
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 特征矩阵文件的写出、读取，及与逐文件特征向量的一致性。
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.segment_statistics as ss
+import FileOperation.feature_matrix as fm
+
+FORMATS = ['.npz', '.parquet']
+
+
+@pytest.fixture(scope='module')
+def feature_folder(reference_outputs, tmp_path_factory):
+    feature_path = str(tmp_path_factory.mktemp('matrix') / 'features')
+    shutil.copytree(reference_outputs[1], feature_path)
+    ef.add_features_to_txt(feature_path)
+    return feature_path
+
+
+@pytest.mark.parametrize('extension', FORMATS)
+def test_matrix_matches_per_file_vectors(feature_folder, tmp_path, extension):
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    vector_path = tmp_path / 'vectors'
+    vector_path.mkdir()
+    ef.extract_features(feature_folder, str(vector_path))
+    matrix_path = str(tmp_path / ('features' + extension))
+    ef.extract_features_to_matrix(feature_folder, matrix_path, batch_size=5)
+    featureDF = fm.read_feature_matrix(matrix_path)
+    assert sorted(featureDF['source_file']) == sorted(os.listdir(feature_folder))
+    for row in featureDF.itertuples(index=False):
+        expected = pd.read_csv(vector_path / row.source_file, header=None, float_precision='round_trip').values[0]
+        np.testing.assert_array_equal(np.asarray(row[len(fm.META_COLUMNS):], dtype=np.float64), expected)
+        assert row.source_file == "{0}_{1}_{2}_{3}.txt".format(row.user, row.traj, row.segment_id, row.mode)
+
+
+@pytest.mark.parametrize('extension', FORMATS)
+def test_exception_in_with_block_writes_nothing(tmp_path, extension):
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    matrix_path = str(tmp_path / ('features' + extension))
+    vector = np.arange(len(ss.FEATURE_NAMES), dtype=np.float64)
+    with pytest.raises(RuntimeError):
+        with fm.FeatureMatrixWriter(matrix_path, batch_size=2) as writer:
+            for segment_id in range(5):
+                writer.add("000_20080401000000_{}_walk.txt".format(segment_id), vector)
+            raise RuntimeError("interrupted")
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_exception_keeps_previous_matrix(tmp_path):
+    matrix_path = str(tmp_path / 'features.npz')
+    vector = np.arange(len(ss.FEATURE_NAMES), dtype=np.float64)
+    with fm.FeatureMatrixWriter(matrix_path) as writer:
+        writer.add("000_20080401000000_0_walk.txt", vector)
+    with pytest.raises(RuntimeError):
+        with fm.FeatureMatrixWriter(matrix_path) as writer:
+            writer.add("000_20080401000000_1_bus.txt", vector)
+            raise RuntimeError("interrupted")
+    assert os.listdir(str(tmp_path)) == ['features.npz']
+    assert list(fm.read_feature_matrix(matrix_path)['mode']) == ['walk']
+
+
+@pytest.mark.parametrize('extension', FORMATS)
+def test_empty_matrix_has_all_columns(tmp_path, extension):
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    matrix_path = str(tmp_path / ('features' + extension))
+    with fm.FeatureMatrixWriter(matrix_path):
+        pass
+    assert os.listdir(str(tmp_path)) == ['features' + extension]
+    featureDF = fm.read_feature_matrix(matrix_path)
+    assert len(featureDF) == 0
+    assert list(featureDF.columns) == fm.META_COLUMNS + ss.FEATURE_NAMES
+    assert featureDF['segment_id'].dtype == np.int64
+    assert (featureDF[ss.FEATURE_NAMES].dtypes == np.float64).all()
+
+
+def test_parquet_matches_npz(tmp_path):
+    pytest.importorskip('pyarrow')
+    vectors = np.arange(3 * len(ss.FEATURE_NAMES), dtype=np.float64).reshape(3, -1) / 7
+    results = []
+    for extension in FORMATS:
+        matrix_path = str(tmp_path / ('features' + extension))
+        with fm.FeatureMatrixWriter(matrix_path, batch_size=2) as writer:
+            for segment_id, vector in enumerate(vectors):
+                writer.add("000_20080401000000_{}_walk.txt".format(segment_id), vector)
+        results.append(fm.read_feature_matrix(matrix_path))
+    pd.testing.assert_frame_equal(results[1], results[0], check_dtype=False)
+    assert results[1]['segment_id'].dtype == np.int64
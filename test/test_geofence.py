@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 地理围栏：重叠区域取最先出现者、默认范围多边形下与scope_mask一致，以及GeoJSON/WKT加载。
+import json
+import os
+
+import numpy as np
+import pytest
+from shapely.geometry import Polygon, box
+
+import DataCleaning.data_filter as dfl
+import DataCleaning.geofence as gf
+import FileOperation.traj_read_and_write as trw
+from conftest import folder_files
+
+
+def default_geofence():
+    # SCOPE_POLYGON为 (lat, lon)，地理围栏坐标为 (lon, lat)
+    return gf.Geofence([Polygon([(lon, lat) for lat, lon in dfl.SCOPE_POLYGON])])
+
+
+def test_overlapping_regions_lowest_index_wins():
+    # 区域b包含区域a及c的一部分，(39.75, 116.75)同时在三个区域内；查询顺序不影响结果
+    geofence = gf.Geofence([box(116.0, 39.0, 117.0, 40.0), box(115.5, 38.5, 117.5, 40.5), box(116.5, 39.5, 118.0, 41.0)],
+                           region_ids=['a', 'b', 'c'])
+    lat = np.array([39.5, 39.75, 38.75, 40.25, 40.75, 42.0, 39.0])
+    lon = np.array([116.5, 116.75, 116.0, 117.0, 117.75, 116.0, 116.5])
+    region = geofence.assign(lat, lon)
+    # (39.0, 116.5)在a的边界上、b的内部
+    assert region.tolist() == [0, 0, 1, 1, 2, gf.OUTSIDE, 1]
+    assert geofence.region_of(region) == ['a', 'a', 'b', 'b', 'c', None, 'b']
+    # 分块查询结果相同
+    assert geofence.assign(lat, lon, chunk_size=2).tolist() == region.tolist()
+    reversed_fence = gf.Geofence(list(geofence.geometries[::-1]))
+    assert reversed_fence.assign(lat, lon).tolist() == [1, 0, 1, 0, 0, gf.OUTSIDE, 1]
+
+
+def test_default_polygon_matches_scope_mask():
+    rng = np.random.RandomState(0)
+    lat = np.concatenate([rng.uniform(38.5, 42.0, 5000), [39.3, 39.3, 40.0, 41.1, 39.3]])
+    lon = np.concatenate([rng.uniform(38.0, 119.0, 5000), [116.0, 115.3, 117.6, 100.0, 117.6]])
+    inside = dfl.scope_mask(lat, lon)
+    assert 0 < inside.sum() < len(inside)
+    assert default_geofence().contains(lat, lon).tolist() == inside.tolist()
+    assert not default_geofence().contains(lat[-5:], lon[-5:]).any()  # 边界上的点不在范围内
+
+
+def test_scope_filter_with_default_geofence(traj_data, reference_outputs, tmp_path):
+    for user in sorted(os.listdir(traj_data)):
+        traj_folder = os.path.join(traj_data, user, "Trajectory")
+        for traj_file in sorted(os.listdir(traj_folder)):
+            trajectory = trw.read_traj_txt(os.path.join(traj_folder, traj_file))
+            name = traj_file.split('.')[0]
+            (tmp_path / 'polygon' / user).mkdir(parents=True, exist_ok=True)
+            (tmp_path / 'geofence' / user).mkdir(parents=True, exist_ok=True)
+            dfl.scope_filter_vectorized(trajectory, str(tmp_path / 'polygon' / user / name))
+            dfl.scope_filter_vectorized(trajectory, str(tmp_path / 'geofence' / user / name),
+                                        geofence=default_geofence())
+    assert folder_files(str(tmp_path / 'geofence')) == folder_files(str(tmp_path / 'polygon'))
+
+
+@pytest.mark.parametrize('layout', ['collection', 'feature', 'geometry'])
+def test_load_geojson(layout, tmp_path):
+    geometries = [{'type': 'Polygon', 'coordinates': [[[116.0, 39.0], [117.0, 39.0], [117.0, 40.0],
+                                                       [116.0, 40.0], [116.0, 39.0]]]},
+                  {'type': 'MultiPolygon', 'coordinates': [[[[118.0, 39.0], [119.0, 39.0], [119.0, 40.0],
+                                                              [118.0, 39.0]]],
+                                                            [[[120.0, 39.0], [121.0, 39.0], [121.0, 40.0],
+                                                              [120.0, 40.0], [120.0, 39.0]]]]}]
+    features = [{'type': 'Feature', 'geometry': geometry, 'properties': {'name': name}}
+                for geometry, name in zip(geometries, ['city', 'suburb'])]
+    if layout == 'collection':
+        data = {'type': 'FeatureCollection', 'features': features}
+    elif layout == 'feature':
+        data = features[1]
+    else:
+        data = geometries[1]
+    path = tmp_path / 'fence.geojson'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    lat = [39.5, 39.2, 39.5, 39.5]
+    lon = [116.5, 118.5, 120.5, 115.0]
+
+    geofence = gf.load_geofence_geojson(str(path))
+    if layout == 'collection':
+        assert geofence.region_ids == [0, 1]
+        assert geofence.assign(lat, lon).tolist() == [0, 1, 1, gf.OUTSIDE]
+        named = gf.load_geofence_geojson(str(path), id_property='name')
+        assert named.region_of(named.assign(lat, lon)) == ['city', 'suburb', 'suburb', None]
+    else:
+        assert len(geofence) == 1
+        assert geofence.assign(lat, lon).tolist() == [gf.OUTSIDE, 0, 0, gf.OUTSIDE]
+
+
+def test_load_wkt(tmp_path):
+    path = tmp_path / 'fence.wkt'
+    path.write_text("city\tPOLYGON ((116 39, 117 39, 117 40, 116 40, 116 39))\n"
+                    "\n"
+                    "MULTIPOLYGON (((118 39, 119 39, 119 40, 118 39)), ((120 39, 121 39, 121 40, 120 40, 120 39)))\n",
+                    encoding='utf-8')
+    geofence = gf.load_geofence_wkt(str(path))
+    assert geofence.region_ids == ['city', 1]
+    region = geofence.assign([39.5, 39.2, 39.5, 39.5], [116.5, 118.5, 120.5, 115.0])
+    assert geofence.region_of(region) == ['city', 1, 1, None]
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 依据转换清单的增量plt转换与带标签数据筛选：重复运行、输入变化、输入删除及中断后继续。
+import os
+import shutil
+
+import pytest
+
+import FileOperation.filter_labeled_data as fld
+import FileOperation.plt2txt as p2t
+from conftest import folder_files
+
+
+@pytest.fixture
+def data_root(geolife_root, tmp_path):
+    root = str(tmp_path / 'data')
+    shutil.copytree(os.path.join(geolife_root, "Labeled_Data"), os.path.join(root, "Labeled_Data"))
+    return root
+
+
+def input_num(root):
+    return sum(len(file_names) for _, _, file_names in os.walk(os.path.join(root, "Labeled_Data")))
+
+
+def converted_outputs(root):
+    files = folder_files(os.path.join(root, "Process_01"))
+    files.pop('manifest.json', None)
+    return files
+
+
+def test_incremental_plt2txt_matches_full_conversion(data_root, tmp_path):
+    full_root = str(tmp_path / 'full')
+    shutil.copytree(os.path.join(data_root, "Labeled_Data"), os.path.join(full_root, "Labeled_Data"))
+    os.makedirs(os.path.join(full_root, "Process_01"))
+    p2t.plt2txt_all_folders(full_root)
+
+    total = input_num(data_root)
+    assert p2t.plt2txt_all_folders_incremental(data_root) == (total, 0, 0)
+    assert converted_outputs(data_root) == converted_outputs(full_root)
+    assert p2t.plt2txt_all_folders_incremental(data_root) == (0, total, 0)
+
+
+def test_incremental_plt2txt_changed_and_removed_inputs(data_root):
+    p2t.plt2txt_all_folders_incremental(data_root)
+    traj_path = os.path.join(data_root, "Labeled_Data", "001", "Trajectory")
+    changed, removed = sorted(os.listdir(traj_path))[:2]
+    with open(os.path.join(traj_path, changed), 'a') as fp:
+        fp.write("39.900000,116.400000,0,150,39600.0000000000,2008-06-01,00:00:00\n")
+    os.remove(os.path.join(traj_path, removed))
+    total = input_num(data_root)
+    assert p2t.plt2txt_all_folders_incremental(data_root) == (1, total - 1, 1)
+    output_path = os.path.join(data_root, "Process_01", "001", "Trajectory")
+    assert not os.path.exists(os.path.join(output_path, removed.replace('.plt', '.txt')))
+    with open(os.path.join(output_path, changed.replace('.plt', '.txt'))) as fp:
+        assert fp.read().rstrip().endswith("00:00:00")
+
+
+def test_interrupted_plt2txt_resumes_after_finished_folders(data_root, monkeypatch):
+    convert = p2t.plt2txt_one_file
+    interrupted_folder = os.path.join(data_root, "Labeled_Data", "002")
+
+    def interrupt(traj_file_path, store_path):
+        if traj_file_path.startswith(interrupted_folder):
+            raise KeyboardInterrupt
+        convert(traj_file_path, store_path)
+
+    monkeypatch.setattr(p2t, 'plt2txt_one_file', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        p2t.plt2txt_all_folders_incremental(data_root)
+    monkeypatch.setattr(p2t, 'plt2txt_one_file', convert)
+    remaining = sum(len(file_names) for _, _, file_names in os.walk(interrupted_folder))
+    assert p2t.plt2txt_all_folders_incremental(data_root) == (remaining, input_num(data_root) - remaining, 0)
+
+
+def test_interrupted_labeled_filter_resumes_after_finished_folders(data_root, tmp_path, monkeypatch):
+    raw_path = os.path.join(data_root, "Labeled_Data")
+    store_dir = str(tmp_path / 'selected')
+    copyfile = shutil.copyfile
+    interrupted_folder = os.path.join(raw_path, "001")
+
+    def interrupt(input_path, output_path):
+        if input_path.startswith(interrupted_folder):
+            raise KeyboardInterrupt
+        return copyfile(input_path, output_path)
+
+    monkeypatch.setattr(fld.shutil, 'copyfile', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        fld.labeled_data_filter_incremental(raw_path, store_dir)
+    monkeypatch.setattr(fld.shutil, 'copyfile', copyfile)
+    first_num = sum(len(file_names) for _, _, file_names in os.walk(os.path.join(raw_path, "000")))
+    total = input_num(data_root)
+    assert fld.labeled_data_filter_incremental(raw_path, store_dir) == (total - first_num, first_num, 0)
+    selected = folder_files(store_dir)
+    selected.pop('manifest.json')
+    assert selected == folder_files(raw_path)
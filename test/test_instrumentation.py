@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 运行统计：函数计时、阶段计数，生成器函数的计时覆盖整个迭代过程。
+import time
+
+import pytest
+
+import Pipeline.instrumentation as ins
+
+
+@pytest.fixture
+def instrumentation():
+    ins.enable()
+    yield ins.STATE
+    ins.disable()
+    ins.STATE.reset()
+
+
+@ins.timed('slow_generator', is_stage=True)
+def slow_generator(n):
+    for i in range(n):
+        time.sleep(0.01)
+        ins.count('items', 1)
+        yield i
+
+
+@ins.timed()
+def slow_function():
+    time.sleep(0.01)
+    return 1
+
+
+def test_timed_function(instrumentation):
+    assert slow_function() == 1
+    entry = instrumentation.functions['slow_function']
+    assert entry['calls'] == 1
+    assert entry['seconds'] >= 0.01
+
+
+def test_timed_generator_times_iteration(instrumentation):
+    generator = slow_generator(5)
+    assert 'slow_generator' not in instrumentation.stages  # 创建时尚未开始计时
+    assert list(generator) == [0, 1, 2, 3, 4]
+    entry = instrumentation.stages['slow_generator']
+    assert entry['calls'] == 1
+    assert entry['seconds'] >= 0.05
+    assert entry['counters'] == {'items': 5}
+    assert instrumentation.active_stages == []
+
+
+def test_timed_generator_closed_early(instrumentation):
+    generator = slow_generator(5)
+    assert next(generator) == 0
+    generator.close()
+    assert instrumentation.stages['slow_generator']['counters'] == {'items': 1}
+    assert instrumentation.active_stages == []
+
+
+def test_timed_generator_disabled():
+    assert not ins.is_enabled()
+    assert list(slow_generator(3)) == [0, 1, 2]
+    assert 'slow_generator' not in ins.STATE.stages
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 标签区间索引与逐条标签的暴力查找一致：重叠标签取开始时间最早者（相同时取文件中靠前者）、
+#              标签之外及未知用户的时刻无标签，以及npz缓存的保存与读取。
+import numpy as np
+import pandas as pd
+import pytest
+
+import DataCleaning.label_index as li
+
+LABELS = {
+    '010': [('2008/04/02 11:00:00', '2008/04/02 11:30:00', 'walk'),
+            ('2008/04/02 10:00:00', '2008/04/02 11:10:00', 'bus'),  # 与上一行重叠且开始更早
+            ('2008/04/02 11:20:00', '2008/04/02 12:00:00', 'car'),
+            ('2008/04/02 11:20:00', '2008/04/02 11:40:00', 'taxi'),  # 开始时间与上一行相同，文件中靠后
+            ('2008/04/02 13:00:00', '2008/04/02 13:00:00', 'bike'),  # 单一时刻
+            ('2008/04/02 14:00:00', '2008/04/02 13:50:00', 'train')],  # 结束早于开始，无效
+    '020': [('2008/04/03 08:00:00', '2008/04/03 09:00:00', 'subway'),
+            ('2008/04/03 08:30:00', '2008/04/03 08:45:00', 'walk')],
+}
+
+
+@pytest.fixture
+def label_root(tmp_path):
+    for user, rows in LABELS.items():
+        (tmp_path / user).mkdir()
+        lines = ["Start Time\tEnd Time\tTransportation Mode\n"] + ["\t".join(row) + "\n" for row in rows]
+        (tmp_path / user / "labels.txt").write_text(''.join(lines))
+    (tmp_path / '030').mkdir()  # 无标签文件的用户
+    return str(tmp_path)
+
+
+def brute_force_lookup(user, timestamp):
+    best = None
+    for order, (start, end, mode) in enumerate(LABELS.get(user, [])):
+        start = pd.Timestamp(start.replace('/', '-'))
+        end = pd.Timestamp(end.replace('/', '-'))
+        if start <= timestamp <= end and (best is None or (start, order) < best[:2]):
+            best = (start, order, mode)
+    return None if best is None else best[2]
+
+
+def query_points():
+    users = []
+    timestamps = []
+    for user, day in [('010', '2008-04-02'), ('020', '2008-04-03'), ('030', '2008-04-02'), ('999', '2008-04-02')]:
+        times = pd.date_range(day + ' 07:00:00', day + ' 15:00:00', freq='5min')
+        # 各标签首尾时刻及其前后1纳秒
+        for start, end, _ in LABELS.get(user, LABELS['010']):
+            for value in (start, end):
+                moment = pd.Timestamp(value.replace('/', '-'))
+                times = times.append(pd.DatetimeIndex([moment - pd.Timedelta(1), moment, moment + pd.Timedelta(1)]))
+        users.extend([user] * len(times))
+        timestamps.extend(times)
+    return np.array(users), pd.DatetimeIndex(timestamps).values
+
+
+def test_lookup_matches_brute_force(label_root):
+    index = li.build_label_index(label_root)
+    users, timestamps = query_points()
+    result = index.lookup(users, timestamps)
+    expected = [brute_force_lookup(user, pd.Timestamp(t)) for user, t in zip(users, timestamps)]
+    assert result.tolist() == expected
+    # 整数纳秒查询结果相同
+    assert index.lookup(users, timestamps.astype(np.int64)).tolist() == expected
+
+
+def test_overlaps_and_unlabeled_points(label_root):
+    index = li.build_label_index(label_root)
+    assert index.users.tolist() == ['010', '020']
+    times = pd.to_datetime(['2008-04-02 09:59:59', '2008-04-02 11:05:00', '2008-04-02 11:15:00',
+                            '2008-04-02 11:25:00', '2008-04-02 11:35:00', '2008-04-02 11:50:00', '2008-04-02 12:00:00',
+                            '2008-04-02 12:00:01', '2008-04-02 13:00:00', '2008-04-02 13:55:00']).values
+    assert index.lookup('010', times).tolist() == [None, 'bus', 'walk', 'walk', 'car', 'car', 'car', None,
+                                                'bike', None]
+    assert index.lookup('020', pd.to_datetime(['2008-04-03 08:40:00']).values).tolist() == ['subway']
+    codes = index.lookup_codes(['030', '999'], pd.to_datetime(['2008-04-02 11:05:00'] * 2).values)
+    assert codes.tolist() == [li.UNLABELED, li.UNLABELED]
+    assert 'train' not in index.modes.tolist()
+
+
+def test_save_load_round_trip(label_root, tmp_path):
+    index = li.build_label_index(label_root)
+    index_path = str(tmp_path / 'label_index.npz')
+    index.save(index_path)
+    loaded = li.load_label_index(index_path)
+    for name in ('users', 'offsets', 'boundaries', 'codes', 'modes'):
+        assert np.array_equal(getattr(loaded, name), getattr(index, name))
+        assert getattr(loaded, name).dtype == getattr(index, name).dtype
+    users, timestamps = query_points()
+    assert loaded.lookup(users, timestamps).tolist() == index.lookup(users, timestamps).tolist()
+
+
+def test_empty_data_folder(tmp_path):
+    index = li.build_label_index(str(tmp_path))
+    assert len(index.users) == 0
+    assert index.lookup('010', pd.to_datetime(['2008-04-02 11:05:00']).values).tolist() == [None]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 带标签数据的选取（索引、符号链接、硬链接）及多进程plt转换，与 labeled_data_filter + plt2txt_all_folders 结果一致。
+import os
+import shutil
+
+import pytest
+
+import Benchmark.geolife_generator as gg
+import FileOperation.filter_labeled_data as fld
+import FileOperation.plt2txt as p2t
+from conftest import folder_files
+
+# labeled_data_filter中写定的路径（Linux下为相对路径）
+RAW_GEOLIFE_PATH = "E:/Users/Desktop/Traffic_Pattern_Mining/2_TrajectoryModeClassify/" \
+                   "1 Data_Graduate Design Experiment/Geolife Trajectories 1.3/Data"
+LEGACY_ROOT = "E:/Users/Desktop/Traffic_Pattern_Mining/2_TrajectoryModeClassify/3_Data"
+
+
+@pytest.fixture
+def raw_geolife(tmp_path, monkeypatch):
+    """
+    原始数据集：3个带标签的user及1个无标签的user，返回 (原始数据路径, 旧流程转换结果 Process_01)。
+    """
+    monkeypatch.chdir(tmp_path)
+    generated_path = str(tmp_path / 'generated')
+    gg.generate_geolife(generated_path, users=3, files_per_user=2, points_per_file=50, seed=11)
+    shutil.copytree(os.path.join(generated_path, "Labeled_Data"), RAW_GEOLIFE_PATH)
+    unlabeled_path = os.path.join(RAW_GEOLIFE_PATH, "100", "Trajectory")
+    shutil.copytree(os.path.join(RAW_GEOLIFE_PATH, "000", "Trajectory"), unlabeled_path)
+    os.makedirs(os.path.join(LEGACY_ROOT, "Labeled_Data"))
+    os.makedirs(os.path.join(LEGACY_ROOT, "Process_01"))
+    fld.labeled_data_filter()
+    p2t.plt2txt_all_folders(LEGACY_ROOT)
+    return os.path.abspath(RAW_GEOLIFE_PATH), os.path.abspath(os.path.join(LEGACY_ROOT, "Process_01"))
+
+
+def test_find_labeled_users_and_index(raw_geolife, tmp_path):
+    raw_path, _ = raw_geolife
+    expected = [os.path.join(raw_path, user) for user in ('000', '001', '002')]
+    assert fld.find_labeled_users(raw_path) == expected
+    assert sorted(os.listdir(os.path.join(LEGACY_ROOT, "Labeled_Data"))) == ['000', '001', '002']
+    index_path = str(tmp_path / 'labeled.txt')
+    assert fld.build_labeled_index(raw_path, index_path) == expected
+    assert fld.read_labeled_index(index_path) == expected
+
+
+@pytest.mark.parametrize('link_type', ['symlink', 'hardlink'])
+def test_linked_data_matches_copy(raw_geolife, tmp_path, link_type):
+    raw_path, legacy_process_path = raw_geolife
+    root = str(tmp_path / 'linked')
+    store_dir = os.path.join(root, "Labeled_Data")
+    assert fld.link_labeled_data(raw_path, store_dir, link_type) == 3
+    assert fld.link_labeled_data(raw_path, store_dir, link_type) == 3  # 可重复运行
+    assert sorted(os.listdir(store_dir)) == ['000', '001', '002']
+    for user in os.listdir(store_dir):
+        assert folder_files(os.path.join(store_dir, user)) == \
+            folder_files(os.path.join(LEGACY_ROOT, "Labeled_Data", user))
+    assert p2t.plt2txt_all_folders_parallel(root, workers=2) == {}
+    assert folder_files(os.path.join(root, "Process_01")) == folder_files(legacy_process_path)
+
+
+def test_parallel_conversion_from_index(raw_geolife, tmp_path):
+    raw_path, legacy_process_path = raw_geolife
+    root = str(tmp_path / 'indexed')
+    index_path = str(tmp_path / 'labeled.txt')
+    fld.build_labeled_index(raw_path, index_path)
+    assert p2t.plt2txt_all_folders_parallel(root, fld.read_labeled_index(index_path), workers=2) == {}
+    assert folder_files(os.path.join(root, "Process_01")) == folder_files(legacy_process_path)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 在线特征提取：精确计算阶段与cal_common_feature + extract_*_part完全相同；此后分位数估计的秩误差在0.05以内；
+#              时间戳未递增的点被忽略。
+import numpy as np
+import pandas as pd
+import pytest
+
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.online_features as of
+import FeatureExtracting.segment_statistics as ss
+
+
+def random_traj(rng, n):
+    lat = 39.9 + np.cumsum(rng.normal(0, 1e-4, n))
+    lon = 116.4 + np.cumsum(rng.normal(0, 1e-4, n))
+    timestamps = pd.Timestamp('2008-04-04') + pd.to_timedelta(np.cumsum(rng.randint(1, 5, n)), unit='s')
+    return lat, lon, timestamps
+
+
+def batch_vector(lat, lon, timestamps):
+    trajDF = ef.cal_common_feature(pd.DataFrame({'lat': lat, 'lon': lon, 'alt': 0, 'timestamp': timestamps}))
+    vector = (ef.extract_distance_part(trajDF) + ef.extract_velocity_part(trajDF) +
+              ef.extract_accelerate_part(trajDF) + ef.extract_bearing_part(trajDF) + ef.extract_steering_part(trajDF))
+    return vector, trajDF
+
+
+def online_vector(lat, lon, timestamps):
+    extractor = of.OnlineFeatureExtractor()
+    extractor.update_many(lat, lon, timestamps)
+    return extractor.feature_vector()
+
+
+def test_exact_within_buffer():
+    rng = np.random.RandomState(0)
+    for n in list(range(1, of.EXACT_POINTS + 1)) + [of.EXACT_POINTS] * 20:
+        lat, lon, timestamps = random_traj(rng, n)
+        np.testing.assert_array_equal(online_vector(lat, lon, timestamps), batch_vector(lat, lon, timestamps)[0],
+                                      err_msg=str(n))
+
+
+def test_prefix_vectors_exact():
+    # 逐点加入时，每个时刻的向量均与该前缀的批量计算结果相同
+    rng = np.random.RandomState(1)
+    lat, lon, timestamps = random_traj(rng, of.EXACT_POINTS)
+    extractor = of.OnlineFeatureExtractor()
+    for k in range(of.EXACT_POINTS):
+        extractor.update(lat[k], lon[k], timestamps[k])
+        np.testing.assert_array_equal(extractor.feature_vector(), batch_vector(lat[:k + 1], lon[:k + 1],
+                                                                                timestamps[:k + 1])[0])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_estimates_beyond_buffer(seed):
+    rng = np.random.RandomState(seed)
+    for n in (of.EXACT_POINTS + 1, 200, 1000, 3000):
+        lat, lon, timestamps = random_traj(rng, n)
+        online = np.array(online_vector(lat, lon, timestamps))
+        batch, trajDF = batch_vector(lat, lon, timestamps)
+        batch = np.array(batch)
+        assert online[0] == pytest.approx(batch[0], rel=1e-12)  # 距离总和
+        for c, column in enumerate(ss.STAT_COLUMNS):
+            part, expected = online[1 + 8 * c:9 + 8 * c], batch[1 + 8 * c:9 + 8 * c]
+            assert part[0] == expected[0] and part[7] == expected[7]  # 最大值、极差
+            np.testing.assert_allclose(part[5:7], expected[5:7], rtol=1e-9, atol=1.01e-4)  # 均值、方差（舍入至4位）
+            values = np.sort(trajDF[column].values)
+            for estimate, q in zip(part[1:5], ss.QUANTILES):
+                # 估计值在全部观测值中的秩（考虑舍入）与目标分位数之差
+                low = np.searchsorted(values, estimate - 1e-4, 'left') / len(values)
+                high = np.searchsorted(values, estimate + 1e-4, 'right') / len(values)
+                assert low - 0.05 <= q <= high + 0.05, (n, column, q, estimate)
+
+
+def test_non_increasing_timestamps_skipped():
+    rng = np.random.RandomState(2)
+    lat, lon, timestamps = random_traj(rng, 30)
+    extractor = of.OnlineFeatureExtractor()
+    for k in range(30):
+        assert extractor.update(lat[k], lon[k], timestamps[k])
+        if k in (5, 12):
+            assert not extractor.update(lat[k] + 0.01, lon[k], timestamps[k])  # 重复时间戳
+            assert not extractor.update(lat[k], lon[k] + 0.01, timestamps[k] - pd.Timedelta(seconds=1))  # 乱序
+    assert extractor.skipped_num == 4
+    assert extractor.point_num == 30
+    np.testing.assert_array_equal(extractor.feature_vector(), batch_vector(lat, lon, timestamps)[0])
+
+    # 批量计算遇到重复时间戳时抛出异常
+    with pytest.raises(ZeroDivisionError):
+        batch_vector(np.r_[lat, lat[-1]], np.r_[lon, lon[-1]], timestamps.append(timestamps[-1:]))
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 进程池并行执行：任务异常与工作进程异常退出时的结果收集。
+import os
+
+import Pipeline.parallel as parallel
+
+CRASH_ITEM = 37
+ERROR_ITEM = 5
+
+
+def square_or_fail(item):
+    if item == CRASH_ITEM:
+        os._exit(1)  # 模拟段错误或被OOM终止
+    if item == ERROR_ITEM:
+        raise ValueError("bad item")
+    return item * item
+
+
+def test_sequential_and_parallel_agree():
+    items = [item for item in range(60) if item != CRASH_ITEM]
+    sequential = parallel.run_tasks(square_or_fail, items, workers=1, chunksize=7)
+    pooled = parallel.run_tasks(square_or_fail, items, workers=3, chunksize=7)
+    assert sequential[0] == pooled[0] == {item: item * item for item in items if item != ERROR_ITEM}
+    assert list(pooled[0]) == [item for item in items if item != ERROR_ITEM]
+    assert set(pooled[1]) == {ERROR_ITEM} and 'ValueError' in pooled[1][ERROR_ITEM]
+
+
+def test_worker_crash_fails_only_the_crashing_item():
+    items = list(range(200))
+    results, errors = parallel.run_tasks(square_or_fail, items, workers=4, chunksize=8)
+    assert set(errors) == {CRASH_ITEM, ERROR_ITEM}
+    assert results == {item: item * item for item in items if item not in (CRASH_ITEM, ERROR_ITEM)}
+    assert list(results) == sorted(results)
+
+
+def test_unordered_results_cover_all_items():
+    items = list(range(100))
+    results, errors = parallel.run_tasks(square_or_fail, items, workers=2, chunksize=5, ordered=False)
+    assert set(results) | set(errors) == set(items)
+    assert set(errors) == {CRASH_ITEM, ERROR_ITEM}
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: read_plt直接读取plt文件，与plt2txt转换后read_raw_traj_txt读取的结果相同。
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+import FileOperation.plt2txt as p2t
+import FileOperation.traj_read_and_write as trw
+
+PLT_HEADER = "Geolife trajectory\nWGS 84\nAltitude is in Feet\nReserved 3\n0,2,255,My Track,0,0,2,8421376\n0\n"
+
+
+def assert_same_as_text_path(plt_path, store_path):
+    txt_path = p2t.plt2txt_one_file(plt_path, store_path)
+    expected = trw.read_raw_traj_txt(txt_path)
+    result = trw.read_plt(plt_path)
+    assert list(result.columns) == list(expected.columns)
+    # 文本路径的时间精度随pandas版本为us或ns，时刻本身须相同
+    expected['timestamp'] = expected['timestamp'].astype('datetime64[ns]')
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_generated_files_match_text_path(geolife_root, tmp_path):
+    plt_paths = sorted(glob.glob(os.path.join(geolife_root, "Labeled_Data", "*", "Trajectory", "*.plt")))
+    assert plt_paths
+    for plt_path in plt_paths:
+        assert_same_as_text_path(plt_path, str(tmp_path))
+
+
+@pytest.mark.parametrize('altitudes', [
+    ['492', '-777', '0'],
+    ['492.125984251969', '-777', '1.5e3'],
+    ['163.0', '163', '164'],
+])
+def test_altitude_values_match_text_path(altitudes, tmp_path):
+    # 含小数、科学计数法的高程在两条路径中均为float64且数值相同，全为整数时均为int64
+    plt_path = os.path.join(str(tmp_path), "20081023025304.plt")
+    lines = ["39.98{0},116.32{0},0,{1},{2:.10f},2008-10-23,02:5{0}:04\n".format(
+        i, alt, 39744 + (2 * 3600 + (50 + i) * 60 + 4) / 86400.0) for i, alt in enumerate(altitudes)]
+    with open(plt_path, 'w') as fp:
+        fp.write(PLT_HEADER + ''.join(lines))
+    assert_same_as_text_path(plt_path, str(tmp_path))
+    alt = trw.read_plt_arrays(plt_path)['alt']
+    assert alt.tolist() == [float(value) for value in altitudes]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 向量化轨迹点特征与原逐点循环实现（cal_common_feature的原始版本）的一致性。
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.point_features as pf
+import FileOperation.traj_read_and_write as trw
+
+
+def legacy_common_feature(trajDF):
+    """
+    cal_common_feature的原逐点循环实现，由标量函数逐点计算。
+    """
+    distance = [0]
+    velocity = [0]
+    accelerate = [0]
+    bearing = [ef.get_azimuth(trajDF.iloc[0, 0], trajDF.iloc[0, 1], trajDF.iloc[1, 0], trajDF.iloc[1, 1])]
+    steering_angle = [0]
+    for i in range(1, len(trajDF)):
+        deltaT = ef.delta_time(trajDF.iloc[i - 1, 3], trajDF.iloc[i, 3])
+        s = ef.cal_distance(trajDF.iloc[i - 1, 0], trajDF.iloc[i - 1, 1], trajDF.iloc[i, 0], trajDF.iloc[i, 1])
+        distance.append(s)
+        velocity.append(ef.get_velocity(s, deltaT))
+        accelerate.append(ef.get_accelerate(velocity[i], velocity[i - 1], deltaT))
+        if i != len(trajDF) - 1:
+            bearing.append(ef.get_azimuth(trajDF.iloc[i, 0], trajDF.iloc[i, 1],
+                                          trajDF.iloc[i + 1, 0], trajDF.iloc[i + 1, 1]))
+            steering_angle.append(ef.get_steering_angle(bearing[i - 1], bearing[i]))
+        else:
+            bearing.append(0)
+            steering_angle.append(0)
+    return {'distance': distance, 'velocity': velocity, 'accelerate': accelerate, 'bearing': bearing,
+            'steering_A': steering_angle}
+
+
+def test_cal_common_feature_matches_legacy(reference_outputs):
+    segment_path = reference_outputs[1]
+    files = sorted(os.listdir(segment_path))
+    assert files
+    for file in files:
+        trajDF = trw.read_mode_traj(os.path.join(segment_path, file))
+        if len(trajDF) < 2:
+            continue
+        expected = legacy_common_feature(trajDF)
+        featureDF = ef.cal_common_feature(trajDF.copy())
+        for column in pf.FEATURE_COLUMNS:
+            np.testing.assert_array_equal(featureDF[column].values, np.asarray(expected[column], dtype=np.float64),
+                                          err_msg="{0} {1}".format(file, column))
+
+
+def test_cal_common_feature_written_file_matches_legacy(reference_outputs, tmp_path):
+    segment_path = reference_outputs[1]
+    file = sorted(os.listdir(segment_path))[0]
+    trajDF = trw.read_mode_traj(os.path.join(segment_path, file))
+    legacyDF = trajDF.copy()
+    for column, values in legacy_common_feature(trajDF).items():
+        legacyDF[column] = values
+    legacyDF.to_csv(tmp_path / 'legacy.txt', sep=',', index=False, header=True)
+    ef.cal_common_feature(trajDF).to_csv(tmp_path / 'vectorized.txt', sep=',', index=False, header=True)
+    assert (tmp_path / 'legacy.txt').read_bytes() == (tmp_path / 'vectorized.txt').read_bytes()
+
+
+def test_zero_time_delta_raises():
+    trajDF = pd.DataFrame({'lat': [39.90, 39.91, 39.92], 'lon': [116.40, 116.41, 116.42], 'alt': [0, 0, 0],
+                           'timestamp': pd.to_datetime(['2008-04-01 00:00:00', '2008-04-01 00:00:05',
+                                                        '2008-04-01 00:00:05'])})
+    with pytest.raises(ZeroDivisionError):
+        legacy_common_feature(trajDF)
+    with pytest.raises(ZeroDivisionError):
+        ef.cal_common_feature(trajDF)
+
+
+def test_zero_time_delta_across_trajectories_is_allowed():
+    # 跨轨迹边界的点对不参与计算：后一条轨迹的首点与前一条轨迹的末点时间戳相同时不报错
+    timestamps = np.array(['2008-04-01T00:00:00', '2008-04-01T00:00:05', '2008-04-01T00:00:05',
+                           '2008-04-01T00:00:09'], dtype='datetime64[ns]')
+    features = pf.cal_point_features_batch([39.90, 39.91, 39.95, 39.96], [116.40, 116.41, 116.45, 116.46],
+                                           timestamps, [0, 2, 4])
+    assert np.isfinite(features['velocity']).all() and np.isfinite(features['accelerate']).all()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 多轨迹拼接批量计算轨迹点特征与逐条计算的一致性。
+import os
+
+import numpy as np
+
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.point_features as pf
+import FileOperation.traj_read_and_write as trw
+
+
+def read_segments(segment_path):
+    return [trw.read_mode_traj(os.path.join(segment_path, file)) for file in sorted(os.listdir(segment_path))]
+
+
+def test_batch_matches_per_trajectory(reference_outputs):
+    trajDF_list = [trajDF for trajDF in read_segments(reference_outputs[1]) if len(trajDF) >= 2]
+    expected = [ef.cal_common_feature(trajDF.copy()) for trajDF in trajDF_list]
+    batch = ef.cal_common_feature_batch([trajDF.copy() for trajDF in trajDF_list])
+    assert len(batch) == len(expected)
+    for featureDF, expectedDF in zip(batch, expected):
+        for column in pf.FEATURE_COLUMNS:
+            np.testing.assert_array_equal(featureDF[column].values, expectedDF[column].values)
+
+
+def test_batch_with_empty_and_single_point_trajectories(reference_outputs):
+    trajDF = read_segments(reference_outputs[1])[0]
+    lat, lon, timestamps = trajDF['lat'].values, trajDF['lon'].values, trajDF['timestamp'].values
+    # 依次为：空轨迹、整条轨迹、单点轨迹、空轨迹、整条轨迹
+    parts = [slice(0, 0), slice(None), slice(0, 1), slice(0, 0), slice(None)]
+    offsets = pf.offsets_from_lengths([len(lat[part]) for part in parts])
+    features = pf.cal_point_features_batch(np.concatenate([lat[part] for part in parts]),
+                                           np.concatenate([lon[part] for part in parts]),
+                                           np.concatenate([timestamps[part] for part in parts]), offsets)
+    single = pf.cal_point_features(lat, lon, timestamps)
+    for column in pf.FEATURE_COLUMNS:
+        values = pf.split_by_offsets(features[column], offsets)
+        np.testing.assert_array_equal(values[1], single[column])
+        np.testing.assert_array_equal(values[4], single[column])
+        np.testing.assert_array_equal(values[2], np.zeros(1))
+        assert len(values[0]) == len(values[3]) == 0
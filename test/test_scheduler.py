@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 可恢复调度：输出与整文件处理一致；重新运行跳过已完成的任务；失败不留下部分输出，恢复后只重跑失败及其下游的任务；
+#              输入变化只重跑相应user的任务；运行统计记录各阶段。
+import os
+import shutil
+
+import pytest
+
+import Pipeline.instrumentation as ins
+import Pipeline.scheduler as sched
+from conftest import folder_files
+
+
+@pytest.fixture
+def pipeline(traj_data, tmp_path):
+    """
+    复制一份输入数据，返回以相同路径运行run_pipeline的函数及各路径。
+    """
+    data_path = str(tmp_path / 'data')
+    shutil.copytree(traj_data, data_path)
+    paths = {'data': data_path, 'filtered': str(tmp_path / 'Filtered_Data'),
+             'segments': str(tmp_path / 'Training_traj_segments'), 'state': str(tmp_path / 'state')}
+
+    def run(workers=1):
+        return sched.run_pipeline(paths['data'], paths['filtered'], paths['segments'], paths['state'], workers=workers)
+    return run, paths
+
+
+def test_outputs_match_whole_file(pipeline, reference_outputs):
+    run, paths = pipeline
+    summary = run(workers=2)
+    assert len(summary['done']) == 6 and not summary['failed'] and not summary['skipped']
+    assert folder_files(paths['filtered']) == folder_files(reference_outputs[0])
+    assert folder_files(paths['segments']) == folder_files(reference_outputs[1])
+    # 再次运行全部跳过
+    summary = run()
+    assert summary['done'] == [] and len(summary['skipped']) == 6
+
+
+def test_failure_and_resume(pipeline, reference_outputs):
+    run, paths = pipeline
+    run()
+    traj_folder = os.path.join(paths['data'], '001', 'Trajectory')
+    broken_path = os.path.join(traj_folder, sorted(os.listdir(traj_folder))[0])
+    with open(broken_path, 'rb') as fp:
+        original = fp.read()
+    with open(broken_path, 'ab') as fp:
+        fp.write(b'not,a,valid,timestamp\n')
+
+    summary = run()
+    assert summary['failed'] == ['traj_filter/001']
+    assert summary['blocked'] == ['training_traj_segmentation/001']
+    assert sorted(summary['skipped']) == ['training_traj_segmentation/000', 'training_traj_segmentation/002',
+                                            'traj_filter/000', 'traj_filter/002']
+    # 失败任务不留下部分输出，正式目录仍为上次的完整输出
+    assert folder_files(paths['filtered']) == folder_files(reference_outputs[0])
+    assert folder_files(paths['segments']) == folder_files(reference_outputs[1])
+
+    with open(broken_path, 'wb') as fp:
+        fp.write(original)
+    summary = run()
+    assert sorted(summary['done']) == ['training_traj_segmentation/001', 'traj_filter/001']
+    assert len(summary['skipped']) == 4
+    assert folder_files(paths['filtered']) == folder_files(reference_outputs[0])
+    assert folder_files(paths['segments']) == folder_files(reference_outputs[1])
+
+
+def test_touched_input_reruns_only_that_user(pipeline):
+    run, paths = pipeline
+    run()
+    traj_folder = os.path.join(paths['data'], '002', 'Trajectory')
+    touched_path = os.path.join(traj_folder, sorted(os.listdir(traj_folder))[0])
+    stat = os.stat(touched_path)
+    os.utime(touched_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    summary = run()
+    assert sorted(summary['done']) == ['training_traj_segmentation/002', 'traj_filter/002']
+    assert len(summary['skipped']) == 4
+
+
+def test_run_report(pipeline):
+    run, paths = pipeline
+    ins.enable()
+    try:
+        run()
+        run_report = ins.report()
+    finally:
+        ins.disable()
+        ins.STATE.reset()
+    assert run_report['stages']['scheduler']['calls'] == 1
+    assert run_report['stages']['traj_filter']['calls'] == 3
+    assert run_report['stages']['training_traj_segmentation']['calls'] == 3
+    assert run_report['counters']['tasks_done'] == 6
+    assert run_report['stages']['scheduler']['counters']['tasks_done'] == 6
+
+
+def write_value(value, staged_path):
+    """
+    任务函数：写出一个文件；value为 'crash' 时工作进程直接退出，为 'error' 时抛出异常。
+    """
+    if value == 'crash':
+        os._exit(1)
+    if value == 'error':
+        raise ValueError(value)
+    with open(staged_path, 'w') as fp:
+        fp.write(value)
+
+
+def test_crashed_worker_fails_only_its_task(tmp_path):
+    scheduler = sched.Scheduler(str(tmp_path / 'state'), workers=3)
+    values = ['a', 'b', 'crash', 'c', 'd', 'error', 'e', 'f']
+    for k, value in enumerate(values):
+        scheduler.add(sched.Task("write/{}".format(k), write_value, (value,),
+                                 outputs=[str(tmp_path / 'out' / "{}.txt".format(k))]))
+    summary = scheduler.run()
+    assert sorted(summary['failed']) == ['write/2', 'write/5']
+    assert sorted(summary['done']) == ["write/{}".format(k) for k in (0, 1, 3, 4, 6, 7)]
+    assert "工作进程异常退出" in scheduler.checkpoints['write/2']['error']
+    assert "ValueError" in scheduler.checkpoints['write/5']['error']
+    for k in (0, 1, 3, 4, 6, 7):
+        with open(str(tmp_path / 'out' / "{}.txt".format(k))) as fp:
+            assert fp.read() == values[k]
+    assert not os.path.exists(str(tmp_path / 'out' / '2.txt'))
+
+
+def write_file_set(input_path, staged_path):
+    """
+    任务函数：输入文件每行一个文件名，在暂存文件夹中写出这些文件。
+    """
+    with open(input_path) as fp:
+        for file_name in fp.read().split():
+            with open(os.path.join(staged_path, file_name), 'w') as out:
+                out.write(file_name)
+
+
+def test_file_set_commit_replaces_group(tmp_path):
+    input_path = str(tmp_path / 'names.txt')
+    folder_path = str(tmp_path / 'segments')
+    os.makedirs(folder_path)
+    with open(os.path.join(folder_path, '002_other.txt'), 'w') as fp:
+        fp.write('other user')
+    commits = []
+
+    def run(names):
+        with open(input_path, 'w') as fp:
+            fp.write(' '.join(names))
+        os.utime(input_path, ns=(0, len(commits) * 10 ** 9))  # 保证输入签名变化
+        scheduler = sched.Scheduler(str(tmp_path / 'state'), workers=1)
+        scheduler.add(sched.Task('segment/001', write_file_set, (input_path,), inputs=[input_path],
+                                 outputs=[sched.FileSetOutput(folder_path, '001_')],
+                                 on_commit=lambda task, committed, removed: commits.append((committed, removed))))
+        return scheduler.run()
+
+    assert run(['001_a.txt', '001_b.txt', '001_c.txt'])['done'] == ['segment/001']
+    assert sorted(os.listdir(folder_path)) == ['001_a.txt', '001_b.txt', '001_c.txt', '002_other.txt']
+    assert run(['001_b.txt', '001_d.txt'])['done'] == ['segment/001']
+    assert sorted(os.listdir(folder_path)) == ['001_b.txt', '001_d.txt', '002_other.txt']
+    assert [os.path.basename(path) for path in commits[-1][1]] == ['001_a.txt', '001_c.txt']
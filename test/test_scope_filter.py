@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 向量化范围筛选（scope_mask、split_inside_runs、scope_filter_vectorized）与逐点的scope_filter
+#              输出逐字节一致：范围内→范围外→范围内的切分、首尾点在范围外、过短子轨迹的剔除及恰在多边形边界上的点。
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point, Polygon
+
+import DataCleaning.data_filter as dfl
+from conftest import folder_files
+
+# 恰在SCOPE_POLYGON边界上的点（含顶点），contains为False，按范围外处理
+BOUNDARY_POINTS = [(39.3, 116.0), (39.3, 115.3), (40.0, 117.6), (41.1, 100.0)]
+
+
+def make_trajectory(pattern, seed=0):
+    """
+    按模式串生成轨迹：I为范围内的点，O为范围外的点，B为边界上的点。
+    """
+    rng = np.random.RandomState(seed)
+    lat = []
+    lon = []
+    boundary_index = 0
+    for kind in pattern:
+        if kind == 'I':
+            lat.append(round(40.0 + rng.uniform(-0.05, 0.05), 6))
+            lon.append(round(116.4 + rng.uniform(-0.05, 0.05), 6))
+        elif kind == 'O':
+            lat.append(round(38.0 + rng.uniform(-0.05, 0.05), 6))
+            lon.append(round(116.4 + rng.uniform(-0.05, 0.05), 6))
+        else:
+            point = BOUNDARY_POINTS[boundary_index % len(BOUNDARY_POINTS)]
+            boundary_index += 1
+            lat.append(point[0])
+            lon.append(point[1])
+    return pd.DataFrame({'lat': lat, 'lon': lon, 'alt': np.arange(len(pattern)) * 10,
+                         'timestamp': pd.date_range('2008-10-23 02:53:04', periods=len(pattern), freq='s')})
+
+
+def assert_same_as_scope_filter(trajectory, tmp_path):
+    expected_path = tmp_path / 'expected'
+    result_path = tmp_path / 'result'
+    expected_path.mkdir()
+    result_path.mkdir()
+    dfl.scope_filter(trajectory, str(expected_path / '20081023025304'))
+    dfl.scope_filter_vectorized(trajectory, str(result_path / '20081023025304'))
+    assert folder_files(str(result_path)) == folder_files(str(expected_path))
+    return folder_files(str(result_path))
+
+
+@pytest.mark.parametrize('pattern, file_num', [
+    ('IIIII', 1),  # 未被切断，整条存储
+    ('IIIIOOIIIIII', 2),  # 范围内→范围外→范围内
+    ('IIIIOIIIIOIIIII', 3),
+    ('OIIIIIOIIIIO', 2),  # 首尾点在范围外
+    ('IIIIBIIIIBIIII', 3),  # 边界上的点切断轨迹
+    ('BBIIIIIIB', 1),
+    ('IIOIIIOII', 1),  # 少于3个点的子轨迹被剔除
+    ('IIIIIIO', 1),
+    ('IIIIOIII', 1),  # 被切断时最后一段不含最后一点，只剩2点
+    ('OOOO', 0),
+])
+def test_patterns_match_scope_filter(pattern, file_num, tmp_path):
+    files = assert_same_as_scope_filter(make_trajectory(pattern), tmp_path)
+    assert len(files) == file_num
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_patterns_match_scope_filter(seed, tmp_path):
+    rng = np.random.RandomState(seed)
+    pattern = ''.join(rng.choice(['I', 'O', 'B'], size=40, p=[0.8, 0.1, 0.1]))
+    assert_same_as_scope_filter(make_trajectory(pattern, seed), tmp_path)
+
+
+def test_mask_and_runs_match_point_by_point():
+    trajectory = make_trajectory('OIIIIBIIIOOIIIIIBIIO')
+    polygon = Polygon(dfl.SCOPE_POLYGON)
+    inside = dfl.scope_mask(trajectory['lat'].values, trajectory['lon'].values)
+    assert inside.tolist() == [polygon.contains(Point(lat, lon))
+                               for lat, lon in zip(trajectory['lat'], trajectory['lon'])]
+    assert not inside[5] and not inside[16]
+    starts, ends, traj_is_cut = dfl.split_inside_runs(inside)
+    assert traj_is_cut
+    assert list(zip(starts.tolist(), ends.tolist())) == [(1, 5), (6, 9), (11, 16)]  # 17~18只有2点
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 轨迹片段目录：select的各条件与逐文件筛选一致；get_traffic_mode、select_experimental_traj
+#              查询目录与扫描文件夹（os.listdir + 文件名解析）得到相同的集合。
+import ast
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import DataCleaning.data_filter as dfl
+import FileOperation.segment_catalog as sc
+import FileOperation.traj_read_and_write as trw
+
+# get_traffic_mode、select_experimental_traj中写死的路径，在Linux下为当前目录下的文件夹名
+SEGMENT_FOLDER = r"E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Training_traj_segments_02"
+TARGET_FOLDER = r"E:\Users\Desktop\Traffic_Pattern_Mining\2_TrajectoryModeClassify\3_Data\Used_sub_traj"
+
+
+@pytest.fixture(scope='module')
+def catalog_path(reference_outputs, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('catalog') / 'segments.sqlite')
+    sc.build_catalog(reference_outputs[1], path)
+    return path
+
+
+@pytest.fixture(scope='module')
+def segment_table(reference_outputs):
+    """
+    逐文件读取得到的片段信息表，列同CATALOG_COLUMNS。
+    """
+    rows = []
+    for file_name in sorted(os.listdir(reference_outputs[1])):
+        segment_path = os.path.join(reference_outputs[1], file_name)
+        user, traj, segment_id, mode = trw.parse_segment_file_name(segment_path)
+        trajDF = trw.read_mode_traj(segment_path)
+        timestamps = trajDF['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+        rows.append({'user': user, 'traj': traj, 'segment_id': int(segment_id), 'mode': mode,
+                     'point_num': len(trajDF), 'start_time': int(timestamps.min()),
+                     'end_time': int(timestamps.max()), 'min_lat': trajDF['lat'].min(),
+                     'max_lat': trajDF['lat'].max(), 'min_lon': trajDF['lon'].min(),
+                     'max_lon': trajDF['lon'].max(), 'location': os.path.abspath(segment_path)})
+    return pd.DataFrame(rows, columns=sc.CATALOG_COLUMNS)
+
+
+def expected_locations(table, modes=None, exclude_modes=None, min_points=None, users=None, bbox=None,
+                       start_time=None, end_time=None):
+    keep = np.ones(len(table), dtype=bool)
+    if modes is not None:
+        keep &= table['mode'].isin(modes).values
+    if exclude_modes is not None:
+        keep &= ~table['mode'].isin(exclude_modes).values
+    if min_points is not None:
+        keep &= (table['point_num'] >= min_points).values
+    if users is not None:
+        keep &= table['user'].isin(users).values
+    if bbox is not None:
+        keep &= ((table['max_lat'] >= bbox[0]) & (table['min_lat'] <= bbox[2]) &
+                 (table['max_lon'] >= bbox[1]) & (table['min_lon'] <= bbox[3])).values
+    if start_time is not None:
+        keep &= (table['end_time'] >= pd.Timestamp(start_time).value).values
+    if end_time is not None:
+        keep &= (table['start_time'] <= pd.Timestamp(end_time).value).values
+    return table[keep].sort_values(['user', 'traj', 'segment_id'])['location'].tolist()
+
+
+def test_catalog_matches_files(catalog_path, segment_table):
+    with sc.SegmentCatalog(catalog_path) as catalog:
+        assert len(catalog) == len(segment_table)
+        result = catalog.select()
+    expected = segment_table.sort_values(['user', 'traj', 'segment_id']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_select_conditions(catalog_path, segment_table):
+    median_points = int(segment_table['point_num'].median())
+    lat = (segment_table['min_lat'].median() + segment_table['max_lat'].median()) / 2
+    lon = (segment_table['min_lon'].median() + segment_table['max_lon'].median()) / 2
+    times = np.sort(segment_table['start_time'].values)
+    middle = pd.Timestamp(times[len(times) // 2])
+    conditions = [
+        {'modes': ['walk', 'bus']},
+        {'modes': ['taxi'], 'min_points': median_points},
+        {'exclude_modes': list(dfl.EXCLUDED_MODES)},
+        {'exclude_modes': ['train'], 'users': ['000', '002']},
+        {'min_points': median_points},
+        {'bbox': (lat - 0.01, lon - 0.01, lat + 0.01, lon + 0.01)},
+        {'start_time': middle},
+        {'end_time': str(middle)},
+        {'start_time': middle, 'end_time': middle + pd.Timedelta(hours=1), 'exclude_modes': ['run']},
+        {'modes': ['airplane']},
+        {'modes': []},
+    ]
+    with sc.SegmentCatalog(catalog_path) as catalog:
+        for condition in conditions:
+            expected = expected_locations(segment_table, **condition)
+            assert catalog.locations(**condition) == expected, condition
+    # 各条件确实筛掉了一部分片段
+    assert 0 < len(expected_locations(segment_table, start_time=middle)) < len(segment_table)
+    assert 0 < len(expected_locations(segment_table, bbox=conditions[5]['bbox'])) < len(segment_table)
+    assert 0 < len(expected_locations(segment_table, min_points=median_points)) < len(segment_table)
+
+
+@pytest.fixture
+def legacy_folders(reference_outputs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    shutil.copytree(reference_outputs[1], SEGMENT_FOLDER)
+    os.makedirs(TARGET_FOLDER)
+
+
+def test_traffic_modes_match_listdir(catalog_path, legacy_folders, capsys):
+    dfl.get_traffic_mode()
+    listed = ast.literal_eval(capsys.readouterr().out.strip())
+    modes = dfl.get_traffic_mode(catalog_path)
+    assert set(modes) == set(listed)
+    assert modes == sorted(modes)
+
+
+def test_experimental_traj_match_listdir(catalog_path, legacy_folders):
+    dfl.select_experimental_traj()
+    locations = dfl.select_experimental_traj(catalog_path)
+    assert sorted(os.path.basename(location) for location in locations) == sorted(os.listdir(TARGET_FOLDER))
+    assert not any(location.split('.')[0].split('_')[-1] in dfl.EXCLUDED_MODES for location in locations)
+    assert len(locations) < len(os.listdir(SEGMENT_FOLDER))
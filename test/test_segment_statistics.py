@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 一次排序计算的33维轨迹段特征向量与原逐部分（extract_*_part）pandas统计的一致性。
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.segment_statistics as ss
+import FileOperation.traj_read_and_write as trw
+
+
+def legacy_feature_vector(trajDF):
+    return (ef.extract_distance_part(trajDF) + ef.extract_velocity_part(trajDF) +
+            ef.extract_accelerate_part(trajDF) + ef.extract_bearing_part(trajDF) + ef.extract_steering_part(trajDF))
+
+
+def test_feature_vector_matches_legacy(reference_outputs, tmp_path):
+    feature_path = str(tmp_path / 'features')
+    shutil.copytree(reference_outputs[1], feature_path)
+    ef.add_features_to_txt(feature_path)
+    files = sorted(os.listdir(feature_path))
+    assert files
+    for file in files:
+        trajDF = trw.read_traj_with_feature(os.path.join(feature_path, file))
+        np.testing.assert_array_equal(ss.extract_feature_vector(trajDF), legacy_feature_vector(trajDF),
+                                      err_msg=file)
+
+
+def test_extract_features_file_matches_legacy(reference_outputs, tmp_path):
+    feature_path = str(tmp_path / 'features')
+    target_path = tmp_path / 'vectors'
+    target_path.mkdir()
+    shutil.copytree(reference_outputs[1], feature_path)
+    ef.add_features_to_txt(feature_path)
+    ef.extract_features(feature_path, str(target_path))
+    for file in sorted(os.listdir(feature_path)):
+        trajDF = trw.read_traj_with_feature(os.path.join(feature_path, file))
+        pd.DataFrame([legacy_feature_vector(trajDF)]).to_csv(tmp_path / 'legacy.txt', sep=',', index=False,
+                                                             header=False)
+        assert (target_path / file).read_bytes() == (tmp_path / 'legacy.txt').read_bytes(), file
+
+
+def test_segment_feature_matrix_matches_per_segment(reference_outputs):
+    trajDF_list = [ef.cal_common_feature(trw.read_mode_traj(os.path.join(reference_outputs[1], file)))
+                   for file in sorted(os.listdir(reference_outputs[1]))]
+    columns = ['distance'] + ss.STAT_COLUMNS
+    features = {column: np.concatenate([trajDF[column].values for trajDF in trajDF_list]) for column in columns}
+    offsets = np.cumsum([0] + [len(trajDF) for trajDF in trajDF_list])
+    matrix = ss.segment_feature_matrix(features, offsets)
+    for row, trajDF in zip(matrix, trajDF_list):
+        np.testing.assert_array_equal(row, legacy_feature_vector(trajDF))
+
+
+def test_segment_sums_match_per_segment_sum():
+    # 含空组、单点组、同长度的多组及超过GATHER_MAX_LENGTH的长组，结果与逐组np.sum逐位相同
+    rng = np.random.RandomState(11)
+    lengths = np.concatenate([rng.randint(0, 40, 3000), rng.randint(ss.GATHER_MAX_LENGTH - 2, 3000, 20),
+                              [0, 1, 1, ss.GATHER_MAX_LENGTH, ss.GATHER_MAX_LENGTH + 1]])
+    rng.shuffle(lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    values = rng.standard_normal(lengths.sum()) * 10.0 ** rng.randint(-3, 6, lengths.sum())
+    expected = np.array([values[start:start + length].sum() for start, length in zip(starts, lengths)])
+    np.testing.assert_array_equal(ss.segment_sums(values, starts, lengths), expected)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 区间连接分割轨迹片段与原逐行遍历实现（traj_segmentation_one_folder）的一致性。
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import DataCleaning.data_filter as dfl
+import DataCleaning.extract_labeled_segmentation as els
+from conftest import folder_files
+
+
+def natural_key(file_name):
+    """
+    按文件名中的数字大小排序，20081023025304_2.txt 排在 20081023025304_10.txt 之前，即按时间顺序。
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', file_name)]
+
+
+def legacy_segmentation(filtered_path, output_path, key=natural_key):
+    """
+    以原实现逐个user分割。原实现按os.listdir的顺序遍历轨迹文件，并假定其按时间排序，
+    此处将listdir替换为按key排序后的结果。
+    按文件名的字典序（Windows下listdir的顺序），同一轨迹切出10个及以上子轨迹时 _10 排在 _2 之前，
+    原实现会因此漏掉部分片段；区间连接逐文件独立分割，与文件顺序无关，结果同按时间顺序遍历的原实现。
+    """
+    listdir = os.listdir
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(els.os, 'listdir', lambda path: sorted(listdir(path), key=key))
+        for user in sorted(listdir(filtered_path)):
+            els.traj_segmentation_one_folder(os.path.join(filtered_path, user), output_path)
+    return folder_files(output_path)
+
+
+@pytest.fixture
+def many_sub_trajs(tmp_path):
+    """
+    一条轨迹被范围外的点切为12个子轨迹（_0 ~ _11），标签跨越多个子轨迹。
+    """
+    user_path = tmp_path / 'filtered' / '010'
+    traj_path = user_path / 'Trajectory'
+    traj_path.mkdir(parents=True)
+    run_num = 12
+    run_points = 20
+    point_num = run_num * (run_points + 1)
+    rng = np.random.RandomState(5)
+    lat = 40.0 + np.cumsum(rng.uniform(0, 1e-4, point_num))
+    lat[run_points::run_points + 1] = 38.0  # 每20个点后一个范围外的点
+    trajectory = pd.DataFrame({'lat': np.round(lat, 6),
+                               'lon': np.round(116.3 + np.cumsum(rng.uniform(0, 1e-4, point_num)), 6),
+                               'alt': rng.randint(0, 500, point_num),
+                               'timestamp': pd.date_range('2008-10-23 02:53:04', periods=point_num, freq='s')})
+    dfl.scope_filter_vectorized(trajectory, str(traj_path / '20081023025304'))
+    assert len(os.listdir(str(traj_path))) == run_num
+    start = pd.Timestamp('2008-10-23 02:53:04')
+    lines = ["Start Time\tEnd Time\tTransportation Mode\n"]
+    for k, mode in enumerate(['walk', 'bus', 'car', 'walk', 'bike', 'subway']):
+        label_start = start + pd.Timedelta(seconds=40 * k + 3)
+        label_end = label_start + pd.Timedelta(seconds=33)
+        lines.append("{0}\t{1}\t{2}\n".format(label_start.strftime('%Y/%m/%d %H:%M:%S'),
+                                              label_end.strftime('%Y/%m/%d %H:%M:%S'), mode))
+    (user_path / 'labels.txt').write_text(''.join(lines))
+    return str(tmp_path / 'filtered')
+
+
+def test_interval_join_matches_legacy_segmentation(reference_outputs, tmp_path):
+    filtered_path = reference_outputs[0]
+    legacy_path = tmp_path / 'legacy'
+    join_path = tmp_path / 'join'
+    legacy_path.mkdir()
+    join_path.mkdir()
+    legacy = legacy_segmentation(filtered_path, str(legacy_path))
+    assert legacy
+    for user in sorted(os.listdir(filtered_path)):
+        els.traj_segmentation_one_folder_join(os.path.join(filtered_path, user), str(join_path))
+    assert folder_files(str(join_path)) == legacy
+
+
+def test_training_traj_segmentation_matches_legacy(reference_outputs, tmp_path):
+    filtered_path, segment_path = reference_outputs
+    legacy_path = tmp_path / 'legacy'
+    legacy_path.mkdir()
+    assert folder_files(segment_path) == legacy_segmentation(filtered_path, str(legacy_path))
+
+
+def test_ten_or_more_sub_trajs(many_sub_trajs, tmp_path):
+    for folder in ('legacy', 'lexicographic', 'join'):
+        (tmp_path / folder).mkdir()
+    legacy = legacy_segmentation(many_sub_trajs, str(tmp_path / 'legacy'))
+    els.training_traj_segmentation(many_sub_trajs, str(tmp_path / 'join'))
+    assert folder_files(str(tmp_path / 'join')) == legacy
+    # 切出的片段来自 _10、_11 等子轨迹
+    assert any(name.startswith('010_20081023025304_10_') for name in legacy)
+    assert any(name.startswith('010_20081023025304_11_') for name in legacy)
+    # 原实现按字典序遍历时漏掉片段，区间连接不受影响
+    lexicographic = legacy_segmentation(many_sub_trajs, str(tmp_path / 'lexicographic'), key=None)
+    assert set(lexicographic) < set(legacy)
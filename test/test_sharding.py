@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 分片执行：合并结果与分片数无关且与单机处理一致；认领被接管的进程不提交输出；失败的分片写出标记，合并时报告。
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import FeatureExtracting.extract_features as ef
+import FileOperation.feature_matrix as fm
+import Pipeline.instrumentation as ins
+import Pipeline.scheduler as sched
+import Pipeline.sharding as sh
+from conftest import folder_files
+
+
+@pytest.fixture(scope='module')
+def reference_matrix(reference_outputs, tmp_path_factory):
+    """
+    单机由参考轨迹片段计算的特征矩阵。
+    """
+    matrix_path = str(tmp_path_factory.mktemp('reference_matrix') / sh.MATRIX_FILE)
+    ef.segments_to_feature_matrix(reference_outputs[1], matrix_path)
+    return fm.read_feature_matrix(matrix_path)
+
+
+def assert_merged_output(output_path, reference_outputs, reference_matrix):
+    assert folder_files(os.path.join(output_path, sh.FILTERED_FOLDER)) == folder_files(reference_outputs[0])
+    assert folder_files(os.path.join(output_path, sh.SEGMENT_FOLDER)) == folder_files(reference_outputs[1])
+    featureDF = fm.read_feature_matrix(os.path.join(output_path, sh.MATRIX_FILE))
+    pd.testing.assert_frame_equal(featureDF, reference_matrix)
+    with sqlite3.connect(os.path.join(output_path, sh.CATALOG_FILE)) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0] == len(os.listdir(reference_outputs[1]))
+
+
+@pytest.mark.parametrize('shard_count', [1, 3])
+def test_merged_output_independent_of_shard_count(traj_data, reference_outputs, reference_matrix, tmp_path,
+                                                  shard_count):
+    shared_path = str(tmp_path / 'shared')
+    output_path = str(tmp_path / 'merged')
+    plan = sh.plan_shards(traj_data, shared_path, shard_count)
+    assert sorted(user for users in plan['shards'] for user in users) == sorted(os.listdir(traj_data))
+    finished, failed = sh.run_worker(shared_path, workers=1)
+    assert sorted(finished) == list(range(shard_count)) and failed == []
+    summary = sh.merge_shards(shared_path, output_path)
+    assert summary['feature_rows'] == len(reference_matrix)
+    assert_merged_output(output_path, reference_outputs, reference_matrix)
+
+
+def test_expired_claim_cannot_commit(traj_data, reference_outputs, tmp_path):
+    shared_path = str(tmp_path / 'shared')
+    plan = sh.plan_shards(traj_data, shared_path, 1)
+    stale_claim = sh.claim_shard(shared_path, 0)
+    assert sh.claim_shard(shared_path, 0) is None  # 认领未超时
+    new_claim = sh.claim_shard(shared_path, 0, lease_seconds=0)  # 超时后被接管
+    assert new_claim is not None and not sh.holds_claim(shared_path, 0, stale_claim)
+
+    store_path = sh.shard_store_path(shared_path, 0)
+    with pytest.raises(sched.CommitRejected):
+        sh.process_shard(plan, shared_path, 0, workers=1, claim_path=stale_claim)
+    assert folder_files(os.path.join(store_path, sh.SEGMENT_FOLDER)) == {}
+    assert not os.path.exists(os.path.join(store_path, sh.FILTERED_FOLDER))
+    assert not os.path.exists(os.path.join(store_path, "state", sched.CHECKPOINT_FILE))
+
+    sh.process_shard(plan, shared_path, 0, workers=1, claim_path=new_claim)
+    assert folder_files(os.path.join(store_path, sh.SEGMENT_FOLDER)) == folder_files(reference_outputs[1])
+    assert os.path.exists(os.path.join(store_path, sh.MATRIX_FILE))
+
+
+def test_failed_shard_is_reported_and_retried(traj_data, reference_outputs, reference_matrix, tmp_path):
+    data_path = str(tmp_path / 'data')
+    shared_path = str(tmp_path / 'shared')
+    output_path = str(tmp_path / 'merged')
+    shutil.copytree(traj_data, data_path)
+    traj_folder = os.path.join(data_path, '001', 'Trajectory')
+    broken_path = os.path.join(traj_folder, sorted(os.listdir(traj_folder))[0])
+    with open(broken_path, 'rb') as fp:
+        original = fp.read()
+    with open(broken_path, 'ab') as fp:
+        fp.write(b'not,a,valid,timestamp\n')
+
+    sh.plan_shards(data_path, shared_path, 1)
+    ins.enable()
+    try:
+        assert sh.run_worker(shared_path, workers=1) == ([], [0])
+        assert ins.report()['counters']['shards_failed'] == 1
+    finally:
+        ins.disable()
+        ins.STATE.reset()
+    assert os.path.exists(sh.failed_path(shared_path, 0))
+    assert sh.claim_paths(shared_path, 0) == []
+    assert sh.claim_shard(shared_path, 0) is None  # 其他进程不再认领失败的分片
+    with pytest.raises(RuntimeError, match="分片失败"):
+        sh.merge_shards(shared_path, output_path)  # 不等待失败的分片
+
+    with open(broken_path, 'wb') as fp:
+        fp.write(original)
+    assert sh.retry_failed_shards(shared_path) == [0]
+    assert sh.run_worker(shared_path, workers=1) == ([0], [])
+    sh.merge_shards(shared_path, output_path)
+    assert_merged_output(output_path, reference_outputs, reference_matrix)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 空间索引：范围查询与k近邻查询与逐点扫描的结果一致（含无点的网格）；按文件夹增量更新。
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import FeatureExtracting.point_features as pf
+import FileOperation.spatial_index as si
+
+
+@pytest.fixture
+def cloud(tmp_path):
+    """
+    4条轨迹，点呈高斯分布，网格中有大量空网格；返回 (空间索引, 全部点表)。
+    """
+    rng = np.random.RandomState(3)
+    index = si.SpatialIndex(str(tmp_path / 'index.db'), cell_size=0.005)
+    frames = []
+    for k in range(4):
+        lat = 39.9 + rng.normal(0, 0.02, 200)
+        lon = 116.4 + rng.normal(0, 0.02, 200)
+        timestamps = np.arange(200, dtype=np.int64) * 10 ** 9
+        index.add('traj_{}'.format(k), 'u', str(k), lat, lon, timestamps)
+        frames.append(pd.DataFrame({'location': 'traj_{}'.format(k), 'point_index': np.arange(200),
+                                    'lat': lat, 'lon': lon}))
+    yield index, pd.concat(frames, ignore_index=True)
+    index.close()
+
+
+def brute_knn(pointsDF, lat, lon, k):
+    distance = pf.cal_distance_array(np.float64(lat), np.float64(lon), pointsDF['lat'].values, pointsDF['lon'].values)
+    return pointsDF.assign(distance=distance).sort_values(['distance', 'location', 'point_index'], kind='stable') \
+        .head(k).reset_index(drop=True)
+
+
+def test_knn_with_empty_first_ring(tmp_path):
+    with si.SpatialIndex(str(tmp_path / 'index.db')) as index:
+        index.add('a', 'u', 't', np.array([39.90, 39.901, 39.95]), np.array([116.40, 116.401, 116.45]),
+                  np.array([0, 1, 2]))
+        resultDF = index.knn_query(39.925, 116.425, k=1)
+    assert len(resultDF) == 1
+    assert resultDF['point_index'].tolist() == [1]
+
+
+def test_range_query_matches_scan(cloud):
+    index, pointsDF = cloud
+    rng = np.random.RandomState(5)
+    boxes = [(39.5, 116.0, 39.6, 116.1)]  # 无点的范围
+    for _ in range(30):
+        lat0, lon0 = 39.9 + rng.normal(0, 0.03, 2), 116.4 + rng.normal(0, 0.03, 2)
+        boxes.append((lat0.min(), lon0.min(), lat0.max(), lon0.max()))
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        resultDF = index.range_query(min_lat, min_lon, max_lat, max_lon)
+        inside = pointsDF['lat'].between(min_lat, max_lat) & pointsDF['lon'].between(min_lon, max_lon)
+        expectedDF = pointsDF[inside].sort_values(['location', 'point_index']).reset_index(drop=True)
+        assert resultDF['location'].tolist() == expectedDF['location'].tolist()
+        assert resultDF['point_index'].tolist() == expectedDF['point_index'].tolist()
+        np.testing.assert_array_equal(resultDF['lat'].values, expectedDF['lat'].values)
+    assert len(index.range_query(39.5, 116.0, 39.6, 116.1)) == 0
+
+
+@pytest.mark.parametrize('k', [1, 5, 50])
+def test_knn_matches_scan(cloud, k):
+    index, pointsDF = cloud
+    rng = np.random.RandomState(k)
+    queries = list(zip(39.9 + rng.normal(0, 0.03, 60), 116.4 + rng.normal(0, 0.03, 60)))
+    queries.append((39.0, 115.0))  # 远离全部点
+    for lat, lon in queries:
+        resultDF = index.knn_query(lat, lon, k)
+        expectedDF = brute_knn(pointsDF, lat, lon, k)
+        assert resultDF['lat'].dtype == np.float64
+        assert resultDF['location'].tolist() == expectedDF['location'].tolist()
+        assert resultDF['point_index'].tolist() == expectedDF['point_index'].tolist()
+        np.testing.assert_array_equal(resultDF['distance'].values, expectedDF['distance'].values)
+
+
+def indexed_points(index):
+    resultDF = index.range_query(-90, -180, 90, 180)
+    return resultDF.groupby('location').size().to_dict()
+
+
+def test_update_from_folder(reference_outputs, tmp_path):
+    folder_path = str(tmp_path / 'segments')
+    shutil.copytree(reference_outputs[1], folder_path)
+    files = sorted(os.listdir(folder_path))
+    with si.SpatialIndex(str(tmp_path / 'index.db')) as index:
+        assert index.update_from_folder(folder_path) == (len(files), 0, 0)
+        assert index.update_from_folder(folder_path) == (0, len(files), 0)
+
+        # 新增、修改、删除各一个文件
+        shutil.copyfile(os.path.join(folder_path, files[0]), os.path.join(folder_path, '999_new_1_walk.txt'))
+        with open(os.path.join(folder_path, files[1]), 'r') as fp:
+            lines = fp.readlines()
+        with open(os.path.join(folder_path, files[1]), 'w') as fp:
+            fp.writelines(lines[:len(lines) // 2])
+        os.remove(os.path.join(folder_path, files[2]))
+        assert index.update_from_folder(folder_path) == (2, len(files) - 2, 1)
+
+        expected = {}
+        for file in os.listdir(folder_path):
+            location = os.path.abspath(os.path.join(folder_path, file))
+            expected[location] = len(si.read_points(location))
+        assert indexed_points(index) == expected
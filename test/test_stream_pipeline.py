@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 内存流式处理流程与逐级文件处理流程（plt2txt → traj_filter → training_traj_segmentation →
+#              select_experimental_traj → add_features_to_txt → extract_features）得到相同的特征矩阵及中间结果。
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import DataCleaning.data_filter as dfl
+import FeatureExtracting.extract_features as ef
+import FileOperation.feature_matrix as fm
+import FileOperation.traj_read_and_write as trw
+import Pipeline.stream_pipeline as sp
+from conftest import folder_files
+
+
+@pytest.fixture(scope='module')
+def file_pipeline_matrix(reference_outputs, tmp_path_factory):
+    """
+    逐级文件处理得到的特征矩阵，按来源文件名排序。
+    """
+    root = tmp_path_factory.mktemp('file_pipeline')
+    feature_path = str(root / 'features')
+    os.makedirs(feature_path)
+    for file_name in os.listdir(reference_outputs[1]):
+        _, _, _, mode = trw.parse_segment_file_name(file_name)
+        if mode not in dfl.EXCLUDED_MODES:
+            shutil.copyfile(os.path.join(reference_outputs[1], file_name), os.path.join(feature_path, file_name))
+    ef.add_features_to_txt(feature_path)
+    matrix_path = str(root / 'features.npz')
+    ef.extract_features_to_matrix(feature_path, matrix_path)
+    featureDF = fm.read_feature_matrix(matrix_path)
+    return featureDF.sort_values('source_file').reset_index(drop=True), feature_path
+
+
+def test_stream_matches_file_pipeline(geolife_root, reference_outputs, file_pipeline_matrix, tmp_path):
+    expected, expected_feature_path = file_pipeline_matrix
+    filtered_path = str(tmp_path / 'filtered')
+    segment_path = str(tmp_path / 'segments')
+    feature_path = str(tmp_path / 'features')
+    matrix_path = str(tmp_path / 'features.npz')
+    stats = sp.run_stream_pipeline(os.path.join(geolife_root, "Labeled_Data"), matrix_path,
+                                   filtered_path=filtered_path, segment_path=segment_path,
+                                   feature_path=feature_path)
+    result = fm.read_feature_matrix(matrix_path).sort_values('source_file').reset_index(drop=True)
+    assert len(result) == stats['selected'] > 0
+    assert result['source_file'].tolist() == expected['source_file'].tolist()
+    for column in fm.META_COLUMNS:
+        assert result[column].tolist() == expected[column].tolist()
+    np.testing.assert_array_equal(result.iloc[:, len(fm.META_COLUMNS):].values,
+                                  expected.iloc[:, len(fm.META_COLUMNS):].values)
+    # 中间结果与逐级文件处理的输出逐字节一致
+    assert folder_files(filtered_path) == folder_files(reference_outputs[0])
+    reference_segments = folder_files(reference_outputs[1])
+    assert folder_files(segment_path) == {name: content for name, content in reference_segments.items()
+                                          if trw.parse_segment_file_name(name)[3] not in dfl.EXCLUDED_MODES}
+    assert folder_files(feature_path) == folder_files(expected_feature_path)
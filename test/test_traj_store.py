@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 列式轨迹存储的写出、读取、追加，及写出中断后的恢复。
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import FileOperation.traj_read_and_write as trw
+import FileOperation.traj_store as ts
+
+
+def segment(point_num, start_lat, seconds=0):
+    return pd.DataFrame({'lat': start_lat + np.arange(point_num) * 1e-4, 'lon': 116.4 + np.arange(point_num) * 1e-4,
+                         'alt': np.arange(point_num, dtype=np.float64),
+                         'timestamp': pd.Timestamp('2008-04-01') + pd.to_timedelta(seconds + np.arange(point_num),
+                                                                                    unit='s')})
+
+
+def assert_frame_matches(frame, trajDF):
+    np.testing.assert_array_equal(frame['lat'].values, trajDF['lat'].values)
+    np.testing.assert_array_equal(frame['lon'].values, trajDF['lon'].values)
+    np.testing.assert_array_equal(frame['alt'].values, trajDF['alt'].values.astype(np.float32))
+    np.testing.assert_array_equal(frame['timestamp'].values, trajDF['timestamp'].values.astype('datetime64[ns]'))
+
+
+def test_segment_folder_round_trip(reference_outputs, tmp_path):
+    segment_path = reference_outputs[1]
+    store_path = str(tmp_path / 'store')
+    assert trw.mode_trajs_to_store(segment_path, store_path) == len(os.listdir(segment_path))
+    store = trw.read_traj_store(store_path)
+    for file in os.listdir(segment_path):
+        user, traj, segment_id, mode = trw.parse_segment_file_name(file)
+        assert_frame_matches(store.get_frame(user, traj, segment_id), trw.read_mode_traj(os.path.join(segment_path,
+                                                                                                      file)))
+        assert store.get_trajectory(user, traj, segment_id).mode == mode
+
+
+def test_append_discards_bytes_of_an_interrupted_write(tmp_path):
+    store_path = str(tmp_path / 'store')
+    first, lost, second = segment(5, 39.9), segment(7, 40.0), segment(3, 40.1)
+    trw.write_traj_store(store_path, [('000', 'a', 0, first, 'walk')])
+    # 列数据已写出，但索引表与元信息写出前中断
+    writer = ts.TrajStoreWriter(store_path, append=True)
+    writer.append_frame('000', 'b', 0, lost, 'bus')
+    for fp in writer.files.values():
+        fp.close()
+    trw.write_traj_store(store_path, [('000', 'c', 0, second, 'car')], append=True)
+    store = trw.read_traj_store(store_path)
+    assert store.keys() == [('000', 'a', 0), ('000', 'c', 0)]
+    assert_frame_matches(store.get_frame('000', 'a', 0), first)
+    assert_frame_matches(store.get_frame('000', 'c', 0), second)
+    assert store.get_trajectory('000', 'c', 0).mode == 'car'
+    assert os.path.getsize(ts.column_file(store_path, 'lat')) == 8 * (len(first) + len(second))
+
+
+def test_append_without_committed_store_starts_at_zero(tmp_path):
+    store_path = str(tmp_path / 'store')
+    os.makedirs(store_path)
+    for column in ts.STORE_COLUMNS:
+        with open(ts.column_file(store_path, column), 'wb') as fp:
+            fp.write(b'\x01' * 64)  # 未提交的残留数据，没有索引表与元信息
+    trajDF = segment(4, 39.9)
+    trw.write_traj_store(store_path, [('001', 'a', 0, trajDF, 'walk')], append=True)
+    store = trw.read_traj_store(store_path)
+    assert store.positions[('001', 'a', 0)] == (0, 4)
+    assert_frame_matches(store.get_frame('001', 'a', 0), trajDF)
+
+
+def test_duplicate_key_is_rejected(tmp_path):
+    store_path = str(tmp_path / 'store')
+    trw.write_traj_store(store_path, [('000', 'a', 0, segment(3, 39.9), 'walk')])
+    with pytest.raises(ValueError):
+        trw.write_traj_store(store_path, [('000', 'a', 0, segment(3, 40.0), 'bus')], append=True)
+    with pytest.raises(ValueError):
+        trw.write_traj_store(str(tmp_path / 'other'), [('000', 'a', 1, segment(3, 39.9), 'walk'),
+                                                        ('000', 'a', 1, segment(3, 40.0), 'bus')])
+
+
+def test_reader_mode_lines_up_with_duplicate_index_rows(tmp_path):
+    store_path = str(tmp_path / 'store')
+    trw.write_traj_store(store_path, [('000', 'a', 0, segment(3, 39.9), 'walk'),
+                                      ('000', 'b', 0, segment(3, 40.0), 'bus'),
+                                      ('000', 'c', 0, segment(3, 40.1), 'car')])
+    # 旧版本写出的索引表中可能存在重复键：后一行覆盖前一行
+    indexDF = ts.read_store_index(store_path)
+    indexDF.loc[0, 'traj'] = 'b'
+    indexDF.to_csv(os.path.join(store_path, ts.INDEX_FILE), index=False)
+    store = trw.read_traj_store(store_path)
+    assert store.get_trajectory('000', 'b', 0).mode == 'bus'
+    assert store.get_trajectory('000', 'c', 0).mode == 'car'
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 轨迹数据模型：与DataFrame的往返转换，以及切片（含负下标、负步长）为零拷贝视图。
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import DataModel.trajectory as tm
+import FeatureExtracting.point_features as pf
+import FileOperation.traj_read_and_write as trw
+
+
+@pytest.fixture
+def trajectory():
+    rng = np.random.RandomState(3)
+    point_num = 12
+    timestamps = pd.date_range('2008-10-23 02:53:04', periods=point_num, freq='2s').values
+    traj = tm.Trajectory(40.0 + np.cumsum(rng.uniform(0, 1e-4, point_num)),
+                         116.3 + np.cumsum(rng.uniform(0, 1e-4, point_num)),
+                         rng.randint(0, 500, point_num), timestamps, user='010', traj='20081023025304',
+                         segment=2, mode='walk')
+    return traj.cal_point_features()
+
+
+def test_frame_round_trip(trajectory):
+    trajDF = trajectory.to_frame(with_mode=True)
+    assert list(trajDF.columns) == ['lat', 'lon', 'alt', 'timestamp', 'mode'] + pf.FEATURE_COLUMNS
+    assert (trajDF['mode'] == 'walk').all()
+    result = tm.Trajectory.from_frame(trajDF, user='010', traj='20081023025304', segment=2)
+    assert result.mode == 'walk'
+    for column in tm.COLUMN_TYPES:
+        values = getattr(result, column)
+        assert values.dtype == tm.COLUMN_TYPES[column]
+        assert np.array_equal(values, getattr(trajectory, column))
+    assert list(result.features) == pf.FEATURE_COLUMNS
+    for name in pf.FEATURE_COLUMNS:
+        np.testing.assert_array_equal(result.features[name], trajectory.features[name])
+    pd.testing.assert_frame_equal(result.to_frame(with_mode=True), trajDF)
+
+
+def test_frame_round_trip_of_segment_files(reference_outputs):
+    segment_path = reference_outputs[1]
+    for file_name in sorted(os.listdir(segment_path))[:5]:
+        trajDF = trw.read_mode_traj(os.path.join(segment_path, file_name))
+        result = tm.Trajectory.from_frame(trajDF).to_frame(with_mode=True)
+        # 时间精度随pandas版本为us或ns，高程存为float32，时刻及数值须相同
+        assert result['timestamp'].tolist() == trajDF['timestamp'].tolist()
+        assert np.array_equal(result[['lat', 'lon', 'alt']].values, trajDF[['lat', 'lon', 'alt']].values)
+        assert result['mode'].tolist() == trajDF['mode'].tolist()
+
+
+@pytest.mark.parametrize('item', [slice(2, 7), slice(-5, None), slice(None, -3), slice(-8, -2, 2),
+                                  slice(None, None, -1), slice(-2, 3, -3), slice(20, 30), slice(-100, 100)])
+def test_slicing(trajectory, item):
+    sub = trajectory[item]
+    assert isinstance(sub, tm.Trajectory)
+    expected_index = np.arange(len(trajectory))[item]
+    assert len(sub) == len(expected_index)
+    for column in tm.COLUMN_TYPES:
+        assert np.array_equal(getattr(sub, column), getattr(trajectory, column)[expected_index])
+    for name, values in trajectory.features.items():
+        assert np.array_equal(sub.features[name], values[expected_index], equal_nan=True)
+    assert (sub.user, sub.traj, sub.segment, sub.mode) == ('010', '20081023025304', 2, 'walk')
+    if len(sub):
+        # 零拷贝：子轨迹各列与原轨迹共享内存
+        assert np.shares_memory(sub.lat, trajectory.lat)
+        assert np.shares_memory(sub.features['velocity'], trajectory.features['velocity'])
+
+
+@pytest.mark.parametrize('index', [0, 5, -1, -12])
+def test_point_indexing(trajectory, index):
+    point = trajectory[index]
+    assert isinstance(point, tm.TrajPointRecord)
+    assert point.lat == trajectory.lat[index]
+    assert point.timestamp == trajectory.timestamp[index]
+    assert point.features['velocity'] == trajectory.features['velocity'][index] or \
+        np.isnan(point.features['velocity'])
+    assert point.lat == list(trajectory.iter_points())[index].lat
+
+
+@pytest.mark.parametrize('index', [12, -13])
+def test_point_index_out_of_range(trajectory, index):
+    with pytest.raises(IndexError):
+        trajectory[index]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# author: Bounci
+# time: 2026/10/18
+# description: 滑动窗口特征与逐窗口直接统计的一致性，及窗口对轨迹点的覆盖。
+import os
+
+import numpy as np
+import pytest
+
+import FeatureExtracting.extract_features as ef
+import FeatureExtracting.segment_statistics as ss
+import FeatureExtracting.window_features as wf
+import FileOperation.traj_read_and_write as trw
+
+
+@pytest.fixture(scope='module')
+def featureDF(reference_outputs):
+    segment_path = reference_outputs[1]
+    file = max(os.listdir(segment_path), key=lambda name: os.path.getsize(os.path.join(segment_path, name)))
+    return ef.cal_common_feature(trw.read_mode_traj(os.path.join(segment_path, file)))
+
+
+def assert_matches_direct(featureDF, table):
+    for row in table.itertuples(index=False):
+        expected = ss.extract_feature_vector(featureDF.iloc[row.start:row.end])
+        # 窗口内的和以累加量增减维护，与直接求和相差舍入误差；均值、方差舍入至4位时可能相差末位
+        np.testing.assert_allclose(row[2:], expected, rtol=1e-9, atol=1.5e-4)
+
+
+@pytest.mark.parametrize('window_size, step', [(20, 1), (20, 7), (20, 20), (1000000, 1)])
+def test_count_windows_match_direct(featureDF, window_size, step):
+    table = wf.extract_window_features(featureDF, window_size, step)
+    assert_matches_direct(featureDF, table)
+    assert table['end'].iloc[-1] == len(featureDF)
+
+
+@pytest.mark.parametrize('window_seconds, step_seconds', [(60, 15), (60, 60), (45, 20)])
+def test_time_windows_match_direct(featureDF, window_seconds, step_seconds):
+    table = wf.extract_time_window_features(featureDF, window_seconds, step_seconds)
+    assert_matches_direct(featureDF, table[table['end'] > table['start']])
+    assert table['end'].iloc[-1] == len(featureDF)
+
+
+@pytest.mark.parametrize('point_num, window_size, step', [(10, 4, 1), (10, 4, 3), (10, 4, 4), (11, 4, 2), (3, 4, 1)])
+def test_count_windows_cover_every_point(point_num, window_size, step):
+    starts, ends = wf.window_bounds_by_count(point_num, window_size, step)
+    covered = np.zeros(point_num, dtype=bool)
+    for start, end in zip(starts, ends):
+        assert end - start <= window_size
+        covered[start:end] = True
+    assert covered.all()
+
+
+def test_time_windows_cover_last_point():
+    timestamps = np.array([0, 1, 2, 5, 10], dtype='datetime64[s]')
+    starts, ends = wf.window_bounds_by_time(timestamps, 10, 3)
+    assert ends[-1] == len(timestamps)
+    starts, ends = wf.window_bounds_by_time(timestamps, 4, 4)
+    assert list(zip(starts, ends)) == [(0, 3), (3, 4), (4, 5)]